@@ -1,20 +1,21 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
+import hmac
 import json
-import pandas as pd
-from datetime import datetime
-import uuid
+import os
+import threading
 from functools import wraps
 
 # Import your existing modules
 import llm
+import fast_path
 from user_intent_handler import UserIntentHandler
 import chat_history
+import prompts
+import row_shaping
+import vector_index
 from session_manager import get_session_id
 import order_request  # Your order processing module
 
-from collections import defaultdict
-import asyncio
-
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this to a secure secret key
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
@@ -29,6 +30,49 @@ ERROR_MESSAGES = {
     'server_error': 'An unexpected error occurred'
 }
 
+HISTORY_PAGE_SIZE = 20      # chat turns rendered on page load / per /chat_history page
+MAX_HISTORY_PAGE_SIZE = 100
+STREAM_ROW_CHUNK = 10  # table rows per `rows` event on /send_message_stream
+# /stats is disabled unless STATS_TOKEN is set; requests must send "Authorization: Bearer <token>"
+STATS_TOKEN = os.getenv("STATS_TOKEN", "")
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # don't let nginx buffer the event stream
+}
+
+_started_pid = None
+_startup_lock = threading.Lock()
+
+def startup():
+    """
+    Per-worker initialization, kept out of module imports so workers boot fast.
+    Called from gunicorn's post_worker_init (gunicorn.conf.py), app.run below,
+    and as a fallback before the first request of a process.
+    """
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    with _startup_lock:
+        # Concurrent first requests wait here for the one thread that runs it
+        if _started_pid == os.getpid():
+            return
+        chat_history.create_application_logs()
+        try:
+            prompts.compile_all()
+        except Exception as e:
+            # Chains are built on first use instead
+            print(f"Prompt compilation failed: {e}")
+        try:
+            # Loads the catalog and embeds it now; later snapshots are synced by the refresh thread
+            vector_index.sync_index()
+        except Exception as e:
+            print(f"Vector index warm-up failed: {e}")
+        _started_pid = os.getpid()
+
+@app.before_request
+def ensure_startup():
+    startup()
+
 def json_response(f):
     """Decorator to standardize JSON responses"""
     @wraps(f)
@@ -49,74 +93,69 @@ def json_response(f):
     return wrapper
 
 def initialize_session():
-    """Initialize or retrieve session ID"""
-    if 'session_id' not in session:
-        session['session_id'] = str(uuid.uuid4())
-    return session['session_id']
-
-def get_formatted_chat_history(session_id):
-    """Retrieve and format chat history from database"""
-    db_chat_history = chat_history.get_chat_history(session_id)
+    """Initialize or retrieve session ID (the only session value kept in the cookie)"""
+    return get_session_id()
+
+def get_formatted_chat_history(session_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Retrieve one page of chat history (newest turns before the cursor) for the frontend
+
+    Returns:
+        (messages, next_cursor) - next_cursor is None when there is no older history
+    """
+    page = chat_history.get_chat_history_page(session_id, limit, before)
     messages = []
     
-    if db_chat_history:
-        for record in db_chat_history:
-            if record and isinstance(record, dict):
-                if user_query := record.get("user_query"):
-                    messages.append({"role": "user", "content": user_query})
-                if gpt_response := record.get("gpt_response"):
-                    messages.append({"role": "assistant", "content": gpt_response})
+    for record in page["messages"]:
+        if record and isinstance(record, dict) and record.get("content"):
+            if record.get("role") == "ai":
+                messages.extend(format_history_reply(record["content"], record.get("response_type")))
+            else:
+                messages.append({"role": "user", "content": record["content"], "type": "text"})
     
-    return messages
+    return messages, page["next_cursor"]
+
+PRICE_RECORD_KEYS = {'Dish', 'Variant', 'Size', 'Price', 'Restaurant', 'Availability', 'Restaurant Status', 'Available Time'}
+RESTAURANT_RECORD_KEYS = {'name', 'timings', 'status', 'menuLink', 'categories'}
+
+def format_history_reply(content, response_type):
+    """
+    Frontend messages for a logged reply, typed like the live response was
+    (restaurant cards, tables, order summaries), so history renders the same way
+    """
+    data = None
+    if response_type == "json":
+        try:
+            data = json.loads(content)
+        except (TypeError, ValueError):
+            data = None
+    if isinstance(data, dict) and data.get('status'):
+        formatted = format_order_result(data)
+        if formatted:
+            return formatted['messages']
+        if data.get('message'):
+            return [{"role": "assistant", "content": str(data['message']), "type": "text"}]
+    elif isinstance(data, list) and data and all(isinstance(record, dict) for record in data):
+        keys = set(data[0])
+        if PRICE_RECORD_KEYS <= keys:
+            output_type = "price data"
+        elif keys == RESTAURANT_RECORD_KEYS:
+            output_type = "restaurant data"
+        else:
+            output_type = "table"
+        return format_bot_response(data, output_type)['messages']
+    return [{"role": "assistant", "content": content, "type": "text"}]
 
 def group_by_restaurant(items):
     """Group menu items by restaurant and variant, nesting sizes under each variant"""
-    if not isinstance(items, (list, pd.DataFrame)):
+    if not isinstance(items, list):
         return {}
-
-    # Convert DataFrame to list of dicts if needed
-    items_list = items.to_dict('records') if isinstance(items, pd.DataFrame) else items
-
-    restaurants = {}
-
-    for item in items_list:
-        if not isinstance(item, dict):
-            continue
-
-        restaurant_name = item.get('Restaurant', 'Unknown Restaurant')
-        status = item.get('Restaurant Status', 'Status Unknown')
-        dish = item.get('Dish', 'Unknown Dish')
-        variant = item.get('Variant', 'Unknown Variant')
-        size = item.get('Size', 'Unknown Size')
-
-        # Initialize restaurant entry if not present
-        if restaurant_name not in restaurants:
-            restaurants[restaurant_name] = {
-                'status': status,
-                'dish': dish,
-                'variants': defaultdict(dict)
-            }
-
-        # Prepare size-level data
-        size_info = {
-            'Price': item.get('Price', 'N/A'),
-            'Availability': item.get('Availability', 'Availability unknown'),
-            'Available Time': item.get('Available Time', '')
-        }
-
-        # Assign size info under the appropriate variant
-        restaurants[restaurant_name]['variants'][variant][size] = size_info
-
-    # Convert defaultdicts to regular dicts for JSON compatibility
-    for restaurant in restaurants.values():
-        restaurant['variants'] = dict(restaurant['variants'])
-
-    return restaurants
+    return row_shaping.group_by_restaurant(items)
 
 def process_llm_response(user_input):
     """Process user input with LLM and handle response"""
     try:
-        llm_response = llm.llm_intent_entity(user_input)
+        llm_response = llm.llm_intent_entity(user_input, get_session_id())
         return json.loads(llm_response) if llm_response else {}
     except json.JSONDecodeError as e:
         app.logger.error(f"LLM JSON decode error: {str(e)}")
@@ -147,7 +186,7 @@ def format_bot_response(bot_reply, output_type):
         bot_reply = bot_reply["results"]
     
     # Process the actual data
-    if isinstance(bot_reply, (list, pd.DataFrame)):
+    if isinstance(bot_reply, list):
         if output_type == "price data":
             restaurants = group_by_restaurant(bot_reply)
             if restaurants:
@@ -157,7 +196,7 @@ def format_bot_response(bot_reply, output_type):
                     "type": "restaurant_data"
                 })
         elif output_type == "restaurant data":
-            records = bot_reply.to_dict('records') if isinstance(bot_reply, pd.DataFrame) else bot_reply
+            records = bot_reply
             if records:
                 response_data['messages'].append({
                     "role": "assistant",
@@ -165,7 +204,7 @@ def format_bot_response(bot_reply, output_type):
                     "type": "restaurant_data1"
                 })
         else:
-            records = bot_reply.to_dict('records') if isinstance(bot_reply, pd.DataFrame) else bot_reply
+            records = bot_reply
             if records:
                 response_data['messages'].append({
                     "role": "assistant",
@@ -275,8 +314,85 @@ def is_order_intent(llm_data):
 def index():
     """Main chat interface route"""
     session_id = initialize_session()
-    messages = get_formatted_chat_history(session_id)
-    return render_template('chat.html', messages=messages)
+    # Only the latest page is rendered; older turns are fetched from /chat_history on scroll
+    messages, next_cursor = get_formatted_chat_history(session_id)
+    return render_template('chat.html', messages=messages, next_cursor=next_cursor)
+
+@app.route('/chat_history', methods=['GET'])
+@json_response
+def chat_history_page():
+    """Older chat history for lazy loading: ?before=<cursor>&limit=<turns>"""
+    session_id = session.get('session_id')
+    if not session_id:
+        return {'messages': [], 'next_cursor': None}
+    before = request.args.get('before', type=int)
+    limit = min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), MAX_HISTORY_PAGE_SIZE)
+    messages, next_cursor = get_formatted_chat_history(session_id, before, max(limit, 1))
+    return {'messages': messages, 'next_cursor': next_cursor}
+
+def handle_selection_message(user_input):
+    """Handle a reply while the order flow is awaiting a dish/variant/size selection"""
+    response_data = None
+    try:
+        # Handle user's selection response
+        result = order_request.handle_user_selection_response(user_input)
+        
+        if result.get('status') == 'error':
+            response_data = {
+                'messages': [{
+                    "role": "assistant",
+                    "content": result.get('message', 'Invalid selection'),
+                    "type": "text"
+                }]
+            }
+        else:
+            response_data = format_order_result(result)
+        
+    except Exception as e:
+        app.logger.error(f"Order selection processing error: {str(e)}")
+        # Clear session and fall back to normal processing
+        order_request.clear_selection_session()
+        response_data = {
+            'messages': [{
+                "role": "assistant",
+                "content": "Sorry, there was an error processing your selection. Please try again.",
+                "type": "text"
+            }]
+        }
+    return response_data
+
+def handle_intent_message(llm_data):
+    """Route a classified non-order message to its handler and format the reply"""
+    handler = UserIntentHandler()
+    bot_reply, output_type = handler.route_user_intent(llm_data)
+    return format_bot_response(bot_reply, output_type)
+
+def format_order_result(result):
+    """Frontend messages for an order flow result, or None for a status that has none"""
+    # Correct status mapping
+    if result.get('status') == 'needs_dish_selection':
+        return format_order_selection_response(result['item'], 'dish_option')
+    elif result.get('status') == 'needs_variant':
+        return format_order_selection_response(result['item'], 'variant')
+    elif result.get('status') == 'needs_size':
+        return format_order_selection_response(result['item'], 'size')
+    elif result.get('status') == 'complete':
+        return format_order_complete_response(result)
+    return None
+
+def handle_order_message(llm_data):
+    """Start the order flow for an order intent, falling back to normal routing"""
+    try:
+        result = order_request.preprocess_order_request(llm_data)
+        print(f"Preprocessed result: {result}")
+        formatted = format_order_result(result)
+        if formatted:
+            return formatted
+        return handle_intent_message(llm_data)
+    
+    except Exception as e:
+        app.logger.error(f"Order processing error: {str(e)}")
+        return handle_intent_message(llm_data)
 
 @app.route('/send_message', methods=['POST'])
 @json_response
@@ -286,43 +402,12 @@ def send_message():
     if not user_input:
         return {'error': ERROR_MESSAGES['no_input']}, 400
     
-    session_id = session.get('session_id')
+    initialize_session()
     response_data = None
     
     # Check if we're currently awaiting a selection
     if order_request.is_awaiting_selection():
-        try:
-            # Handle user's selection response
-            result = order_request.handle_user_selection_response(user_input)
-            
-            if result.get('status') == 'error':
-                response_data = {
-                    'messages': [{
-                        "role": "assistant",
-                        "content": result.get('message', 'Invalid selection'),
-                        "type": "text"
-                    }]
-                }
-            elif result.get('status') == 'needs_dish_selection':
-                response_data = format_order_selection_response(result['item'], 'dish_option')
-            elif result.get('status') == 'needs_variant':
-                response_data = format_order_selection_response(result['item'], 'variant')
-            elif result.get('status') == 'needs_size':
-                response_data = format_order_selection_response(result['item'], 'size')
-            elif result.get('status') == 'complete':
-                response_data = format_order_complete_response(result)
-            
-        except Exception as e:
-            app.logger.error(f"Order selection processing error: {str(e)}")
-            # Clear session and fall back to normal processing
-            order_request.clear_selection_session()
-            response_data = {
-                'messages': [{
-                    "role": "assistant",
-                    "content": "Sorry, there was an error processing your selection. Please try again.",
-                    "type": "text"
-                }]
-            }
+        response_data = handle_selection_message(user_input)
     
     # Normal message processing (not awaiting selection)
     if response_data is None:
@@ -332,33 +417,10 @@ def send_message():
                 return {'error': llm_data['error']}, 500
 
             if is_order_intent(llm_data):
-                try:
-                    result = order_request.preprocess_order_request(llm_data)
-                    print(f"Preprocessed result: {result}")
-                    # Correct status mapping
-                    if result.get('status') == 'needs_dish_selection':
-                        response_data = format_order_selection_response(result['item'], 'dish_option')
-                    elif result.get('status') == 'needs_variant':
-                        response_data = format_order_selection_response(result['item'], 'variant')
-                    elif result.get('status') == 'needs_size':
-                        response_data = format_order_selection_response(result['item'], 'size')
-                    elif result.get('status') == 'complete':
-                        response_data = format_order_complete_response(result)
-                    else:
-                        handler = UserIntentHandler()
-                        bot_reply, output_type = handler.route_user_intent(llm_data)
-                        response_data = format_bot_response(bot_reply, output_type)
-                
-                except Exception as e:
-                    app.logger.error(f"Order processing error: {str(e)}")
-                    handler = UserIntentHandler()
-                    bot_reply, output_type = handler.route_user_intent(llm_data)
-                    response_data = format_bot_response(bot_reply, output_type)
+                response_data = handle_order_message(llm_data)
             else:
                 # 👇 Handle non-order messages normally
-                handler = UserIntentHandler()
-                bot_reply, output_type = handler.route_user_intent(llm_data)
-                response_data = format_bot_response(bot_reply, output_type)
+                response_data = handle_intent_message(llm_data)
         
         except Exception as e:
             app.logger.error(f"Message processing error: {str(e)}")
@@ -366,6 +428,76 @@ def send_message():
     
     return response_data
 
+def sse_event(event, data):
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def stream_response_events(response_data):
+    """Events for a formatted reply: partial rows for tabular messages, then the full message"""
+    for msg in response_data.get('messages', []):
+        content = msg.get('content')
+        if msg.get('type') != 'text' and isinstance(content, list):
+            for start in range(0, len(content), STREAM_ROW_CHUNK):
+                yield sse_event('rows', {
+                    'type': msg.get('type'),
+                    'offset': start,
+                    'rows': content[start:start + STREAM_ROW_CHUNK]
+                })
+    yield sse_event('message', response_data)
+
+@app.route('/send_message_stream', methods=['POST'])
+def send_message_stream():
+    """
+    Streaming variant of /send_message using server-sent events.
+
+    Events: `intent` once the message is understood, `rows` with partial
+    table rows, `message` with the same payload /send_message returns,
+    `error`, and finally `done`.
+    """
+    user_input = (request.json or {}).get('message', '').strip()
+    if not user_input:
+        return jsonify({'error': ERROR_MESSAGES['no_input']}), 400
+
+    # The session id is the only cookie value and must be set before headers go out;
+    # order state lives in session_store, so every turn below can stream.
+    initialize_session()
+
+    def events():
+        if order_request.is_awaiting_selection():
+            response_data = handle_selection_message(user_input)
+            if response_data is not None:
+                yield sse_event('message', response_data)
+                return
+
+        llm_data = process_llm_response(user_input)
+        if 'error' in llm_data:
+            yield sse_event('error', {'error': llm_data['error']})
+            return
+
+        yield sse_event('intent', {
+            'category': llm_data.get('category'),
+            'restaurant': llm_data.get('restaurant'),
+            'dish': llm_data.get('dish'),
+            'corrected_input': llm_data.get('corrected_input')
+        })
+        # DB lookups / generated SQL / order resolution run while the client already shows the intent
+        if is_order_intent(llm_data):
+            response_data = handle_order_message(llm_data)
+        else:
+            response_data = handle_intent_message(llm_data)
+        yield from stream_response_events(response_data)
+
+    def generate():
+        # Every failure, including the selection check and the LLM step, ends as an `error` event
+        try:
+            yield from events()
+        except Exception as e:
+            app.logger.error(f"Message processing error: {str(e)}")
+            yield sse_event('error', {'error': ERROR_MESSAGES['server_error']})
+        yield sse_event('done', {})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.route('/cancel_order', methods=['POST'])
 @json_response
 def cancel_order():
@@ -411,5 +543,20 @@ def order_status():
         'message': "No active order process"
     }
 
+@app.route('/stats', methods=['GET'])
+@json_response
+def stats():
+    """Hit/miss counters for the local fast path, the LLM result cache and the log writer"""
+    if not STATS_TOKEN:
+        return {'error': 'Not found'}, 404
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {STATS_TOKEN}'.encode()):
+        return {'error': 'Unauthorized'}, 401
+    return {
+        'fast_path': fast_path.fast_path_stats(),
+        'llm_cache': llm.result_cache.stats(),
+        'log_writer': chat_history.get_log_writer().stats()
+    }
+
 if __name__ == '__main__':
+    startup()
     app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+One long-lived asyncio event loop per worker process.
+
+llm.llm_intent_entity used to wrap asyncio.run(), which creates and tears
+down an event loop on every Flask request. The async LangChain/Groq clients
+bind their HTTP connection pools to the loop they first run on, so nothing
+could be reused across requests. Instead, coroutines from the synchronous
+Flask views are submitted to a single background loop that lives as long as
+the worker: LLM clients keep their connections warm and concurrent chats
+share one I/O thread instead of each spinning up its own loop.
+
+    result = async_runtime.run(some_coroutine(), timeout=30)
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import threading
+
+from process_local import PerProcess
+
+ASYNC_CALL_TIMEOUT = float(os.getenv("ASYNC_CALL_TIMEOUT", "120"))  # seconds
+
+def _start_loop():
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="async-runtime", daemon=True).start()
+    ready.wait()
+    return loop
+
+
+_loop = PerProcess(_start_loop, valid=lambda loop: not loop.is_closed())
+
+
+def get_loop():
+    """
+    Return this process's background event loop, starting it on first use.
+
+    Keyed on the process id so gunicorn workers forked from a preloaded
+    master each start their own loop thread.
+    """
+    return _loop.get()
+
+
+def run(coro, timeout=ASYNC_CALL_TIMEOUT):
+    """
+    Run a coroutine on the background loop and block until it finishes.
+
+    Args:
+        coro: coroutine object
+        timeout: seconds to wait before cancelling it (None waits forever)
+    Returns:
+        the coroutine's result (exceptions are re-raised in the caller)
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def submit(coro):
+    """Schedule a coroutine on the background loop without waiting; returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def shutdown():
+    """Stop the background loop (registered with atexit)."""
+    loop = _loop.current()
+    if loop is None or loop.is_closed():
+        return
+    loop.call_soon_threadsafe(loop.stop)
+    _loop.clear()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,145 @@
+"""
+Time-slot availability bitmaps for the catalog.
+
+Every "is it open / available now" check used to be a per-row
+`CURRENT_TIME BETWEEN start AND end`, which is wrong for windows that cross
+midnight (a 18:00-02:00 restaurant showed as closed at 23:00).
+AvailabilityIndex turns each window into a bitmap over the week:
+SLOTS_PER_DAY quarter-hour slots for each of 7 weekdays, with slot s set
+when the window is open at the slot's start time (start <= slot start < end).
+Windows whose end is before their start continue into the next day's slots
+(Sunday wraps to Monday); equal start and end mean open all day.
+
+Times are answered at quarter-hour resolution: a check at 10:07 uses the
+10:00 slot. Windows on a quarter hour are exact (closing at 22:00 reads
+closed from 22:00); other bounds take effect at the next quarter hour
+(opening at 10:05 reads open from 10:15, closing at 22:10 reads closed
+from 22:15).
+
+For whole-catalog questions the index is also kept transposed: for every
+slot, one integer whose bit i is set when food item i is available (and
+one for items whose restaurant is open), so "what's available now" is a
+single AND over the catalog.
+
+    index = AvailabilityIndex(restaurants, food_items)
+    index.restaurant_open(restaurant, when)
+    index.available_items(when)
+"""
+from datetime import datetime
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES   # 96
+DAYS = 7
+WEEK_SLOTS = SLOTS_PER_DAY * DAYS
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + (1 if value.second or value.microsecond else 0)
+
+
+def slot_of(when):
+    """Week slot (0 .. WEEK_SLOTS-1) containing a datetime."""
+    return when.weekday() * SLOTS_PER_DAY + (when.hour * 60 + when.minute) // SLOT_MINUTES
+
+
+def day_mask(start, end):
+    """
+    Slots of one day covered by a daily window, as (same-day mask, next-day mask).
+
+    A slot is covered when the window is open at its start: start <= slot < end.
+    """
+    if start is None or end is None:
+        return 0, 0
+    first = -(-_minutes(start) // SLOT_MINUTES)     # first slot starting at/after opening
+    last = -(-_minutes(end) // SLOT_MINUTES) - 1    # last slot starting before closing
+    if start == end:
+        return FULL_DAY, 0
+    if start < end:
+        if first > last:
+            return 0, 0
+        return ((1 << (last + 1)) - 1) ^ ((1 << first) - 1), 0
+    # Crosses midnight: opening .. 24:00 today, 00:00 .. closing tomorrow
+    today = FULL_DAY ^ ((1 << first) - 1) if first < SLOTS_PER_DAY else 0
+    tomorrow = (1 << (last + 1)) - 1
+    return today, tomorrow
+
+
+def week_mask(start, end):
+    """Bitmap over WEEK_SLOTS for a window repeated every day of the week."""
+    today, tomorrow = day_mask(start, end)
+    mask = 0
+    for day in range(DAYS):
+        mask |= today << (day * SLOTS_PER_DAY)
+        mask |= tomorrow << (((day + 1) % DAYS) * SLOTS_PER_DAY)
+    return mask
+
+
+def _bits(value):
+    """Indexes of the set bits of an int, lowest first."""
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+
+class AvailabilityIndex:
+    """Per-item / per-restaurant week bitmaps plus per-slot item bitsets."""
+
+    def __init__(self, restaurants, food_items):
+        """
+        Args:
+            restaurants: restaurant rows (restaurant_id, opening_time, closing_time)
+            food_items: food item rows (restaurant_id, available_from, available_until), in a fixed order
+        """
+        self.food_items = tuple(food_items)
+        self.restaurant_masks = {r["restaurant_id"]: week_mask(r["opening_time"], r["closing_time"])
+                                 for r in restaurants}
+        self.item_masks = [week_mask(i["available_from"], i["available_until"]) for i in self.food_items]
+
+        # Transposed: slot -> bitset over item positions. Items are grouped by
+        # identical bitmaps first (menus share a handful of windows), so the
+        # build costs O(distinct windows x slots) rather than O(items x slots).
+        by_item_mask = {}
+        by_restaurant_mask = {}
+        for position, (item, mask) in enumerate(zip(self.food_items, self.item_masks)):
+            bit = 1 << position
+            by_item_mask[mask] = by_item_mask.get(mask, 0) | bit
+            restaurant_mask = self.restaurant_masks.get(item["restaurant_id"], 0)
+            by_restaurant_mask[restaurant_mask] = by_restaurant_mask.get(restaurant_mask, 0) | bit
+
+        self.items_by_slot = [0] * WEEK_SLOTS
+        self.open_items_by_slot = [0] * WEEK_SLOTS
+        for mask, positions in by_item_mask.items():
+            for slot in _bits(mask):
+                self.items_by_slot[slot] |= positions
+        for mask, positions in by_restaurant_mask.items():
+            for slot in _bits(mask):
+                self.open_items_by_slot[slot] |= positions
+
+    def restaurant_open(self, restaurant, when=None):
+        slot = slot_of(when or datetime.now())
+        return bool(self.restaurant_masks.get(restaurant["restaurant_id"], 0) >> slot & 1)
+
+    def item_available(self, position, when=None):
+        """Whether the food item at `position` (in the food_items order) is available."""
+        return bool(self.item_masks[position] >> slot_of(when or datetime.now()) & 1)
+
+    def available_items(self, when=None, restaurant_open=True):
+        """
+        Food items available at `when` (now by default).
+
+        Args:
+            restaurant_open: also require the item's restaurant to be open
+        Returns:
+            list of food item rows, in food_items order
+        """
+        slot = slot_of(when or datetime.now())
+        bits = self.items_by_slot[slot]
+        if restaurant_open:
+            bits &= self.open_items_by_slot[slot]
+        return [self.food_items[position] for position in _bits(bits)]
+
+    def open_restaurant_ids(self, when=None):
+        slot = slot_of(when or datetime.now())
+        return {rid for rid, mask in self.restaurant_masks.items() if mask >> slot & 1}
@@ -0,0 +1,93 @@
+"""
+Throughput benchmark for the chat_history store.
+
+Loads a temporary database with --rows log rows spread over --sessions
+sessions, then measures:
+  - single-row inserts through insert_application_logs (queued to the
+    write-behind logger; the time includes flushing the queue to disk)
+  - history reads through get_chat_history for random sessions
+
+Usage:
+    python benchmarks/bench_chat_history.py --rows 1000000 --sessions 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def bulk_load(conn, rows, sessions, batch=50000):
+    """Fill the table quickly (executemany in large transactions)."""
+    loaded = 0
+    while loaded < rows:
+        n = min(batch, rows - loaded)
+        with conn:
+            conn.executemany(
+                "INSERT INTO application_logs (session_id, user_query, gpt_response, model, response_type) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((random.choice(sessions), "price of kotthu rotti", "[{\"Dish\": \"Kotthu Rotti\"}]", "qwen", "json")
+                 for _ in range(n)))
+        loaded += n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows to preload")
+    parser.add_argument("--sessions", type=int, default=20_000, help="distinct session ids")
+    parser.add_argument("--inserts", type=int, default=20_000, help="single-row inserts to time")
+    parser.add_argument("--reads", type=int, default=5_000, help="get_chat_history calls to time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CHAT_HISTORY_DB"] = os.path.join(tmp, "bench_chat_history.db")
+        os.environ.setdefault("LOG_QUEUE_SIZE", str(args.inserts))  # measure throughput, not drops
+        import chat_history
+        chat_history.create_application_logs()
+        conn = chat_history.get_db_connection()
+
+        sessions = [str(uuid.uuid4()) for _ in range(args.sessions)]
+        start = time.perf_counter()
+        bulk_load(conn, args.rows, sessions)
+        load_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(args.inserts):
+            chat_history.insert_application_logs(random.choice(sessions), f"message {i}", "reply", "qwen", "str")
+        chat_history.flush_logs(timeout=60)
+        insert_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fetched = 0
+        for _ in range(args.reads):
+            fetched += len(chat_history.get_chat_history(random.choice(sessions)))
+        read_s = time.perf_counter() - start
+
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT user_query, gpt_response, response_type FROM application_logs "
+            "WHERE session_id = ? ORDER BY created_at, id", (sessions[0],)).fetchall()
+
+        print(json.dumps({
+            "rows": args.rows + args.inserts,
+            "sessions": args.sessions,
+            "bulk_load_rows_per_s": round(args.rows / load_s),
+            "single_insert_per_s": round(args.inserts / insert_s),
+            "single_insert_ms": round(insert_s / args.inserts * 1000, 4),
+            "log_writer": chat_history.get_log_writer().stats(),
+            "history_reads_per_s": round(args.reads / read_s),
+            "history_read_ms": round(read_s / args.reads * 1000, 4),
+            "messages_per_read": round(fetched / args.reads, 1),
+            "query_plan": [row[-1] for row in plan],
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
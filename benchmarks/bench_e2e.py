@@ -0,0 +1,607 @@
+"""
+Offline end-to-end latency benchmark for the chat endpoints.
+
+Runs the Flask app in-process (app.test_client) with nothing remote:
+  - the catalog is a temporary sqlite database seeded with generated
+    fixture restaurants, dishes, variants, sizes and prices; the menu
+    snapshot is loaded from it through menu_catalog.load_snapshot and
+    general inquiries execute their SQL against it
+  - the LLM clients (llm5 for intent/entities, llm3 for SQL/order
+    extraction) are replaced by deterministic stubs that answer from the
+    generated scenarios after sleeping for a configurable latency
+  - chat history, LLM cache, session store and vector index live in the
+    same temporary directory; Postgres connection attempts fail fast and
+    are counted
+
+Conversations are drawn from a category mix (greeting, menu, price, order,
+general inquiry), part of them phrased so the local fast path answers
+them. Orders omit sizes/variants and answer "1" to every selection prompt
+until the order completes. Each conversation gets its own session and is
+sent to /send_message or /send_message_stream.
+
+Reports latency percentiles (p50/p95/p99) and throughput per endpoint and
+per category, and per stage (fast path, LLM calls, handlers, logging,
+simulated model time). With --output the report is saved as JSON;
+--compare prints the percentile deltas against a saved report, e.g. from
+the previous commit.
+
+Needs the app's requirements (flask, sqlalchemy, langchain_core, dotenv).
+
+Usage:
+    python benchmarks/bench_e2e.py --conversations 300 --concurrency 8 --output e2e.json
+    python benchmarks/bench_e2e.py --chat-latency fixed:ms=0 --sql-latency fixed:ms=0   # app overhead only
+    python benchmarks/bench_e2e.py --compare e2e.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import functools
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CATEGORIES = ("greeting", "menu", "price", "order", "general")
+DEFAULT_MIX = "greeting=15,menu=20,price=25,order=25,general=15"
+SELECTION_PROMPT = "Please enter the number of your choice"
+MAX_SELECTION_TURNS = 4
+PERCENTILES = (50, 95, 99)
+
+RESTAURANTS = ["Kandiah", "Ice Talk", "Bluberry", "Jollybeez", "Mum’s Food"]
+DISHES = ["Kotthu", "Fried Rice", "Biriyani", "Noodles", "Nasi Goreng", "Pasta", "Shawarma", "Rolls",
+          "Devilled", "Soup", "Milk Shakes", "Fresh Juice", "Naan", "Parata", "Hopper", "Ice Cream"]
+VARIANTS = ["Chicken", "Beef", "Mutton", "Egg", "Fish", "Prawn", "Vegetable", "Cheese"]
+SIZES = ["Small", "Medium", "Large"]
+CATEGORIES_BY_DISH = {"Milk Shakes": "Beverages", "Fresh Juice": "Beverages", "Ice Cream": "Desserts",
+                      "Soup": "Starters"}
+
+NULL_ENTITIES = {"restaurant": None, "dish": None, "size": None, "variant": None, "order_qty": None,
+                 "order_restaurant": None, "order_items": None}
+
+
+# -- fixtures ------------------------------------------------------------
+
+def build_catalog(rng, restaurants, dishes_per_restaurant):
+    """Fixture rows: (restaurants, food_items, menu categories)."""
+    names = RESTAURANTS + [f"Outlet {i}" for i in range(len(RESTAURANTS) + 1, restaurants + 1)]
+    restaurant_rows, item_rows, menu_rows = [], [], []
+    for restaurant_id, name in enumerate(names[:restaurants], start=1):
+        # Most restaurants are open around the clock so "available now" has answers
+        closed = rng.random() < 0.2
+        opening, closing = (datetime.time(6, 0), datetime.time(6, 30)) if closed else \
+            (datetime.time(0, 0), datetime.time(23, 59))
+        restaurant_rows.append((restaurant_id, name, opening, closing, f"https://example.com/menu/{restaurant_id}"))
+        for dish in rng.sample(DISHES, min(dishes_per_restaurant, len(DISHES))):
+            menu_rows.append((restaurant_id, CATEGORIES_BY_DISH.get(dish, "Mains")))
+            base = rng.randrange(400, 1600, 50)
+            for variant in rng.sample(VARIANTS, rng.randint(1, 3)):
+                for step, size in enumerate(SIZES[:rng.randint(1, 3)]):
+                    item_rows.append((len(item_rows) + 1, restaurant_id, dish, variant, size,
+                                      base + step * rng.randrange(200, 600, 50), None, None))
+    return restaurant_rows, item_rows, menu_rows
+
+
+def seed_database(path, restaurants, items, menu):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("""CREATE TABLE restaurants (restaurant_id INTEGER PRIMARY KEY, name TEXT,
+                        opening_time TIME, closing_time TIME, menu_link TEXT)""")
+        conn.execute("""CREATE TABLE food_items (id INTEGER PRIMARY KEY, restaurant_id INTEGER, food_name TEXT,
+                        variant TEXT, size TEXT, price NUMERIC, available_from TIME, available_until TIME)""")
+        conn.execute("CREATE TABLE menu (restaurant_id INTEGER, category TEXT)")
+        conn.executemany("INSERT INTO restaurants VALUES (?, ?, ?, ?, ?)",
+                         [(*row[:2], row[2].isoformat(), row[3].isoformat(), row[4]) for row in restaurants])
+        conn.executemany("INSERT INTO food_items VALUES (?, ?, ?, ?, ?, ?, ?, ?)", items)
+        conn.executemany("INSERT INTO menu VALUES (?, ?)", menu)
+    conn.close()
+
+
+def connect_catalog(path):
+    """sqlite connection returning TIME columns as datetime.time, like psycopg2."""
+    sqlite3.register_converter("TIME", lambda value: datetime.time.fromisoformat(value.decode()))
+    return sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+
+
+# -- scenarios -----------------------------------------------------------
+
+def typo(rng, text):
+    """Drop one inner letter (the LLM is expected to correct it)."""
+    letters = [i for i, c in enumerate(text) if c.isalpha() and 0 < i < len(text) - 1]
+    if len(letters) < 4:
+        return text
+    i = rng.choice(letters)
+    return text[:i] + text[i + 1:]
+
+
+class Oracle:
+    """The answers the stub models give, keyed by the message they were generated for."""
+
+    def __init__(self):
+        self.answers = {}
+
+    def add(self, message, category, fallback_response=None, sql=None, **entities):
+        entities = dict(NULL_ENTITIES, corrected_input=message, **entities)
+        self.answers[message.lower()] = {
+            "intent": {"corrected_input": message, "category": category, "fallback_response": fallback_response},
+            "entities": entities,
+            "sql": sql,
+            "order": {"user_query": message, "restaurant_name": entities["order_restaurant"] or "ourselection",
+                      "entities": entities["order_items"] or {}},
+        }
+
+    def answer(self, kind, message):
+        entry = self.answers.get((message or "").strip().lower())
+        if entry is None:
+            if kind == "intent":
+                return json.dumps({"corrected_input": message, "category": "Unknown",
+                                   "fallback_response": "Could you rephrase that?"})
+            return json.dumps(dict(NULL_ENTITIES, corrected_input=message)) if kind == "entities" else "SELECT 1"
+        if kind == "sql":
+            return entry["sql"] or "SELECT 1"
+        return json.dumps(entry[kind], ensure_ascii=False)
+
+
+def make_scenario(rng, category, items, restaurants, oracle, fast_share):
+    """One conversation's first message (registered with the oracle when it needs the LLM)."""
+    fast = rng.random() < fast_share
+    restaurant = rng.choice(restaurants)[1]
+    item = rng.choice(items)
+    _, _, dish, variant, size, price, _, _ = item
+    item_restaurant = next(r[1] for r in restaurants if r[0] == item[1])
+
+    if category == "greeting":
+        if fast:
+            return rng.choice(["hi", "hello", "good morning", "thanks"])
+        message = rng.choice(["hey there, anyone around to help me with food?", "good evening mora, how are you"])
+        oracle.add(message, "Greetings", "Hello! How can I assist you today?")
+        return message
+
+    if category == "menu":
+        if fast:
+            return f"menu of {restaurant}"
+        message = f"what do you have at {typo(rng, restaurant)} today"
+        oracle.add(message, "Restaurant Info & Menu", restaurant=restaurant)
+        return message
+
+    if category == "price":
+        if fast:
+            return f"price of {dish} at {item_restaurant}"
+        if rng.random() < 0.5:
+            message = f"how much would a {size} {variant} {typo(rng, dish)} from {item_restaurant} be"
+            oracle.add(message, "Dish Price Inquiry & Availability", restaurant=item_restaurant, dish=dish,
+                       variant=variant, size=size)
+        else:
+            budget = int(price) + 200
+            message = f"{variant} {dish} under {budget} rupees"
+            oracle.add(message, "Dish Price Inquiry & Availability", dish=dish, variant=variant)
+        return message
+
+    if category == "order":
+        qty = rng.randint(1, 3)
+        # Sizes (and often variants) are left out so the order asks for selections
+        named_variant = variant if rng.random() < 0.5 else None
+        message = f"i want to order {qty} {named_variant or ''} {dish} from {item_restaurant}".replace("  ", " ")
+        oracle.add(message, "Order", restaurant=item_restaurant, dish=dish, variant=named_variant, order_qty=qty,
+                   order_restaurant=item_restaurant,
+                   order_items={"item1": {"dish": dish, "variant": named_variant, "size": None, "qty": qty}})
+        return message
+
+    if rng.random() < 0.4:
+        message = rng.choice(["what food is available now", "which restaurants are open now"])
+        oracle.add(message, "General Inquiry")
+        return message
+    budget = int(price) + 300
+    message = f"which restaurants serve {dish} for less than {budget}"
+    sql = ('SELECT f.food_name AS "Dish", f.size AS "Size", f.price AS "Price", r.name AS "Restaurant" '
+           "FROM food_items f JOIN restaurants r ON r.restaurant_id = f.restaurant_id "
+           f"WHERE f.food_name LIKE '%{dish}%' AND f.price < {budget} ORDER BY f.price")
+    oracle.add(message, "General Inquiry", sql=sql, dish=dish)
+    return message
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in CATEGORIES:
+            raise argparse.ArgumentTypeError(f"unknown category {name!r} (expected one of {', '.join(CATEGORIES)})")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+# -- stub models -----------------------------------------------------------
+
+class Latency:
+    """
+    Seeded latency distribution, in seconds.
+
+    Specs (milliseconds): fixed:ms=500, uniform:low=300,high=900,
+    lognormal:median=700,sigma=0.35
+    """
+
+    def __init__(self, spec, seed):
+        kind, _, params = spec.partition(":")
+        self.spec = spec
+        self.kind = kind
+        self.params = {k: float(v) for k, v in (p.split("=") for p in params.split(",") if p)}
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise argparse.ArgumentTypeError(f"unknown latency distribution {spec!r}")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        p = self.params
+        with self._lock:
+            if self.kind == "fixed":
+                ms = p.get("ms", 0.0)
+            elif self.kind == "uniform":
+                ms = self._rng.uniform(p["low"], p["high"])
+            else:
+                ms = p["median"] * self._rng.lognormvariate(0.0, p.get("sigma", 0.3))
+        return ms / 1000
+
+
+def make_chat_model(oracle, latency, recorder):
+    """llm5 stand-in: a LangChain chat model, so the real prompt | model | parser chains run."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    def respond(messages, delay):
+        kind = "entities" if "Entity Extraction" in messages[0].content else "intent"
+        recorder.add(f"model.{kind}", delay)
+        content = oracle.answer(kind, messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    class OfflineChatModel(BaseChatModel):
+        @property
+        def _llm_type(self):
+            return "offline-benchmark"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            delay = latency.sample()
+            time.sleep(delay)
+            return respond(messages, delay)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            delay = latency.sample()
+            await asyncio.sleep(delay)
+            return respond(messages, delay)
+
+    return OfflineChatModel()
+
+
+class OfflineGroq:
+    """llm3 stand-in: client.chat.completions.create(...) for the SQL and order prompts."""
+
+    _QUESTION_RE = re.compile(r"Here is the question:\s*\n(.*)")
+
+    def __init__(self, oracle, latency, recorder):
+        self.oracle = oracle
+        self.latency = latency
+        self.recorder = recorder
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        match = self._QUESTION_RE.search(prompt)
+        if match:
+            kind, question = "sql", match.group(1)
+        else:
+            kind, question = "order", prompt.rstrip().splitlines()[-1]
+        delay = self.latency.sample()
+        time.sleep(delay)
+        self.recorder.add(f"model.{kind}", delay)
+        content = self.oracle.answer(kind, question.strip())
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# -- measurement -----------------------------------------------------------
+
+class Recorder:
+    """Thread-safe lists of durations (seconds) per stage."""
+
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.stages.setdefault(stage, []).append(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+
+
+def instrument(owner, name, stage, recorder):
+    """Replace owner.name with a wrapper that records its wall time under `stage`."""
+    original = getattr(owner, name)
+    if asyncio.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                recorder.add(stage, time.perf_counter() - start)
+    else:
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                recorder.add(stage, time.perf_counter() - start)
+    setattr(owner, name, timed)
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile of sorted values."""
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(durations, wall=None, errors=0):
+    values = sorted(durations)
+    summary = {"count": len(values), "errors": errors}
+    if values:
+        summary["mean_ms"] = round(sum(values) / len(values) * 1000, 3)
+        for q in PERCENTILES:
+            summary[f"p{q}_ms"] = round(percentile(values, q) * 1000, 3)
+        summary["max_ms"] = round(values[-1] * 1000, 3)
+    if wall:
+        summary["throughput_rps"] = round(len(values) / wall, 2)
+    return summary
+
+
+# -- driver ----------------------------------------------------------------
+
+def send(client, endpoint, message):
+    """POST one message. Returns (status, reply text, first-event seconds or None)."""
+    start = time.perf_counter()
+    if endpoint == "/send_message_stream":
+        response = client.post(endpoint, json={"message": message}, buffered=False)
+        chunks, first = [], None
+        for chunk in response.response:
+            if first is None:
+                first = time.perf_counter() - start
+            chunks.append(chunk if isinstance(chunk, str) else chunk.decode("utf-8"))
+        response.close()
+        body = "".join(chunks)
+        ok = response.status_code == 200 and "event: error" not in body
+        return (response.status_code if ok else 500), body, first
+    response = client.post(endpoint, json={"message": message})
+    return response.status_code, response.get_data(as_text=True), None
+
+
+def run_conversation(app, scenario, results):
+    """First message plus any selection replies, each timed as one request."""
+    category, endpoint, message = scenario
+    client = app.test_client()  # own cookie jar -> own session
+    turn = "first"
+    for _ in range(MAX_SELECTION_TURNS + 1):
+        start = time.perf_counter()
+        status, body, first = send(client, endpoint, message)
+        results.append({"category": category, "endpoint": endpoint, "turn": turn, "status": status,
+                        "seconds": time.perf_counter() - start, "first_event": first})
+        if status != 200 or SELECTION_PROMPT not in body:
+            return
+        message, turn = "1", "selection"
+
+
+def run_all(app, scenarios, concurrency):
+    results = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda scenario: run_conversation(app, scenario, results), scenarios))
+    return results, time.perf_counter() - start
+
+
+def report_groups(results, key, wall):
+    groups = {}
+    for result in results:
+        groups.setdefault(key(result), []).append(result)
+    return {name: summarize([r["seconds"] for r in rows], wall, sum(r["status"] != 200 for r in rows))
+            for name, rows in sorted(groups.items())}
+
+
+def compare(report, baseline):
+    """Percentile deltas (ms and %) of every endpoint/category/stage present in both reports."""
+    deltas = {}
+    for section in ("endpoints", "categories", "stages"):
+        for name, current in report.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            row = {}
+            for q in PERCENTILES:
+                field = f"p{q}_ms"
+                if field in current and previous.get(field):
+                    row[field] = {"before": previous[field], "after": current[field],
+                                  "change_pct": round((current[field] / previous[field] - 1) * 100, 1)}
+            if row:
+                deltas[f"{section}/{name}"] = row
+    return deltas
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_environment(tmp, args):
+    """Point every local store at the temporary directory (read by the modules at import)."""
+    os.environ["CHAT_HISTORY_DB"] = os.path.join(tmp, "chat_history.db")
+    os.environ["SESSION_STORE_DB"] = os.path.join(tmp, "sessions.db")
+    os.environ["VECTOR_INDEX_DB"] = os.path.join(tmp, "vectors.db")
+    os.environ["LLM_CACHE_DB"] = "" if args.no_llm_cache else os.path.join(tmp, "llm_cache.db")
+    if args.no_llm_cache:
+        os.environ["LLM_CACHE_SIZE"] = "0"
+    os.environ["CATALOG_REFRESH_INTERVAL"] = "0"  # the fixture snapshot is never reloaded
+    os.environ["postgres_creds"] = "sqlite:///" + os.path.join(tmp, "catalog.db")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=300, help="measured conversations")
+    parser.add_argument("--warmup", type=int, default=20, help="conversations run before measuring")
+    parser.add_argument("--concurrency", type=int, default=8, help="conversations in flight")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help="category weights")
+    parser.add_argument("--fast-share", type=float, default=0.5,
+                        help="share of greeting/menu/price messages phrased for the local fast path")
+    parser.add_argument("--stream-share", type=float, default=0.25,
+                        help="share of conversations sent to /send_message_stream")
+    parser.add_argument("--chat-latency", default="lognormal:median=700,sigma=0.35",
+                        help="intent/entity model latency (fixed:ms=, uniform:low=,high=, lognormal:median=,sigma=)")
+    parser.add_argument("--sql-latency", default="lognormal:median=900,sigma=0.4",
+                        help="SQL/order model (llm3) latency, same format")
+    parser.add_argument("--restaurants", type=int, default=8)
+    parser.add_argument("--dishes", type=int, default=10, help="dishes per restaurant")
+    parser.add_argument("--no-llm-cache", action="store_true", help="disable the LLM result cache")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's console output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chat_latency = Latency(args.chat_latency, args.seed)
+    sql_latency = Latency(args.sql_latency, args.seed + 1)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(tmp, args)
+        restaurants, items, menu = build_catalog(rng, args.restaurants, args.dishes)
+        catalog_path = os.path.join(tmp, "catalog.db")
+        seed_database(catalog_path, restaurants, items, menu)
+
+        import app as app_module
+        import chat_history
+        import candidates
+        import conversation_context
+        import db_config
+        import fast_path
+        import general_inquiry
+        import llm
+        import llm_order
+        import menu_catalog
+        import vector_index
+        from user_intent_handler import UserIntentHandler
+
+        postgres_attempts = []
+
+        def no_postgres():
+            postgres_attempts.append(1)
+            raise RuntimeError("offline benchmark: Postgres is not available")
+
+        db_config._connect = no_postgres
+
+        recorder = Recorder()
+        oracle = Oracle()
+        llm._clients["llm5"] = make_chat_model(oracle, chat_latency, recorder)
+        llm._clients["llm3"] = OfflineGroq(oracle, sql_latency, recorder)
+
+        conn = connect_catalog(catalog_path)
+        menu_catalog.get_catalog().set_snapshot(menu_catalog.load_snapshot(conn))
+        conn.close()
+        engine = general_inquiry.get_engine()
+        # SCHEMA_VERSION_QUERY is Postgres-only; the fixture schema never changes
+        general_inquiry._schema_cache.update(schema=general_inquiry.fetch_schema_from_db(engine),
+                                             version="fixture", checked_at=float("inf"))
+
+        for owner, name, stage in (
+            (app_module, "process_llm_response", "understand"),
+            (fast_path, "classify", "fast_path"),
+            (conversation_context, "get_context_window", "context_window"),
+            (candidates, "for_message", "candidates"),
+            (llm, "get_intent_classification", "llm.intent"),
+            (llm, "get_entity_extraction", "llm.entities"),
+            (llm_order, "llm_order", "llm.order"),
+            (app_module, "handle_intent_message", "route"),
+            (app_module, "handle_order_message", "order.start"),
+            (app_module, "handle_selection_message", "order.selection"),
+            (UserIntentHandler, "handle_menu_request", "route.menu"),
+            (UserIntentHandler, "handle_price_inquiry", "route.price"),
+            (UserIntentHandler, "handle_general_inquiry", "route.general"),
+            (vector_index, "search_items", "vector_search"),
+            (chat_history, "insert_application_logs", "log"),
+        ):
+            instrument(owner, name, stage, recorder)
+
+        categories = list(args.mix)
+        weights = [args.mix[name] for name in categories]
+        scenarios = []
+        for _ in range(args.warmup + args.conversations):
+            category = rng.choices(categories, weights)[0]
+            endpoint = "/send_message_stream" if rng.random() < args.stream_share else "/send_message"
+            scenarios.append((category, endpoint,
+                              make_scenario(rng, category, items, restaurants, oracle, args.fast_share)))
+
+        app = app_module.app
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            app_module.startup()
+            run_all(app, scenarios[:args.warmup], args.concurrency)
+            chat_history.flush_logs()
+            recorder.reset()
+            results, wall = run_all(app, scenarios[args.warmup:], args.concurrency)
+            chat_history.flush_logs()
+            app_module.STATS_TOKEN = "bench"
+            stats = app.test_client().get("/stats", headers={"Authorization": "Bearer bench"}).get_json()
+
+    firsts = [r["first_event"] for r in results if r["first_event"] is not None]
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "conversations": args.conversations, "warmup": args.warmup, "concurrency": args.concurrency,
+            "mix": args.mix, "fast_share": args.fast_share, "stream_share": args.stream_share,
+            "chat_latency": args.chat_latency, "sql_latency": args.sql_latency,
+            "restaurants": args.restaurants, "food_items": len(items), "llm_cache": not args.no_llm_cache,
+            "seed": args.seed,
+        },
+        "wall_s": round(wall, 3),
+        "requests": len(results),
+        "throughput_rps": round(len(results) / wall, 2),
+        "endpoints": report_groups(results, lambda r: r["endpoint"], wall),
+        "categories": report_groups(results, lambda r: f'{r["category"]}/{r["turn"]}', wall),
+        "stages": {stage: summarize(durations) for stage, durations in sorted(recorder.stages.items())},
+        "stream_first_event": summarize(firsts),
+        "postgres_attempts": len(postgres_attempts),
+        "app_stats": stats,
+    }
+    if baseline is not None:
+        report["comparison"] = {"baseline_revision": baseline.get("revision"), "deltas": compare(report, baseline)}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Micro-benchmark: per-request prompt preparation, before and after the
+prompt registry (prompts.py).
+
+For each prompt, reports CPU time (time.process_time) and peak traced
+allocation (tracemalloc) per request:
+  - order:    llm_order's example list + str.format of the whole template per order
+              vs. prompts.render("order", question=...)
+  - sql:      str.format of general_inquiry's SQL template vs. prompts.render("sql", ...)
+  - intent / entities: ChatPromptTemplate.from_messages + format_messages per call vs.
+              format_messages on the template compiled once (skipped when
+              langchain_core is not installed)
+
+The model round-trip is the same in both versions and is not measured.
+
+Usage:
+    python benchmarks/bench_prompts.py --repeat 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import prompts  # noqa: E402
+import llm_order  # noqa: E402
+import general_inquiry  # noqa: E402
+
+QUESTION = "can i get two medium chicken kotthu and one egg fried rice from kandiah"
+HISTORY = []
+SQL_ENTITIES = {"corrected_input": QUESTION, "restaurant": "kandiah", "dish": "kotthu",
+                "variant": "chicken", "size": "medium"}
+SCHEMA = "restaurants(restaurant_id, name, opening_time, closing_time, menu_link)\n" \
+         "food_items(food_id, restaurant_id, food_name, variant, size, price, available_from, available_until)"
+CANDIDATES = {"restaurant_candidates": "Kandiah, ourselection",
+              "dish_candidates": "['Kotthu', 'Kotthu Rotti', 'Fried Rice']"}
+
+# The old llm_order built this list literal inside the function on every call
+_EXAMPLES_CODE = compile(repr(llm_order.ORDER_EXAMPLES), "<order examples>", "eval")
+
+
+def cpu_us(fn, repeat):
+    fn()  # warm up
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def peak_alloc_bytes(fn, repeat=50):
+    """Highest transient allocation of a single call."""
+    fn()
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return max(peaks)
+
+
+def cases():
+    order_template = llm_order.ORDER_EXTRACTION_TEMPLATE
+    sql_template = general_inquiry.sql_prompt_template
+    result = {
+        "order": (
+            lambda: order_template.format(example=eval(_EXAMPLES_CODE), question=QUESTION, **CANDIDATES),
+            lambda: prompts.render("order", question=QUESTION, **CANDIDATES),
+        ),
+        "sql": (
+            lambda: sql_template.format(entities=SQL_ENTITIES, schema=SCHEMA, question=QUESTION,
+                                        additional_context=""),
+            lambda: prompts.render("sql", entities=SQL_ENTITIES, schema=SCHEMA, question=QUESTION,
+                                   additional_context=""),
+        ),
+    }
+    try:
+        import langchain_core  # noqa: F401
+    except ImportError:
+        return result, "langchain_core not installed"
+
+    for name in ("intent", "entities"):
+        prompt = prompts.get(name)
+        compiled = prompt.build_template()
+        variables = dict(CANDIDATES, user_input=QUESTION, chat_history=HISTORY)
+        result[name] = (
+            lambda prompt=prompt, variables=variables: prompt.build_template().format_messages(**variables),
+            lambda compiled=compiled, variables=variables: compiled.format_messages(**variables),
+        )
+    return result, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per CPU measurement")
+    args = parser.parse_args()
+
+    benchmarks, skipped = cases()
+    report = {"repeat": args.repeat, "versions": {name: prompts.version(name) for name in benchmarks}}
+    for name, (before, after) in benchmarks.items():
+        assert before() == after() or name in ("intent", "entities"), f"{name}: rendered prompts differ"
+        report[name] = {
+            "before_cpu_us": round(cpu_us(before, args.repeat), 2),
+            "after_cpu_us": round(cpu_us(after, args.repeat), 2),
+            "before_peak_alloc_kib": round(peak_alloc_bytes(before) / 1024, 1),
+            "after_peak_alloc_kib": round(peak_alloc_bytes(after) / 1024, 1),
+        }
+        report[name]["cpu_speedup"] = round(report[name]["before_cpu_us"] / max(report[name]["after_cpu_us"], 1e-9), 1)
+    if skipped:
+        report["intent/entities"] = skipped
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Micro-benchmark: row_shaping vs. the previous pandas-based result shaping.
+
+Times, per call, for --rows synthetic rows:
+  - price rows -> records   (UserIntentHandler._process_dataframe_price)
+  - menu rows  -> one record per restaurant with categories
+                            (UserIntentHandler._process_dataframe_restaurant)
+  - generic SQL rows -> records (general_inquiry.execute_sql)
+  - price records -> restaurant/variant/size grouping (app.group_by_restaurant)
+
+The pandas variants are the old code paths, copied here; they are skipped
+when pandas is not installed.
+
+Usage:
+    python benchmarks/bench_row_shaping.py --rows 20 --repeat 2000
+
+Results (CPython 3, pandas 3.0.6, microseconds per call, row_shaping / pandas):
+
+                         --rows 20              --rows 200
+    price_records        97 / 973    (10x)      610 / 1776   (2.9x)
+    restaurant_records   26 / 5222   (203x)     130 / 7662   (59x)
+    sql_records          106 / 1018  (9.6x)     574 / 2167   (3.8x)
+    group_by_restaurant  24 / 1674   (71x)      199 / 3579   (18x)
+
+Importing pandas alone took 410-460 ms. Both paths produce the same records,
+except that pandas 3 renders Decimal prices as strings ('2966') where
+row_shaping gives floats (2966.0).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import timeit
+from collections import defaultdict
+from datetime import time as dtime
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import row_shaping  # noqa: E402
+
+PRICE_COLUMNS = ['Dish', 'Variant', 'Size', 'Price', 'Restaurant', 'Availability', 'Restaurant Status', 'Available Time']
+MENU_COLUMNS = ['name', 'timings', 'status', 'menuLink', 'categories']
+
+
+def make_rows(n, seed):
+    rng = random.Random(seed)
+    restaurants = [f"Restaurant {i}" for i in range(max(1, n // 5))]
+    price_rows = [(
+        rng.choice(["Kottu", "Fried Rice", "Hoppers"]), rng.choice(["chicken", "beef", "egg", None]),
+        rng.choice(["small", "large", None]), Decimal(rng.randint(300, 3000)), rng.choice(restaurants),
+        rng.choice(["Available Now", "Not Available Now"]), rng.choice(["Open Now", "Closed Now"]), "10:00 - 22:00",
+    ) for _ in range(n)]
+    menu_rows = [{
+        "name": name, "timings": "10:00-22:00", "status": "Open", "menuLink": f"https://menu/{i}",
+        "categories": category,
+    } for i, name in enumerate(restaurants) for category in ("Rice", "Kottu", "Drinks", "Rice", "Short Eats")][:max(n, 5)]
+    sql_keys = ["Dish", "Price", "Restaurant", "Available From"]
+    sql_rows = [(r[0], r[3], r[4], dtime(10, 0)) for r in price_rows]
+    return price_rows, menu_rows, sql_keys, sql_rows
+
+
+# -- previous implementations (pandas) ---------------------------------------
+
+def pandas_price(pd, rows):
+    df = pd.DataFrame(rows, columns=PRICE_COLUMNS)
+    json_data = df.to_json(orient="records")
+    return json.loads(json_data)
+
+
+def pandas_restaurant(pd, rows):
+    df = pd.DataFrame(rows, columns=MENU_COLUMNS)
+    df_categories = df.groupby("name")["categories"].agg(lambda x: list(set(x))).reset_index()
+    df = df.drop(columns=["categories"]).drop_duplicates()
+    df = df.merge(df_categories, on="name", how="left")
+    df = df.drop_duplicates(subset=["name", "timings", "status", "menuLink"])
+    return json.loads(df.to_json(orient="records"))
+
+
+def pandas_sql(pd, keys, rows):
+    df = pd.DataFrame(rows, columns=keys)
+    return json.loads(df.to_json(orient="records"))
+
+
+def pandas_group(pd, items):
+    items_list = items.to_dict('records') if isinstance(items, pd.DataFrame) else items
+    restaurants = {}
+    for item in items_list:
+        name = item.get('Restaurant', 'Unknown Restaurant')
+        if name not in restaurants:
+            restaurants[name] = {'status': item.get('Restaurant Status'), 'dish': item.get('Dish'),
+                                 'variants': defaultdict(dict)}
+        restaurants[name]['variants'][item.get('Variant')][item.get('Size')] = {
+            'Price': item.get('Price'), 'Availability': item.get('Availability'),
+            'Available Time': item.get('Available Time')}
+    for restaurant in restaurants.values():
+        restaurant['variants'] = dict(restaurant['variants'])
+    return restaurants
+
+
+def bench(fn, repeat):
+    fn()  # warm up
+    return timeit.timeit(fn, number=repeat) / repeat * 1e6  # microseconds per call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20, help="rows per result set")
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    price_rows, menu_rows, sql_keys, sql_rows = make_rows(args.rows, args.seed)
+    price_records = row_shaping.records(price_rows, PRICE_COLUMNS)
+
+    cases = {
+        "price_records": lambda: row_shaping.records(price_rows, PRICE_COLUMNS),
+        "restaurant_records": lambda: row_shaping.restaurant_records(menu_rows),
+        "sql_records": lambda: row_shaping.records(sql_rows, sql_keys),
+        "group_by_restaurant": lambda: row_shaping.group_by_restaurant(price_records),
+    }
+    results = {"rows": args.rows, "repeat": args.repeat, "row_shaping_us": {}, "pandas_us": None}
+    for name, fn in cases.items():
+        results["row_shaping_us"][name] = round(bench(fn, args.repeat), 2)
+
+    try:
+        start = time.perf_counter()
+        import pandas as pd
+        results["pandas_import_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    except ImportError:
+        pd = None
+        results["pandas_us"] = "pandas not installed"
+
+    if pd is not None:
+        legacy = {
+            "price_records": lambda: pandas_price(pd, price_rows),
+            "restaurant_records": lambda: pandas_restaurant(pd, menu_rows),
+            "sql_records": lambda: pandas_sql(pd, sql_keys, sql_rows),
+            "group_by_restaurant": lambda: pandas_group(pd, pd.DataFrame(price_records)),
+        }
+        results["pandas_us"] = {name: round(bench(fn, args.repeat), 2) for name, fn in legacy.items()}
+        results["speedup"] = {name: round(results["pandas_us"][name] / results["row_shaping_us"][name], 1)
+                              for name in cases}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Cold-start benchmark for the web workers.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters, reports
+the wall time, the slowest imports (cumulative) and which heavy packages
+were loaded eagerly, and fails (exit code 1) when the median import time
+exceeds --budget-ms or a package listed in --forbid is imported.
+
+Usage:
+    python benchmarks/bench_startup.py --budget-ms 1500 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Should only be imported by the code path that needs them, never by `import app`
+HEAVY_PACKAGES = ("pandas", "sqlalchemy", "langchain", "langchain_core", "langchain_groq",
+                  "langchain_openai", "groq", "psycopg2", "mysql")
+
+
+def parse_importtime(stderr):
+    """-X importtime lines ("import time: <self us> | <cumulative us> | <module>") -> {module: cumulative us}"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative
+
+
+def run_once(module):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    return proc.returncode, wall_ms, proc.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="max median import time (ms)")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--forbid", default=",".join(HEAVY_PACKAGES),
+                        help="comma-separated packages that must not be imported eagerly")
+    args = parser.parse_args()
+
+    walls, import_ms, last = [], [], {}
+    for _ in range(args.runs):
+        code, wall_ms, stderr = run_once(args.module)
+        if code != 0:
+            print(stderr[-4000:], file=sys.stderr)
+            sys.exit(f"import {args.module} failed (exit {code})")
+        last = parse_importtime(stderr)
+        walls.append(wall_ms)
+        import_ms.append(last.get(args.module, 0) / 1000)
+
+    forbidden = [name for name in args.forbid.split(",") if name and name in last]
+    median_ms = statistics.median(import_ms)
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_ms_median": round(median_ms, 1),
+        "interpreter_wall_ms_median": round(statistics.median(walls), 1),
+        "budget_ms": args.budget_ms,
+        "eager_heavy_imports": forbidden,
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in
+                               sorted(last.items(), key=lambda kv: kv[1], reverse=True)[:args.top]},
+    }
+    print(json.dumps(report, indent=2))
+
+    if median_ms > args.budget_ms or forbidden:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Restaurant and dish candidates for one message, injected into LLM prompts.
+
+The entity-extraction and order prompts used to carry the whole restaurant
+and dish lists on every request, so their size (input tokens, latency, cost)
+grew with the menu. Instead, the names that actually occur in the message
+(typos included) are looked up in the vocabulary's trigram indexes and only the
+top-k are pasted into the prompt. Recent user turns fill the remaining
+slots, so follow-ups like "make it large" still see the dish from before.
+
+Short names (under CANDIDATE_SHORT_NAME chars) only count as mentioned when
+they occur as a whole word: their few trigrams match by accident (" fr" from
+"from" is two thirds of "fry"). Slots left over after the mentions are
+filled with the names nearest to each word of the message, so a badly
+misspelled dish ("kotu") still puts its real name in front of the model.
+When nothing matches at all (e.g. a dish named in Tanglish/Singlish) the
+full list is used as long as it has at most CANDIDATE_FALLBACK_MAX names.
+"""
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+import vocabulary
+
+CANDIDATE_RESTAURANTS = int(os.getenv("CANDIDATE_RESTAURANTS", "4"))
+CANDIDATE_DISHES = int(os.getenv("CANDIDATE_DISHES", "10"))
+CANDIDATE_FALLBACK_MAX = int(os.getenv("CANDIDATE_FALLBACK_MAX", "60"))  # full list when nothing matches
+CANDIDATE_THRESHOLD = 0.5   # share of a name's trigrams that must occur in the message
+CANDIDATE_HISTORY_TURNS = 2  # earlier user messages searched for the remaining slots
+CANDIDATE_SHORT_NAME = 5     # names shorter than this must appear as a whole word
+CANDIDATE_MIN_TOKEN = 3      # message words shorter than this are not searched for fill-ins
+DEFAULT_RESTAURANT = "ourselection"
+
+
+class Candidates(namedtuple("Candidates", ["restaurants", "dishes"])):
+    """Display names to offer the model, best match first."""
+
+    @property
+    def key(self):
+        """Short hash for cache keys (the same message can get other candidates after a catalog refresh)."""
+        payload = "\x1f".join(self.restaurants) + "\x1e" + "\x1f".join(self.dishes)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def prompt_variables(self):
+        """Values for the {restaurant_candidates} / {dish_candidates} prompt placeholders."""
+        return {
+            "restaurant_candidates": ", ".join(self.restaurants),
+            "dish_candidates": str(list(self.dishes)),
+        }
+
+
+def _mentioned(name, text):
+    """Whether a mention of `name` in `text` is trustworthy (long names always are)."""
+    if len(name) >= CANDIDATE_SHORT_NAME:
+        return True
+    return re.search(rf"(?<!\w){re.escape(name)}(?!\w)", " ".join(text.lower().split())) is not None
+
+
+def _nearest(index, text, k):
+    """Names nearest to any single word of `text`, best score first."""
+    scores = {}
+    for token in set(re.findall(r"[^\W\d_]+", text.lower())):
+        if len(token) < CANDIDATE_MIN_TOKEN:
+            continue
+        for name, score in index.search(token, k=k):
+            scores[name] = max(score, scores.get(name, 0))
+    return sorted(scores, key=lambda name: (-scores[name], len(name), name))
+
+
+def _top(names, index, texts, k):
+    """Display names of the top-k `names` mentioned in `texts` (earlier texts first), then the nearest ones."""
+    picked = []
+
+    def add(name):
+        display = names.get(name)
+        if display is not None and display not in picked:
+            picked.append(display)
+
+    for text in texts:
+        for name, _ in index.mentions(text, k=k, threshold=CANDIDATE_THRESHOLD):
+            if _mentioned(name, text):
+                add(name)
+        if len(picked) >= k:
+            return picked[:k]
+    if not picked and len(names) <= CANDIDATE_FALLBACK_MAX:
+        return list(names.values())
+    for text in texts:
+        for name in _nearest(index, text, k):
+            add(name)
+        if len(picked) >= k:
+            break
+    return picked[:k]
+
+
+def _history_texts(history):
+    """The latest user messages of a conversation_context window, newest first."""
+    texts = [message.get("content") for message in reversed(history or [])
+             if message.get("role") == "human"]
+    return texts[:CANDIDATE_HISTORY_TURNS]
+
+
+def for_message(text, history=None, restaurants_k=CANDIDATE_RESTAURANTS, dishes_k=CANDIDATE_DISHES):
+    """
+    Candidates for a message.
+
+    Args:
+        text: the user's message
+        history: optional conversation_context window; earlier user turns fill remaining slots
+        restaurants_k / dishes_k: maximum number of names of each kind
+    Returns:
+        Candidates; restaurants always end with DEFAULT_RESTAURANT
+    """
+    vocab = vocabulary.get_vocabulary()
+    texts = [text or ""] + _history_texts(history)
+    restaurants = [name for name in _top(vocab.restaurants, vocab.restaurant_index, texts, restaurants_k)
+                   if name != DEFAULT_RESTAURANT]
+    dishes = _top(vocab.dishes, vocab.dish_index, texts, dishes_k)
+    return Candidates(tuple(restaurants + [DEFAULT_RESTAURANT]), tuple(dishes))
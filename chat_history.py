@@ -1,14 +1,76 @@
+import atexit
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
+from process_local import PerProcess
+
+
+DB_NAME = os.getenv("CHAT_HISTORY_DB", "chat_history_foodstation.db")
+
+# Applied to every connection. WAL lets readers run alongside the writer and
+# turns each commit into an append instead of a rollback-journal rewrite;
+# synchronous=NORMAL is durable across application crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",      # 16 MB page cache
+    "PRAGMA mmap_size=134217728",    # 128 MB memory-mapped reads
+    "PRAGMA busy_timeout=5000",
+)
+
+# (user_version, statements) applied in order by create_application_logs()
+MIGRATIONS = (
+    (1, ("CREATE INDEX IF NOT EXISTS idx_application_logs_session_created "
+         "ON application_logs (session_id, created_at)",)),
+)
+
+# Write-behind logging: rows are queued and written in batches by a background thread
+LOG_WRITE_BEHIND = os.getenv("LOG_WRITE_BEHIND", "1") != "0"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))         # records buffered before backpressure
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))           # max records per transaction
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.05"))  # max seconds a record waits
+LOG_ENQUEUE_TIMEOUT = float(os.getenv("LOG_ENQUEUE_TIMEOUT", "0"))   # seconds to block when full; 0 drops
+
+# response_type of rows that record something that happened during a turn (a selection,
+# an intermediate notice) rather than the reply itself; left out of the LLM context
+EVENT_RESPONSE_TYPE = "event"
+
+INSERT_LOG_SQL = ('INSERT INTO application_logs (session_id, user_query, gpt_response, model, response_type, created_at) '
+                  'VALUES (?, ?, ?, ?, ?, ?)')
+
+_local = threading.local()
+_log_listeners = []
 
-DB_NAME = "chat_history_foodstation.db"
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
+    """Persistent connection for the calling thread (reopened after fork or a DB_NAME change)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid() or _local.db_name != DB_NAME:
+        conn = sqlite3.connect(DB_NAME, timeout=5)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.db_name = DB_NAME
     return conn
 
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, statements in MIGRATIONS:
+        if version < target:
+            with conn:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+            version = target
+
 def create_application_logs():
     conn = get_db_connection()
     conn.execute('''CREATE TABLE IF NOT EXISTS application_logs
@@ -19,27 +81,246 @@ def create_application_logs():
     model TEXT,
     response_type TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    conn.close()
+    conn.commit()
+    _migrate(conn)
+
+class LogWriter:
+    """
+    Background writer for application_logs.
+
+    Records go into a bounded in-memory queue and a single thread writes
+    them in one transaction per batch, flushing when LOG_BATCH_SIZE records
+    are waiting or LOG_FLUSH_INTERVAL has passed. When the queue is full,
+    submit() blocks for up to LOG_ENQUEUE_TIMEOUT seconds (backpressure)
+    and then drops the record, counting it in stats()["dropped"].
+    """
+
+    _STOP = object()
+
+    def __init__(self, queue_size=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL, enqueue_timeout=LOG_ENQUEUE_TIMEOUT):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+        self._thread.start()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def submit(self, record):
+        """Queue one row tuple; returns False if it had to be dropped."""
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(record, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            stop = item is self._STOP
+            batch = [] if stop else [item]
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        conn = get_db_connection()
+        try:
+            with conn:
+                conn.executemany(INSERT_LOG_SQL, batch)
+            self._count("written", len(batch))
+            self._count("batches")
+            return
+        except sqlite3.Error as e:
+            print(f"Chat history batch write error, retrying {len(batch)} records one by one: {e}")
+            self._count("errors")
+
+        # One bad record must not take the rest of the batch with it
+        written = 0
+        for record in batch:
+            try:
+                with conn:
+                    conn.execute(INSERT_LOG_SQL, record)
+                written += 1
+            except sqlite3.Error as e:
+                print(f"Chat history write error (1 record lost): {e}")
+                self._count("dropped")
+        self._count("written", written)
+        self._count("batches")
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued record has been written (or timeout seconds pass)."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Flush outstanding records and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+_writer = PerProcess(LogWriter)
+
+
+def get_log_writer():
+    """This process's LogWriter, started on first use (and again after fork)."""
+    return _writer.get()
+
+
+def flush_logs(timeout=5.0):
+    """Block until queued log records are on disk."""
+    writer = _writer.current()
+    if writer is not None:
+        return writer.flush(timeout)
+    return True
+
+
+@atexit.register
+def _shutdown_log_writer():
+    writer = _writer.current()
+    if writer is not None:
+        writer.stop()
+
+
+def add_log_listener(listener):
+    """Call listener(session_id, user_query, gpt_response, model, response_type) for every logged turn."""
+    _log_listeners.append(listener)
+
+def _text(value):
+    """A log field as TEXT: dicts/lists as JSON (Decimal etc. via str), anything else through str() (None stays NULL)."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
 
 def insert_application_logs(session_id, user_query, gpt_response, model, resonse_type):
+    """
+    Log one turn (queued to the write-behind writer unless LOG_WRITE_BEHIND=0).
+
+    Fields are converted to text here, so the writer's batch only ever sees
+    strings and NULLs.
+    """
+    # created_at is captured now (same format as CURRENT_TIMESTAMP), not when the batch lands
+    record = (_text(session_id), _text(user_query), _text(gpt_response), _text(model), _text(resonse_type),
+              datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+    for listener in _log_listeners:
+        listener(*record[:5])
+    if LOG_WRITE_BEHIND:
+        get_log_writer().submit(record)
+        return
     conn = get_db_connection()
-    conn.execute('INSERT INTO application_logs (session_id, user_query, gpt_response, model, response_type) VALUES (?, ?, ?, ?,?)',
-                 (session_id, user_query, gpt_response, model, resonse_type))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(INSERT_LOG_SQL, record)
 
-def get_chat_history(session_id):
+def _history_rows(session_id, limit=None, before=None, flush=True, replies_only=False):
+    """
+    Rows for a session in chronological order.
+
+    Args:
+        limit: only the newest `limit` rows (keyset pagination; None for all)
+        before: row id cursor; only rows older than that row are returned
+        flush: wait for this process's queued records first (read-your-writes)
+        replies_only: skip EVENT_RESPONSE_TYPE rows
+    """
+    if flush:
+        # Only waits if this process still has queued records
+        flush_logs(timeout=1.0)
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT user_query, gpt_response,response_type FROM application_logs WHERE session_id = ? ORDER BY created_at', (session_id,))
+    query = 'SELECT id, user_query, gpt_response, response_type FROM application_logs WHERE session_id = ?'
+    params = [session_id]
+    if replies_only:
+        query += " AND COALESCE(response_type, '') <> ?"
+        params.append(EVENT_RESPONSE_TYPE)
+    if before is not None:
+        # Keyset on (created_at, id): seeks straight into the (session_id, created_at) index
+        query += ' AND (created_at, id) < (SELECT created_at, id FROM application_logs WHERE id = ?)'
+        params.append(before)
+    if limit is None:
+        # id breaks ties between rows logged within the same second
+        cursor.execute(query + ' ORDER BY created_at, id', params)
+        rows = cursor.fetchall()
+    else:
+        cursor.execute(query + ' ORDER BY created_at DESC, id DESC LIMIT ?', params + [limit])
+        rows = cursor.fetchall()[::-1]
+    cursor.close()
+    return rows
+
+def _rows_to_messages(rows, with_types=False):
     messages = []
-    for row in cursor.fetchall():
-        messages.extend([
-            {"role": "human", "content": row['user_query']},
-            {"role": "ai", "content": row['gpt_response']}
-        ])
-    conn.close()
+    for row in rows:
+        reply = {"role": "ai", "content": row['gpt_response']}
+        if with_types:
+            reply["response_type"] = row['response_type']
+        messages.extend([{"role": "human", "content": row['user_query']}, reply])
     return messages
 
-# Initialize the database
-create_application_logs()
+def get_chat_history(session_id, limit=None, before=None, flush=True, replies_only=False):
+    """
+    Chat messages for a session, oldest first.
+
+    Args:
+        session_id: session to read
+        limit: return only the last `limit` turns (one turn = user + ai message)
+        before: cursor from get_chat_history_page; only turns older than it
+        flush: wait for queued log records first; False skips the wait (and may miss
+            turns still in the write-behind queue)
+        replies_only: leave out EVENT_RESPONSE_TYPE rows (selections, intermediate notices)
+    """
+    return _rows_to_messages(_history_rows(session_id, limit, before, flush, replies_only))
+
+def get_chat_history_page(session_id, limit, before=None):
+    """
+    One page of history for lazy loading; ai messages carry the row's response_type.
+
+    Returns:
+        {"messages": [...], "next_cursor": id to pass as `before` for older turns, or None}
+    """
+    rows = _history_rows(session_id, limit + 1, before)
+    has_more = len(rows) > limit
+    rows = rows[1:] if has_more else rows
+    return {
+        "messages": _rows_to_messages(rows, with_types=True),
+        "next_cursor": rows[0]['id'] if has_more else None
+    }
@@ -0,0 +1,149 @@
+"""
+Token-budgeted conversation context for the LLM prompts.
+
+The intent/entity prompts need the recent turns of the real session to
+resolve follow-ups like "how much is the large one". Turns are already
+stored in application_logs; this module keeps a per-session copy in memory:
+
+- loaded once from chat_history (the last CONTEXT_LOAD_TURNS turns),
+- appended incrementally as new turns are logged (no re-reading); log rows
+  of type chat_history.EVENT_RESPONSE_TYPE are not turns and are skipped,
+- trimmed to CONTEXT_TOKEN_BUDGET; turns that fall out of the window are
+  folded into a short rolling summary instead of being dropped outright.
+
+Sessions are kept in an LRU of CONTEXT_CACHE_SESSIONS entries and reloaded
+after CONTEXT_CACHE_TTL seconds so turns logged by other workers show up.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import chat_history
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))  # tokens of history per prompt
+CONTEXT_LOAD_TURNS = int(os.getenv("CONTEXT_LOAD_TURNS", "10"))       # turns read from the DB on first use
+CONTEXT_CACHE_SESSIONS = int(os.getenv("CONTEXT_CACHE_SESSIONS", "2000"))
+CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", "300"))      # seconds before a session is reloaded
+MAX_MESSAGE_CHARS = 400   # long replies (JSON tables) are cut to this before counting
+SUMMARY_MAX_CHARS = 300
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English/Singlish text)."""
+    return len(text) // 4 + 1
+
+
+def _clip(text, limit):
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class ConversationContext:
+    """Recent messages of one session plus a rolling summary of older ones."""
+
+    def __init__(self, messages=(), loaded_at=None):
+        self.messages = deque()
+        self.summary = ""
+        self.loaded_at = loaded_at or time.time()
+        for message in messages:
+            self.append(message["role"], message["content"])
+
+    def append(self, role, content):
+        if content:
+            self.messages.append({"role": role, "content": _clip(content, MAX_MESSAGE_CHARS)})
+
+    def _summarize(self, message, max_chars):
+        # Only the user's side is kept: it carries the topic (dish, restaurant) a follow-up refers to
+        if message["role"] != "human":
+            return
+        self.summary = f"{self.summary} | {message['content']}" if self.summary else message["content"]
+        if len(self.summary) > max_chars:
+            self.summary = "..." + self.summary[-(max_chars - 3):]
+
+    def _summary_tokens(self):
+        return estimate_tokens(self.summary) + 10 if self.summary else 0  # + the system message prefix
+
+    def window(self, budget=CONTEXT_TOKEN_BUDGET):
+        """
+        Messages to send with the prompt, newest last, within `budget` tokens.
+
+        Returns:
+            list of {"role": "system" | "human" | "ai", "content": str}
+        """
+        # The summary gets at most a third of the budget; the latest turn is always kept verbatim
+        summary_chars = min(SUMMARY_MAX_CHARS, budget * 4 // 3)
+        used = sum(estimate_tokens(m["content"]) for m in self.messages)
+        # Fold the oldest whole turns into the summary (once) until the rest fits
+        while len(self.messages) > 2 and used + self._summary_tokens() > budget:
+            message = self.messages.popleft()
+            used -= estimate_tokens(message["content"])
+            self._summarize(message, summary_chars)
+            if message["role"] == "human" and self.messages and self.messages[0]["role"] == "ai":
+                used -= estimate_tokens(self.messages[0]["content"])
+                self._summarize(self.messages.popleft(), summary_chars)
+
+        window = list(self.messages)
+        if self.summary:
+            window.insert(0, {"role": "system", "content": f"Earlier in this conversation the user asked: {self.summary}"})
+        return window
+
+
+class ContextStore:
+    """LRU of ConversationContext objects keyed by session id."""
+
+    def __init__(self, max_sessions=CONTEXT_CACHE_SESSIONS, ttl=CONTEXT_CACHE_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Context for a session, loading it from chat_history if needed."""
+        with self._lock:
+            context = self._contexts.get(session_id)
+            if context is not None and time.time() - context.loaded_at < self.ttl:
+                self._contexts.move_to_end(session_id)
+                return context
+
+        # No flush_logs() wait: turns logged after this load reach the cached context
+        # through the log listener, so the queue does not have to be on disk first
+        context = ConversationContext(chat_history.get_chat_history(session_id, limit=CONTEXT_LOAD_TURNS,
+                                                                    flush=False, replies_only=True))
+        with self._lock:
+            self._contexts[session_id] = context
+            self._contexts.move_to_end(session_id)
+            while len(self._contexts) > self.max_sessions:
+                self._contexts.popitem(last=False)
+        return context
+
+    def record_turn(self, session_id, user_query, gpt_response):
+        """Append a logged turn to a cached session (sessions not in memory are loaded lazily later)."""
+        with self._lock:
+            context = self._contexts.get(session_id)
+            if context is not None:
+                context.append("human", user_query)
+                context.append("ai", gpt_response)
+
+    def window(self, session_id, budget=CONTEXT_TOKEN_BUDGET):
+        if not session_id:
+            return []
+        context = self.get(session_id)
+        with self._lock:
+            return context.window(budget)
+
+
+_store = ContextStore()
+
+
+def get_context_window(session_id, budget=CONTEXT_TOKEN_BUDGET):
+    """Chat history for the prompts of `session_id`, trimmed to `budget` tokens."""
+    return _store.window(session_id, budget)
+
+
+def _on_log(session_id, user_query, gpt_response, model, response_type):
+    if response_type != chat_history.EVENT_RESPONSE_TYPE:
+        _store.record_turn(session_id, user_query, gpt_response)
+
+
+chat_history.add_log_listener(_on_log)
@@ -1,5 +1,11 @@
-import mysql.connector
-import psycopg2
+import os
+import threading
+import time
+
+from process_local import PerProcess
+
+# psycopg2 is imported inside the functions that talk to Postgres, so importing
+# this module (and everything that imports db_conn) doesn't load the driver
 
 # Function to establish MySQL connection
 # def db_conn():
@@ -12,13 +18,251 @@ import psycopg2
 #     return conn
 
 
+DB_PARAMS = {
+    "host": "moradb.c38maw0agkjw.ap-south-1.rds.amazonaws.com",
+    "port": 5432,          # PostgreSQL default port
+    "user": "postgres",
+    "password": "rootroot",
+    "dbname": "foodstation",
+}
+
+# Pool tuning (override through the environment per deployment)
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))        # hard cap on open connections per worker
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))        # seconds to wait for a free connection
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))      # close connections older than this (seconds)
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))  # ping connections idle longer than this (seconds)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Proxy around a psycopg2 connection checked out from the pool.
+
+    Behaves like the underlying connection (cursor(), commit(), rollback(), ...),
+    except that close() hands the connection back to the pool instead of
+    tearing down the TCP/TLS session. Existing callers that do
+    `conn = db_conn() ... conn.close()` therefore keep working unchanged.
+    """
+
+    def __init__(self, pool, conn, created_at, generation):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self._generation = generation
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            import psycopg2
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(conn, name)
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)."""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn, self._created_at, self._generation)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of psycopg2 connections.
+
+    - At most `max_size` connections are open at once; callers beyond that
+      wait up to `timeout` seconds and then get PoolTimeout.
+    - On checkout a connection is health-checked: broken or aborted
+      connections are discarded, connections idle for longer than
+      `ping_after` are pinged with SELECT 1, and connections older than
+      `recycle` are replaced with fresh ones.
+    - On release any open transaction is rolled back so the next user
+      starts clean.
+    """
+
+    def __init__(self, connect, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_after=POOL_PING_AFTER):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = []   # stack of (conn, created_at, released_at), most recently used last
+        self._size = 0    # open connections, idle + checked out
+        self._generation = 0  # bumped by closeall(); older connections are closed on release
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+
+    def getconn(self):
+        """
+        Check out a healthy connection, opening a new one if the pool has room.
+
+        Returns:
+            PooledConnection
+        Raises:
+            PoolTimeout: if the pool stays exhausted for `timeout` seconds
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            entry = None
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+                # Read under the lock closeall() bumps it with, so a checkout racing
+                # closeall() is tagged with the generation it actually belongs to
+                generation = self._generation
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1   # reserve a slot, connect outside the lock
+
+            if entry is None:
+                return self._open(generation)
+
+            conn, created_at, released_at = entry
+            if self._is_healthy(conn, created_at, released_at):
+                with self._cond:
+                    self._stats["checkouts"] += 1
+                return PooledConnection(self, conn, created_at, generation)
+            # Unhealthy or stale: drop it and try the next idle one (or open a new one)
+            self._discard(conn)
+
+    def _open(self, generation):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        created_at = time.monotonic()
+        with self._cond:
+            self._stats["created"] += 1
+            self._stats["checkouts"] += 1
+        return PooledConnection(self, conn, created_at, generation)
+
+    def _is_healthy(self, conn, created_at, released_at):
+        import psycopg2
+        from psycopg2 import extensions
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if self.recycle and now - created_at > self.recycle:
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if self.ping_after is not None and now - released_at > self.ping_after:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _release(self, conn, created_at, generation):
+        import psycopg2
+        from psycopg2 import extensions
+        try:
+            # psycopg2 opens a transaction implicitly on the first query
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            reusable = not conn.closed and conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        except psycopg2.Error:
+            reusable = False
+        if reusable:
+            with self._cond:
+                # Checked against the generation under the lock, so closeall() can't run in between
+                if generation == self._generation:
+                    self._idle.append((conn, created_at, time.monotonic()))
+                    self._cond.notify()
+                    return
+        self._discard(conn)  # broken, or checked out before closeall()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def stats(self):
+        """Snapshot of pool counters and current occupancy."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["max_size"] = self.max_size
+        return stats
+
+    def closeall(self):
+        """Close every idle connection; checked-out ones are closed when they are released."""
+        with self._cond:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _connect():
+    import psycopg2
+    return psycopg2.connect(**DB_PARAMS)
+
+
+_pool = PerProcess(lambda: ConnectionPool(_connect))
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    The pool is keyed on the process id so that gunicorn workers forked
+    from a preloaded master never share sockets with their parent.
+    """
+    return _pool.get()
+
 
 def db_conn():
-    conn = psycopg2.connect(
-        host="moradb.c38maw0agkjw.ap-south-1.rds.amazonaws.com",
-        port=5432,          # PostgreSQL default port
-        user="postgres",
-        password="rootroot",
-        dbname="foodstation"
-    )
-    return conn
\ No newline at end of file
+    """Check out a pooled PostgreSQL connection; call close() to return it."""
+    return get_pool().getconn()
+
+
+def pool_stats():
+    """Counters for the current process's pool (checkouts, waits, timeouts, ...)."""
+    return get_pool().stats()
@@ -0,0 +1,165 @@
+"""
+Trigram index for ranked, typo-tolerant dish name search.
+
+Replaces `food_name ILIKE '%dish%'` scans: a leading wildcard cannot use a
+btree index, so every lookup read the whole table. Names are indexed by
+their character trigrams (the same scheme as PostgreSQL's pg_trgm: each
+word is lowercased and padded with two leading spaces and one trailing
+space). Lookups only touch the postings of the query's trigrams.
+
+    index = TrigramIndex(["kotthu rotti", "cheese kotthu", "fried rice"])
+    index.contains("kotthu")      # substring matches, like ILIKE '%kotthu%'
+    index.search("kotu", k=3)     # [("kotthu rotti", 0.52), ...]
+    index.mentions("2 kotu and a fried rice pls", k=3)   # names that occur in a sentence
+"""
+import heapq
+from collections import Counter, defaultdict
+from itertools import chain
+
+SIMILARITY_THRESHOLD = 0.3  # same default as pg_trgm.similarity_threshold
+MENTION_THRESHOLD = 0.6     # share of a name's trigrams that must appear in the text
+
+
+def _normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def trigrams(text):
+    """pg_trgm style trigram set: per word, padded with '  ' in front and ' ' behind."""
+    grams = set()
+    for word in _normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _inner_trigrams(text):
+    """Unpadded trigrams of the whole string; every substring's trigrams are a subset."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Immutable trigram index over a list of names.
+
+    Scores combine pg_trgm's similarity (|A∩B| / |A∪B|) with word similarity
+    (|A∩B| / |A|, how much of the query is found in the name), so "kottu"
+    ranks "kotthu rotti" above unrelated dishes even though the name is longer.
+    """
+
+    def __init__(self, names):
+        self.names = []
+        self._grams = []
+        self._postings = defaultdict(list)
+        self._inner_postings = defaultdict(list)
+        seen = set()
+        for name in names:
+            if name is None:
+                continue
+            key = _normalize(name)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            idx = len(self.names)
+            self.names.append(key)
+            grams = trigrams(key)
+            self._grams.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(idx)
+            for gram in _inner_trigrams(key):
+                self._inner_postings[gram].append(idx)
+
+    def __len__(self):
+        return len(self.names)
+
+    def contains(self, needle, names=None):
+        """
+        Names containing `needle` (case-insensitive), i.e. ILIKE '%needle%'.
+
+        Args:
+            needle: text to look for
+            names: optional set of names to restrict the result to
+        Returns:
+            list of matching names, in index order
+        """
+        needle = _normalize(needle or "")
+        if len(needle) < 3:
+            candidates = range(len(self.names))
+        else:
+            postings = sorted((self._inner_postings.get(g, ()) for g in _inner_trigrams(needle)), key=len)
+            if not postings or not postings[0]:
+                return []
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+            candidates = sorted(candidates)
+        return [self.names[i] for i in candidates
+                if needle in self.names[i] and (names is None or self.names[i] in names)]
+
+    def search(self, query, k=5, threshold=SIMILARITY_THRESHOLD, names=None):
+        """
+        Top-k names closest to `query`.
+
+        Args:
+            query: text to search for (typos are fine)
+            k: maximum number of results
+            threshold: minimum score in [0, 1]
+            names: optional set of names to restrict the search to
+        Returns:
+            list of (name, score), best first
+        """
+        query_grams = trigrams(query or "")
+        if not query_grams:
+            return []
+
+        counts = defaultdict(int)
+        for gram in query_grams:
+            for idx in self._postings.get(gram, ()):
+                counts[idx] += 1
+
+        scored = []
+        q = len(query_grams)
+        for idx, common in counts.items():
+            name = self.names[idx]
+            if names is not None and name not in names:
+                continue
+            similarity = common / (q + self._grams[idx] - common)
+            word_similarity = common / q
+            score = (similarity + word_similarity) / 2
+            if score >= threshold:
+                scored.append((name, round(score, 4)))
+
+        scored.sort(key=lambda pair: (-pair[1], len(pair[0]), pair[0]))
+        return scored[:k]
+
+    def mentions(self, text, k=5, threshold=MENTION_THRESHOLD, names=None):
+        """
+        Top-k names that occur (possibly misspelled) somewhere in `text`.
+
+        Unlike search(), the score is the share of the *name's* trigrams found
+        in the text, so a short name inside a long message still scores high.
+
+        Args:
+            text: free text, e.g. a whole chat message
+            k: maximum number of results
+            threshold: minimum score in [0, 1]
+            names: optional set of names to restrict the search to
+        Returns:
+            list of (name, score), best first; longer names win ties
+        """
+        text_grams = trigrams(text or "")
+        if not text_grams:
+            return []
+
+        # Messages are long and share common trigrams with many names; count in C
+        counts = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in text_grams))
+
+        all_names, sizes = self.names, self._grams
+        best = heapq.nsmallest(k, (
+            (-common / sizes[idx], -len(all_names[idx]), all_names[idx])
+            for idx, common in counts.items()
+            if common >= threshold * sizes[idx] and (names is None or all_names[idx] in names)
+        ))
+        return [(name, round(-score, 4)) for score, _, name in best]
@@ -0,0 +1,149 @@
+"""
+Deterministic pre-classifier for trivial chat messages.
+
+Greetings, "thanks", "menu of <restaurant>", "price of <dish>" and bare
+restaurant names don't need two remote LLM calls to understand. classify()
+resolves those with keyword/regex rules and exact matches against the
+catalog vocabulary (vocabulary.py), and returns the same dict shape as
+llm.llm_intent_entity_async. Anything it is not sure about returns None so
+the caller falls through to the LLM.
+
+Every decision is counted; fast_path_stats() reports the hit rate.
+"""
+import re
+import threading
+from collections import Counter
+
+import vocabulary
+
+GREETING_RESPONSE = "Hello! How can I assist you today?"
+THANKS_RESPONSE = "You're welcome! Let me know if you'd like anything else."
+
+_GREETING_RE = re.compile(
+    r"^(hi+|hello+|hey+|hai|helo|good (morning|afternoon|evening|day)|ayubowan|vanakkam|greetings)"
+    r"( there| mora| bot)?$"
+)
+_THANKS_RE = re.compile(r"^(thanks?( you)?( so much| a lot)?|thank u|thx|ty|tnx|nandri|sthuthi|bohoma sthuthi)$")
+
+_MENU_RE = re.compile(
+    r"^(?:(?:can you |could you |please )?(?:show|give|send|get)(?: me)? )?(?:the )?menu (?:of|for|at|from|in) (?P<restaurant>.+)$"
+    r"|^(?P<restaurant2>.+?)(?:'s| s)? menu$"
+)
+_PRICE_RE = re.compile(
+    r"^(?:what(?:'s| is) the |whats the )?(?:price|cost|rate) (?:of|for) (?:an? |the )?(?P<dish>.+?)"
+    r"(?: (?:at|from|in) (?P<restaurant>.+))?$"
+    r"|^how much (?:is|for|does) (?:an? |the )?(?P<dish2>.+?)(?: cost)?(?: (?:at|from|in) (?P<restaurant2>.+))?$"
+    r"|^(?P<dish3>.+?) (?:price|prices|rate)(?: (?:at|from|in) (?P<restaurant3>.+))?$"
+)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _normalize(text):
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[^\w&' ]+", " ", text)
+    return " ".join(text.split())
+
+
+def _record(decision):
+    with _stats_lock:
+        _stats[decision] += 1
+
+
+def fast_path_stats():
+    """Decision counts and the share of messages answered without the LLM."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    hits = total - stats.get("llm", 0)
+    stats["total"] = total
+    stats["hit_rate"] = round(hits / total, 4) if total else 0.0
+    return stats
+
+
+_vocab_cache = (None, {}, {})
+
+
+def _vocabulary():
+    """(restaurant lookup, dish lookup), normalized name -> display name."""
+    global _vocab_cache
+    vocab = vocabulary.get_vocabulary()
+    cached_vocab, restaurants, dishes = _vocab_cache
+    if cached_vocab is not vocab:
+        # Re-keyed once per vocabulary version
+        restaurants = {_normalize(key): name for key, name in vocab.restaurants.items()}
+        dishes = {_normalize(key): name for key, name in vocab.dishes.items()}
+        _vocab_cache = (vocab, restaurants, dishes)
+    return restaurants, dishes
+
+
+def _result(user_input, category, fallback_response=None, restaurant=None, dish=None):
+    return {
+        "corrected_input": user_input,
+        "category": category,
+        "fallback_response": fallback_response,
+        "restaurant": restaurant,
+        "dish": dish,
+        "size": None,
+        "variant": None,
+        "order_qty": None,
+    }
+
+
+def _lookup_dish(text, dishes):
+    if text in dishes:
+        return dishes[text]
+    # Tolerate singular/plural ("roll" vs "Rolls")
+    if text.endswith("s") and text[:-1] in dishes:
+        return dishes[text[:-1]]
+    if text + "s" in dishes:
+        return dishes[text + "s"]
+    return None
+
+
+def classify(user_input):
+    """
+    Classify a message locally if the answer is unambiguous.
+
+    Args:
+        user_input: raw user message
+    Returns:
+        dict shaped like the LLM output, or None if the LLM is needed
+    """
+    text = _normalize(user_input or "")
+    if not text:
+        return None
+
+    if _GREETING_RE.match(text):
+        _record("greeting")
+        return _result(user_input, "Greetings", GREETING_RESPONSE)
+    if _THANKS_RE.match(text):
+        _record("thanks")
+        return _result(user_input, "Greetings", THANKS_RESPONSE)
+
+    restaurants, dishes = _vocabulary()
+
+    if text in restaurants:
+        _record("restaurant_name")
+        return _result(user_input, "Restaurant Info & Menu", restaurant=restaurants[text])
+
+    match = _MENU_RE.match(text)
+    if match:
+        restaurant = restaurants.get(match.group("restaurant") or match.group("restaurant2"))
+        if restaurant:
+            _record("menu")
+            return _result(user_input, "Restaurant Info & Menu", restaurant=restaurant)
+
+    match = _PRICE_RE.match(text)
+    if match:
+        dish_text = match.group("dish") or match.group("dish2") or match.group("dish3")
+        restaurant_text = match.group("restaurant") or match.group("restaurant2") or match.group("restaurant3")
+        dish = _lookup_dish(dish_text, dishes)
+        restaurant = restaurants.get(restaurant_text) if restaurant_text else None
+        if dish and (restaurant_text is None or restaurant):
+            _record("price")
+            return _result(user_input, "Dish Price Inquiry & Availability", restaurant=restaurant, dish=dish)
+
+    _record("llm")
+    return None
@@ -1,18 +1,51 @@
-import requests
-from sqlalchemy import create_engine, MetaData, Table,text
 import llm
+import llm_cache
+import menu_catalog
+import prompts
+import row_shaping
 import chat_history
-import pandas as pd
+from process_local import PerProcess
 from session_manager import get_session_id
 import json
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
-session_id = get_session_id() 
-
 db_url = os.getenv("postgres_creds")
 
+ENGINE_POOL_SIZE = int(os.getenv("GENERAL_INQUIRY_POOL_SIZE", "5"))
+ENGINE_MAX_OVERFLOW = int(os.getenv("GENERAL_INQUIRY_MAX_OVERFLOW", "5"))
+SCHEMA_CHECK_INTERVAL = float(os.getenv("SCHEMA_CHECK_INTERVAL", "300"))  # seconds between schema hash checks
+
+# One cheap catalog query instead of a full MetaData().reflect() per inquiry
+SCHEMA_VERSION_QUERY = """
+SELECT md5(string_agg(table_name || '.' || column_name || ':' || data_type, ',' ORDER BY table_name, ordinal_position))
+FROM information_schema.columns
+WHERE table_schema = current_schema()
+"""
+
+_schema_cache = {"version": None, "schema": None, "checked_at": 0.0}
+_schema_lock = threading.Lock()
+
+# Generated-SQL cache: question (with entity values as placeholders) -> statement that worked
+SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", "86400"))  # seconds
+SQL_CACHE_ENTITY_FIELDS = ("restaurant", "dish", "variant", "size")
+_SQL_LITERAL_RE = re.compile(r"'((?:[^']|'')*)'")
+sql_cache = llm_cache.ResultCache(ttl=SQL_CACHE_TTL, table="sql_cache")  # same file as the LLM cache, own table
+
+# "What's available now" / "which restaurants are open now" are answered from the
+# catalog's availability bitmaps instead of LLM-generated SQL
+_NOW_RE = re.compile(r"\b(now|right now|currently|at the moment|at this time)\b")
+_OPEN_RE = re.compile(r"\b(open|opened)\b")
+_AVAILABLE_RE = re.compile(r"\b(available|availability|avilable|serving|served|can i (get|eat|order)|to eat)\b")
+AVAILABLE_NOW_COLUMNS = {
+    "dish": "Dish", "variant": "Variant", "size": "Size", "price": "Price", "restaurant": "Restaurant",
+    "restaurant_status": "Restaurant Status", "available_time": "Available Time",
+}
+
 
 few_shot_examples="""
                 {
@@ -52,27 +85,78 @@ Here is the question:
 
 Respond with a valid SQL query, no explanations or additional text.
 """
+prompts.register_text("sql", sql_prompt_template)
 
 few_shot_template="""
                 
 """
 
 
-def _log_response(self, session_id, input_text, response, response_type):
+def _log_response(session_id, input_text, response, model, response_type):
         chat_history.insert_application_logs(
             session_id,
             input_text,
             response,
-            "qwen",
+            model,
             response_type
     )
 
 
-def fetch_schema_from_db(db_url):
+def _create_engine():
+    from sqlalchemy import create_engine  # loaded on the first general inquiry
+    return create_engine(
+        db_url,
+        pool_size=ENGINE_POOL_SIZE,
+        max_overflow=ENGINE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+
+
+_engine = PerProcess(_create_engine)
+
+
+def get_engine():
+    """
+    Process-wide SQLAlchemy engine with its own connection pool.
+
+    Created on first use (and again after a fork) instead of once per inquiry.
+    """
+    return _engine.get()
+
+
+def get_schema(engine):
+    """
+    Prompt-ready schema string, reflected once and cached.
+
+    At most every SCHEMA_CHECK_INTERVAL seconds a single query hashes
+    information_schema.columns; the schema is only reflected again when
+    that hash changes.
+    """
+    now = time.time()
+    if _schema_cache["schema"] is not None and now - _schema_cache["checked_at"] < SCHEMA_CHECK_INTERVAL:
+        return _schema_cache["schema"]
+
+    from sqlalchemy import text
+
+    with _schema_lock:
+        if _schema_cache["schema"] is not None and now - _schema_cache["checked_at"] < SCHEMA_CHECK_INTERVAL:
+            return _schema_cache["schema"]
+        with engine.connect() as connection:
+            version = connection.execute(text(SCHEMA_VERSION_QUERY)).scalar()
+        if _schema_cache["schema"] is None or version != _schema_cache["version"]:
+            _schema_cache["schema"] = fetch_schema_from_db(engine)
+            _schema_cache["version"] = version
+        _schema_cache["checked_at"] = now
+        return _schema_cache["schema"]
+
+
+def fetch_schema_from_db(engine):
     """
-    Fetch the database schema from the given database URL.
+    Fetch the database schema using the given engine.
     """
-    engine = create_engine(db_url)
+    from sqlalchemy import MetaData
+
     metadata = MetaData()
     metadata.reflect(bind=engine)
 
@@ -82,30 +166,141 @@ def fetch_schema_from_db(db_url):
 
     return schema.strip()
 
-def execute_sql(engine, query, json_output, retry_count=0):
+def _sql_entities(json_output):
+    """Entity values that can be re-bound into a cached statement, longest first."""
+    entities = {}
+    for field in SQL_CACHE_ENTITY_FIELDS:
+        value = json_output.get(field)
+        if isinstance(value, str) and value.strip() and value.strip().lower() not in ("null", "none", "n/a"):
+            entities[field] = value.strip()
+    return dict(sorted(entities.items(), key=lambda item: -len(item[1])))
+
+
+def _sql_cache_key(json_output):
+    """
+    Key for the generated-SQL cache.
+
+    Entity values that appear in the question are replaced by placeholders,
+    so "price of kotthu at kandiah" and "price of biriyani at ice talk"
+    share one parameterized statement.
+    """
+    question = llm_cache.normalize_input(json_output.get("corrected_input"))
+    key_entities = []
+    for field, value in _sql_entities(json_output).items():
+        if value.lower() in question:
+            question = question.replace(value.lower(), "{" + field + "}")
+            key_entities.append((field, "{" + field + "}"))
+        else:
+            key_entities.append((field, value.lower()))
+    return llm_cache.make_key("sql", question, sorted(key_entities), f'{_schema_cache["version"]}:{prompts.version("sql")}')
+
+
+def _parameterize_sql(query, entities):
+    """
+    Replace string literals that hold exactly an entity value with bind parameters.
+
+    A literal matches when, after stripping leading/trailing LIKE wildcards, it
+    equals the entity value (case-insensitive): 'Kotthu', '%kotthu%', 'kotthu%'.
+
+    Returns:
+        (sql, binds) where binds maps each parameter to [prefix, field, suffix],
+        e.g. ILIKE '%Kotthu%' -> ILIKE :p0 with {"p0": ["%", "dish", "%"]};
+        None when a literal only contains an entity value ('%fried rice%' for
+        "rice"), since such a statement can't be safely re-bound
+    """
+    binds = {}
+    partial = False
+
+    def replace(match):
+        nonlocal partial
+        literal = match.group(1).replace("''", "'")
+        core = literal.strip("%")
+        prefix = literal[:len(literal) - len(literal.lstrip("%"))]
+        suffix = literal[len(literal.rstrip("%")):]
+        for field, value in entities.items():
+            if core.lower() == value.lower():
+                name = f"p{len(binds)}"
+                binds[name] = [prefix, field, suffix]
+                return f":{name}"
+        if any(value.lower() in core.lower() for value in entities.values()):
+            partial = True
+        return match.group(0)
+
+    sql = _SQL_LITERAL_RE.sub(replace, query)
+    if partial:
+        return None
+    return sql, binds
+
+
+def _remember_sql(json_output, query):
+    """Cache a statement that executed successfully."""
+    try:
+        parameterized = _parameterize_sql(query, _sql_entities(json_output))
+        if parameterized is None:
+            return
+        sql, binds = parameterized
+        sql_cache.set(_sql_cache_key(json_output), json.dumps({"sql": sql, "binds": binds}))
+    except Exception as e:
+        print(f"SQL cache error: {e}")
+
+
+def _run_cached_sql(engine, json_output):
     """
-    Execute the SQL query and return results in a pandas DataFrame.
+    Execute a previously generated statement for this question, re-binding entity values.
+
+    Returns:
+        the execute_sql result, or None on a cache miss
+    """
+    cache_key = _sql_cache_key(json_output)
+    cached = sql_cache.get(cache_key)
+    if cached is None:
+        return None
+    entry = json.loads(cached)
+    entities = _sql_entities(json_output)
+    params = {}
+    for name, (prefix, field, suffix) in entry["binds"].items():
+        if field not in entities:
+            return None
+        params[name] = f"{prefix}{entities[field]}{suffix}"
+    print(f"Generated SQL cache hit: {entry['sql']}")
+    return execute_sql(engine, entry["sql"], json_output, params=params, cache_key=cache_key)
+
+
+def execute_sql(engine, query, json_output, retry_count=0, params=None, cache_key=None):
+    """
+    Execute the SQL query and return the rows as JSON-safe records.
     If there's an error, it will retry once by regenerating the SQL query.
+    Statements that run without error are cached for identical questions;
+    a cached statement (cache_key set) that fails is evicted and regenerated.
     """
+    from sqlalchemy import text
+
     max_retries = 1  # Maximum number of retries
     
     with engine.connect() as connection:
         try:
-            result = connection.execute(text(query))
-            df = pd.DataFrame(result.fetchall(), columns=result.keys())
+            result = connection.execute(text(query), params or {})
+            rows = result.fetchall()
+            if cache_key is None:
+                _remember_sql(json_output, query)
             
-            if df.empty:
+            if not rows:
                 error_message = "No results found for the given query."
-                _log_response(session_id, json_output.get("corrected_input"), error_message, "qwen", "str")
+                _log_response(get_session_id(), json_output.get("corrected_input"), error_message, "qwen", "str")
                 return error_message
             
-            json_data = df.to_json(orient="records")
-            parsed_json = json.loads(json_data)
+            parsed_json = row_shaping.records(rows, list(result.keys()))
+            json_data = row_shaping.to_json(parsed_json)
             print(parsed_json)
-            _log_response(session_id, json_output.get("corrected_input"), json_data, "qwen", "json")
+            _log_response(get_session_id(), json_output.get("corrected_input"), json_data, "qwen", "json")
             return parsed_json
             
         except Exception as e:
+            if cache_key is not None:
+                # Cached statement no longer works: drop it and ask the LLM again
+                print(f"Cached SQL failed, evicting: {str(e)}")
+                sql_cache.invalidate(cache_key)
+                return generate_sql_query(json_output, use_cache=False)
             if retry_count < max_retries:
                 # Log the error and retry
                 print(f"SQL execution error (attempt {retry_count + 1}): {str(e)}")
@@ -116,14 +311,64 @@ def execute_sql(engine, query, json_output, retry_count=0):
                 return execute_sql(engine, new_query, json_output, retry_count + 1)
             else:
                 error_message = "There is some problem from my side to run your query. Please try again or rephrase your question."
-                _log_response(session_id, json_output.get("corrected_input"), error_message, "qwen", "str")
+                _log_response(get_session_id(), json_output.get("corrected_input"), error_message, "qwen", "str")
                 return error_message
 
-def generate_sql_query(json_output, is_retry=False):
-    engine = create_engine(db_url)
+def _availability_answer(json_output):
+    """
+    Answer "open now" / "available now" questions from the catalog snapshot.
+
+    Returns:
+        list of row dicts, an error message string, or None if the question is not
+        a plain availability question (or no snapshot is loaded)
+    """
+    question = (json_output.get("corrected_input") or "").lower()
+    if not _NOW_RE.search(question) or json_output.get("dish"):
+        return None
+    snapshot = menu_catalog.get_snapshot()
+    if snapshot is None:
+        return None
+
+    if _OPEN_RE.search(question) and not _AVAILABLE_RE.search(question):
+        restaurant = json_output.get("restaurant")
+        if restaurant and not snapshot.restaurant_ids(restaurant):
+            return None  # not a catalog restaurant: let the generated SQL answer
+        rows = snapshot.open_restaurant_rows(restaurant_name=restaurant)
+        empty_message = f"Sorry, {restaurant} is not open right now." if restaurant \
+            else "Sorry, no restaurants are open right now."
+    elif _AVAILABLE_RE.search(question):
+        restaurant = json_output.get("restaurant")
+        if restaurant and not snapshot.restaurant_ids(restaurant):
+            return None  # not a catalog restaurant: let the generated SQL answer
+        rows = [{column: row[key] for key, column in AVAILABLE_NOW_COLUMNS.items()}
+                for row in snapshot.available_now_rows(restaurant)]
+        empty_message = "Sorry, There is no food Avilable this time."
+    else:
+        return None
+
+    if not rows:
+        _log_response(get_session_id(), json_output.get("corrected_input"), empty_message, "catalog", "str")
+        return empty_message
+    json_data = json.dumps(rows, ensure_ascii=False, default=float)
+    _log_response(get_session_id(), json_output.get("corrected_input"), json_data, "catalog", "json")
+    return json.loads(json_data)
+
+def generate_sql_query(json_output, is_retry=False, use_cache=True):
+    if not is_retry:
+        availability_answer = _availability_answer(json_output)
+        if availability_answer is not None:
+            return availability_answer
+
+    engine = get_engine()
+
+    # Cached schema string (re-reflected only when the schema hash changes)
+    schema = get_schema(engine)
 
-    # Fetch the database schema
-    schema = fetch_schema_from_db(db_url)
+    # Identical (or same-shaped) questions reuse the statement that worked last time
+    if use_cache and not is_retry:
+        cached_result = _run_cached_sql(engine, json_output)
+        if cached_result is not None:
+            return cached_result
 
     # Add context if this is a retry
     additional_context = ""
@@ -135,7 +380,8 @@ def generate_sql_query(json_output, is_retry=False):
         messages=[
             {
                 "role": "user", 
-                "content": sql_prompt_template.format(
+                "content": prompts.render(
+                    "sql",
                     entities=json_output, 
                     schema=schema, 
                     question=json_output.get("corrected_input"),
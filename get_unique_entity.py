@@ -157,24 +157,32 @@
 #         conn.close()
 
 from db_config import db_conn
-from psycopg2.extras import RealDictCursor
+import menu_catalog
+import vector_index
+import vocabulary
 
 def get_unique_entity():
     """
-    Fetch unique restaurant names and dish names from PostgreSQL.
+    Fetch unique restaurant names and dish names.
+    Served from the catalog vocabulary when the catalog is loaded (see vocabulary.py),
+    otherwise read from PostgreSQL.
     Returns:
         tuple: (unique_restaurant_names, unique_dish_names)
     """
+    vocab = vocabulary.get_vocabulary()
+    if vocab.from_catalog:
+        return list(vocab.restaurants.values()), list(vocab.dishes.values())
+
     conn = db_conn()
     cursor = conn.cursor()
 
     try:
         # Unique restaurant names
-        cursor.execute("SELECT DISTINCT name FROM restaurants;")
+        cursor.execute("SELECT DISTINCT name FROM restaurants WHERE name IS NOT NULL;")
         unique_restaurant_names = [row[0] for row in cursor.fetchall()]
 
-        # Unique dish names
-        cursor.execute("SELECT DISTINCT name FROM menu;")  # adjust table/column names
+        # Unique dish names (dishes live in food_items; menu only holds categories)
+        cursor.execute("SELECT DISTINCT food_name FROM food_items WHERE food_name IS NOT NULL;")
         unique_dish_names = [row[0] for row in cursor.fetchall()]
 
         return unique_restaurant_names, unique_dish_names
@@ -183,6 +191,19 @@ def get_unique_entity():
         conn.close()
 
 
+def _open_now_sql(start, end):
+    """
+    SQL condition for "CURRENT_TIME is inside the daily window start..end".
+    The end is exclusive (closed from the closing minute on), windows that cross
+    midnight (end < start) wrap, and equal bounds mean open all day, matching
+    availability.AvailabilityIndex.
+    """
+    return (f"({start} IS NOT NULL AND {end} IS NOT NULL AND CASE "
+            f"WHEN {start} < {end} THEN CURRENT_TIME >= {start} AND CURRENT_TIME < {end} "
+            f"WHEN {start} > {end} THEN CURRENT_TIME >= {start} OR CURRENT_TIME < {end} "
+            f"ELSE TRUE END)")
+
+
 def db_menu_request(restaurant_name):
     """
     Fetch menu items for a specific restaurant.
@@ -191,16 +212,22 @@ def db_menu_request(restaurant_name):
     Returns:
         list: Rows of menu items
     """
+    snapshot = menu_catalog.get_snapshot()
+    if snapshot is not None:
+        return snapshot.menu_rows(restaurant_name)
+
+    from psycopg2.extras import RealDictCursor
+
     conn = db_conn()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
 
     try:
-        query = """
+        query = f"""
         SELECT
             r.name,
             TO_CHAR(r.opening_time, 'HH24:MI') || '-' || TO_CHAR(r.closing_time, 'HH24:MI') AS timings,
             CASE
-                WHEN CURRENT_TIME BETWEEN r.opening_time AND r.closing_time THEN 'Open'
+                WHEN {_open_now_sql('r.opening_time', 'r.closing_time')} THEN 'Open'
                 ELSE 'Closed'
             END AS status,
             r.menu_link AS menuLink,
@@ -217,7 +244,7 @@ def db_menu_request(restaurant_name):
         conn.close()
 
 
-def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
+def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None, query=None):
     """
     Fetch price and availability information for a dish at a specific restaurant.
     Args:
@@ -225,9 +252,22 @@ def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
         dish_name (str): Dish name
         variant (str or None): Optional variant filter
         size (str or None): Optional size filter
+        query (str or None): Optional full question, searched semantically when no dish
+            name matches; price limits in it ("under 1000 rs") only filter those semantic results
     Returns:
         list of tuples: (dish, variant, size, price, restaurant, availability, restaurant_status, available_time)
     """
+    snapshot = menu_catalog.get_snapshot()
+    if snapshot is not None:
+        rows = snapshot.price_rows(restaurant_name, dish_name)
+        if not rows:
+            # Descriptions ("spicy rice") and names the trigram match cannot place;
+            # search_items applies the question's price limits itself
+            rows = snapshot.item_price_rows(vector_index.search_items(query or dish_name, restaurant_name))
+        return _filter_price_rows(rows, variant, size)
+
+    from psycopg2.extras import RealDictCursor
+
     conn = db_conn()
     cursor = conn.cursor(cursor_factory=RealDictCursor)
 
@@ -235,7 +275,7 @@ def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
         search_dish_name = f"%{dish_name}%"
         search_restaurant_name = f"%{restaurant_name}%" if restaurant_name else None
 
-        query_all = """
+        query_all = f"""
         SELECT
             m.food_name AS dish,
             m.variant,
@@ -243,12 +283,12 @@ def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
             m.price,
             r.name AS restaurant,
             CASE
-                WHEN m.available_from <= CURRENT_TIME AND m.available_until >= CURRENT_TIME
+                WHEN {_open_now_sql('m.available_from', 'm.available_until')}
                 THEN 'Available Now'
                 ELSE 'Not Available Now'
             END AS availability,
             CASE
-                WHEN r.opening_time <= CURRENT_TIME AND r.closing_time >= CURRENT_TIME
+                WHEN {_open_now_sql('r.opening_time', 'r.closing_time')}
                 THEN 'Open Now'
                 ELSE 'Closed Now'
             END AS restaurant_status,
@@ -259,7 +299,7 @@ def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
         ORDER BY r.name ASC, m.price ASC;
         """
 
-        query_specific = """
+        query_specific = f"""
         SELECT
             m.food_name AS dish,
             m.variant,
@@ -267,12 +307,12 @@ def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
             m.price,
             r.name AS restaurant,
             CASE
-                WHEN m.available_from <= CURRENT_TIME AND m.available_until >= CURRENT_TIME
+                WHEN {_open_now_sql('m.available_from', 'm.available_until')}
                 THEN 'Available Now'
                 ELSE 'Not Available Now'
             END AS availability,
             CASE
-                WHEN r.opening_time <= CURRENT_TIME AND r.closing_time >= CURRENT_TIME
+                WHEN {_open_now_sql('r.opening_time', 'r.closing_time')}
                 THEN 'Open Now'
                 ELSE 'Closed Now'
             END AS restaurant_status,
@@ -289,18 +329,20 @@ def db_price_inquiry(restaurant_name, dish_name, variant=None, size=None):
         else:
             cursor.execute(query_all, (search_dish_name,))
 
-        results = cursor.fetchall()
-
-        # Filter by variant and size if provided
-        if variant:
-            results = [row for row in results if row['variant'] and row['variant'].lower().strip() == variant.lower().strip()]
-        # if size:
-        #     results = [row for row in results if row['size'] and row['size'].lower().strip() == size.lower().strip()]
-
-        # Convert to list of tuples for consistency with your previous code
-        keys = ['dish', 'variant', 'size', 'price', 'restaurant', 'availability', 'restaurant_status', 'available_time']
-        return [tuple(row[key] for key in keys) for row in results]
+        return _filter_price_rows(cursor.fetchall(), variant, size)
 
     finally:
         cursor.close()
         conn.close()
+
+
+def _filter_price_rows(results, variant=None, size=None):
+    """Apply the variant/size filters and convert price rows to tuples."""
+    # Filter by variant and size if provided
+    if variant:
+        results = [row for row in results if row['variant'] and row['variant'].lower().strip() == variant.lower().strip()]
+    # if size:
+    #     results = [row for row in results if row['size'] and row['size'].lower().strip() == size.lower().strip()]
+
+    # Convert to list of tuples for consistency with your previous code
+    return [tuple(row[key] for key in menu_catalog.PRICE_KEYS) for row in results]
@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# Importing app has no side effects (no DB/sqlite work, no LLM clients); each
+# worker runs app.startup() once here, after it has loaded the application.
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def post_worker_init(worker):
+    import app
+    app.startup()
@@ -1,39 +1,65 @@
 import asyncio
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import LLMChain
 import json
 # from fuzzywuzzy import process
 import re
-import ast
-from pydantic import BaseModel, Field
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.prompts import MessagesPlaceholder
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
-import chat_history
+import threading
+import async_runtime
+import candidates
+import conversation_context
+import fast_path
+import llm_cache
+import prompts
 from session_manager import get_session_id
-from groq import Groq
-import time
-import datetime
-from langchain_groq import ChatGroq
 import os
 from dotenv import load_dotenv
 
-session_id = get_session_id()
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-llm = ChatGroq(model="openai/gpt-oss-120b", temperature=0)
-llm1 = ChatGroq(model="deepseek-r1-distill-llama-70b", temperature=0)
-llm3 = Groq(api_key=GROQ_API_KEY)
-llm4 = ChatGroq(model="llama3-70b-8192", temperature=0, response_format={"type": "json_object"})
-# llm5 = ChatGroq(model="deepseek-r1-distill-llama-70b", temperature=0.5,
-#     response_format={"type": "json_object"},
-#     )
-llm5 = ChatGroq(model="openai/gpt-oss-120b", temperature=0.5,
-    response_format={"type": "json_object"},
-    )
+
+
+def _chat_groq(**kwargs):
+    from langchain_groq import ChatGroq
+    return ChatGroq(**kwargs)
+
+
+def _groq_client():
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY)
+
+
+# LLM clients are built on first use, not at import: importing langchain_groq/groq and
+# constructing the clients dominated worker boot. `llm.llm3` etc. still work through
+# the module __getattr__ below.
+LLM_CLIENTS = {
+    "llm": lambda: _chat_groq(model="openai/gpt-oss-120b", temperature=0),
+    "llm1": lambda: _chat_groq(model="deepseek-r1-distill-llama-70b", temperature=0),
+    "llm3": _groq_client,
+    "llm4": lambda: _chat_groq(model="llama3-70b-8192", temperature=0, response_format={"type": "json_object"}),
+    # "llm5": lambda: _chat_groq(model="deepseek-r1-distill-llama-70b", temperature=0.5,
+    #     response_format={"type": "json_object"}),
+    "llm5": lambda: _chat_groq(model="openai/gpt-oss-120b", temperature=0.5,
+                               response_format={"type": "json_object"}),
+}
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """The named LLM client (see LLM_CLIENTS), created on first use."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = LLM_CLIENTS[name]()
+    return client
+
+
+def __getattr__(name):
+    if name in LLM_CLIENTS:
+        return get_client(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def refine_result(answer, sql=False):
     """Refines the raw answer from LLM by cleaning and parsing"""
@@ -62,9 +88,7 @@ def refine_result(answer, sql=False):
 
     return cleaned_text.strip()
 
-async def get_intent_classification(user_input, chat_history_db):
-    """Async function to get intent classification"""
-    base_template = """
+INTENT_CLASSIFICATION_TEMPLATE = """
         You are a multilingual AI assistant working for a food delivery platform called Foodstation.lk . The platform offers food from multiple restaurants, each with its own menu of dishes.# Foodstation.lk Assistant
 
         ## System Instructions
@@ -122,26 +146,7 @@ async def get_intent_classification(user_input, chat_history_db):
         4. Set empty fields to null (not empty string)
     """
 
-    base_prompt = ChatPromptTemplate.from_messages([
-        ("system", base_template),
-        MessagesPlaceholder("chat_history"),
-        ("user", "{user_input}"),
-    ])
-
-    classification_chain = LLMChain(llm=llm5, prompt=base_prompt)
-    slice_last_two = lambda lst: lst[-3:] if len(lst) > 1 else lst
-    
-    # Use ainvoke for async execution
-    result = await classification_chain.ainvoke({
-        "user_input": user_input, 
-        "chat_history": slice_last_two(chat_history_db)
-    })
-    
-    return refine_result(result)
-
-async def get_entity_extraction(user_input, chat_history_db):
-    """Async function to get entity extraction"""
-    base_template = """
+ENTITY_EXTRACTION_TEMPLATE = """
         You are a multilingual AI assistant working for a food delivery platform called Foodstation.lk . The platform offers food from multiple restaurants, each with its own menu of dishes.# Foodstation.lk Assistant
 
         ## System Instructions
@@ -155,11 +160,11 @@ async def get_entity_extraction(user_input, chat_history_db):
         ## Step 2: Entity Extraction
         Extract and correct names using these lists:
 
-        ### Restaurants (exact spelling):
-        Kandiah, Ice Talk, Bluberry, Jollybeez, Mum’s Food, ourselection
+        ### Restaurants (exact spelling, most likely matches for this message):
+        {restaurant_candidates}
 
-        ### Dishes (exact spelling):
-        ['Kotthu Rotti', 'Cheese Kotthu', 'Dolphin', 'Pittu Kotthu', 'Noodles', 'Pasta', 'String Hopper Kotthu', 'Bread Kotthu', 'Rice & Curry', 'Schezwan Rice', 'Mongolian Rice', 'Chopsuey Rice', 'Nasi Goreng', 'Biriyani', 'Fried Rice', 'Fry', 'Bbq', 'Tandoori', 'Grill', 'Devilled', 'Hot Butter', 'Curry', 'Kuruma', 'Parata', 'Mums Special Lime With Mint', 'Mums Special', 'Fresh Juice', 'Milk Shakes', 'Ice Cream', 'Nescafe', 'Milk Tea', 'Milo', 'Fruit Salad ', 'Wattalappam', 'Biscuit Pudding', 'Naan', 'French Fries', 'Soup', 'Salad', 'Mayyer Kelangu Fry', 'Hopper', 'Rolls', 'Samosa', 'Corn', 'Vadai', 'Shawarma', 'Bun', 'Kanji / Kenda', 'Chips', 'Mixture', 'Manyokka Fry']
+        ### Dishes (exact spelling, most likely matches for this message):
+        {dish_candidates}
 
         ### Extraction Rules:
         - Find misspelled restaurant/dish names and correct to exact match from lists
@@ -177,6 +182,13 @@ async def get_entity_extraction(user_input, chat_history_db):
             If no size indicator is mentioned, return "null".
         
 
+        ## Step 3: Order Items
+        If the user wants to place an order, also list every ordered item separately
+        (the same dish can appear more than once with different variants, sizes or quantities):
+        - "order_restaurant": restaurant name from the list, or "ourselection" if no restaurant is mentioned
+        - "order_items": one entry per item ("item1", "item2", ...) with dish, variant, size (lowercase small/medium/large or null) and qty (number, 1 if not mentioned)
+        If the message is not an order, set "order_restaurant" and "order_items" to null.
+
         ## Output Requirements
         Return ONLY this JSON format with no additional text:
 
@@ -187,6 +199,10 @@ async def get_entity_extraction(user_input, chat_history_db):
             "size": "small/medium/large or null",
             "variant": "variant name or null",
             "order_qty": "number or null",
+            "order_restaurant": "restaurant name, ourselection or null",
+            "order_items": {{
+                "item1": {{"dish": "dish name", "variant": "variant or null", "size": "size or null", "qty": 1}}
+            }}
         }}
 
         ## Critical Rules
@@ -210,38 +226,140 @@ async def get_entity_extraction(user_input, chat_history_db):
             "size": "Small",
             "variant": "Beef",
             "order_qty": 2,
+            "order_restaurant": null,
+            "order_items": null
+        }}
+
+        User: "order two medium and 1 large chicken kotthu rotti"
+        Output:
+        {{
+            "corrected_input": "order two medium and 1 large chicken kotthu rotti",
+            "restaurant": null,
+            "dish": "Kotthu Rotti",
+            "size": "Medium",
+            "variant": "Chicken",
+            "order_qty": 2,
+            "order_restaurant": "ourselection",
+            "order_items": {{
+                "item1": {{"dish": "kotthu rotti", "variant": "chicken", "size": "medium", "qty": 2}},
+                "item2": {{"dish": "kotthu rotti", "variant": "chicken", "size": "large", "qty": 1}}
+            }}
         }}
     """
 
-    base_prompt = ChatPromptTemplate.from_messages([
-        ("system", base_template),
-        MessagesPlaceholder("chat_history"),
-        ("user", "{user_input}"),
-    ])
+# Compiled once per process; the versions (instructions) and the injected
+# restaurant/dish candidates are part of every cache key, so edits and catalog
+# changes never serve stale classifications
+prompts.register_chat("intent", INTENT_CLASSIFICATION_TEMPLATE, client="llm5")
+prompts.register_chat("entities", ENTITY_EXTRACTION_TEMPLATE, client="llm5")
+PROMPT_VERSION = prompts.version("intent", "entities")
 
-    classification_chain = LLMChain(llm=llm5, prompt=base_prompt)
-    slice_last_two = lambda lst: lst[-3:] if len(lst) > 1 else lst
-    
-    # Use ainvoke for async execution
-    result = await classification_chain.ainvoke({
+result_cache = llm_cache.ResultCache()
+
+
+async def _run_cached_prompt(kind, user_input, chat_history_db, candidate_names=None):
+    """
+    Run a registered chat prompt (system + history + user message), reusing cached results.
+
+    candidate_names: candidates.Candidates for prompts with {restaurant_candidates}/{dish_candidates}
+    """
+    # Already trimmed to the token budget by conversation_context
+    history_window = chat_history_db
+
+    version = prompts.version(kind)
+    variables = {}
+    if candidate_names is not None:
+        version = f"{version}:{candidate_names.key}"
+        variables = candidate_names.prompt_variables()
+
+    cache_key = llm_cache.make_key(kind, user_input, history_window, version)
+    cached = await result_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    # Only the user message, the history and the candidates change per request
+    result = await prompts.chain(kind).ainvoke({
         "user_input": user_input, 
-        "chat_history": slice_last_two(chat_history_db)
+        "chat_history": history_window,
+        **variables
     })
     
-    return refine_result(result)
+    result = refine_result(result)
+    try:
+        json.loads(result)
+    except (TypeError, ValueError):
+        return result  # don't cache malformed output
+    await result_cache.aset(cache_key, result)
+    return result
 
+async def get_intent_classification(user_input, chat_history_db):
+    """Async function to get intent classification"""
+    return await _run_cached_prompt("intent", user_input, chat_history_db)
 
-async def llm_intent_entity_async(user_input):
-    """Main function to get intent and entities together"""
+async def get_entity_extraction(user_input, chat_history_db, candidate_names=None):
+    """Async function to get entity extraction"""
+    # Only the restaurants/dishes this conversation is likely about go into the prompt
+    if candidate_names is None:
+        candidate_names = await asyncio.to_thread(candidates.for_message, user_input, chat_history_db)
+    return await _run_cached_prompt("entities", user_input, chat_history_db, candidate_names)
+
+
+def _prepare(user_input, session_id):
+    """
+    The synchronous part of a request: fast-path result, history window, candidates.
+
+    Runs on the request thread (or a worker thread), never on the shared event
+    loop: the first catalog load, the chat history read, the trigram lookups
+    and building the chains all block, and would stall every other
+    conversation in the process.
+
+    Returns:
+        (fast_result, history_window, candidate_names); only fast_result is set
+        when the fast path answered
+    """
+    # Trivial messages (greetings, "menu of X", "price of Y") are resolved locally
+    fast_result = fast_path.classify(user_input)
+    if fast_result is not None:
+        return fast_result, None, None
+    # Recent turns of this session, trimmed to the prompt token budget
+    history_window = conversation_context.get_context_window(session_id)
+    candidate_names = candidates.for_message(user_input, history_window)
+    for kind in ("intent", "entities"):
+        prompts.chain(kind)  # langchain import and client build, normally done in app.startup()
+    return None, history_window, candidate_names
+
+
+def _order_structure(entities):
+    """Order data in the llm_order.llm_order shape, or None if no items were extracted."""
+    order_items = entities.get("order_items")
+    if not isinstance(order_items, dict) or not order_items:
+        return None
+    return {
+        "restaurant_name": entities.get("order_restaurant") or "ourselection",
+        "entities": order_items
+    }
+
+
+async def llm_intent_entity_async(user_input, session_id=None, prepared=None):
+    """
+    Main function to get intent and entities together
+
+    prepared: _prepare(user_input, session_id), computed by the caller off the
+    event loop; computed in a worker thread if omitted
+    """
     print(f"Starting processing for: {user_input}")
-    
-    # In a real app, this would get actual chat history
-    chat_history = []  
+
+    if prepared is None:
+        prepared = await asyncio.to_thread(_prepare, user_input, session_id)
+    fast_result, history_window, candidate_names = prepared
+    if fast_result is not None:
+        print(f"Fast path: {fast_result['category']}")
+        return json.dumps(fast_result, ensure_ascii=False)
     
     try:
         # Run both tasks at the same time
-        intent_task = get_intent_classification(user_input, chat_history)
-        entity_task = get_entity_extraction(user_input, chat_history)
+        intent_task = get_intent_classification(user_input, history_window)
+        entity_task = get_entity_extraction(user_input, history_window, candidate_names)
         
         # Wait for both to finish
         intent, entities = await asyncio.gather(intent_task, entity_task)
@@ -263,7 +381,10 @@ async def llm_intent_entity_async(user_input):
                     "dish": entities.get("dish", ""),
                     "size": entities.get("size", ""),
                     "variant": entities.get("variant", ""),
-                    "order_qty": entities.get("order_qty", "")
+                    "order_qty": entities.get("order_qty", ""),
+                    # Multi-item order extracted in the same call, so the order path
+                    # doesn't need a second, sequential LLM round-trip
+                    "order": _order_structure(entities)
                 }
         
         llm_output = json.dumps(llm_output, ensure_ascii=False)
@@ -280,9 +401,13 @@ async def llm_intent_entity_async(user_input):
         }
 
 # Helper to run the async function from synchronous code
-def llm_intent_entity(user_input):
-    """Simple way to run async code from synchronous context"""
-    return asyncio.run(llm_intent_entity_async(user_input))
+def llm_intent_entity(user_input, session_id=None):
+    """Run the async pipeline on the worker's persistent event loop"""
+    # Resolved here: the loop thread has no Flask request context
+    session_id = session_id or get_session_id()
+    # Blocking lookups run here, on the request thread; only the LLM calls go to the loop
+    prepared = _prepare(user_input, session_id)
+    return async_runtime.run(llm_intent_entity_async(user_input, session_id, prepared))
 
 # # Example usage
 # if __name__ == "__main__":
@@ -0,0 +1,214 @@
+"""
+Result cache for LLM calls.
+
+Users ask the same things over and over ("kottu price", "is kandiah open"),
+and each one used to pay full LLM latency and tokens. ResultCache keeps
+recent results in a bounded LRU with a TTL and, optionally, in a sqlite
+file so hits survive restarts and are shared by every worker on the host.
+
+Keys are built with make_key() from the normalized user input, the history
+window sent with the prompt and a version string for everything baked
+into the prompt (template text, restaurant/dish vocabulary). Changing any
+of those produces new keys, so stale entries are never served and simply
+age out.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))      # entries kept in memory
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "21600"))     # seconds (6 hours)
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "llm_cache_foodstation.db")  # "" disables the disk tier
+LLM_CACHE_PURGE_EVERY = int(os.getenv("LLM_CACHE_PURGE_EVERY", "200"))           # disk writes between purges
+LLM_CACHE_PURGE_INTERVAL = float(os.getenv("LLM_CACHE_PURGE_INTERVAL", "300"))  # max seconds between purges
+
+
+def normalize_input(text):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = " ".join(str(text or "").lower().split())
+    return re.sub(r"[\s?!.,]+$", "", text)
+
+
+def make_key(kind, user_input, history=None, version=""):
+    """
+    Cache key for one LLM call.
+
+    Args:
+        kind: which call this is (e.g. "intent", "entities")
+        user_input: raw user message (normalized here)
+        history: the chat history window passed to the prompt
+        version: hash of the prompt template and vocabulary
+    """
+    payload = json.dumps([kind, normalize_input(user_input), history or [], version],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL cache of strings with an optional sqlite tier.
+
+    The in-memory LRU and the sqlite file have separate locks, so a slow disk
+    read or write never blocks memory hits. Caches that share a db_path keep
+    their rows in separate tables (`table`), so clear() on one leaves the
+    others alone. aget()/aset() are the coroutine
+    versions for the shared event loop (async_runtime): memory is served
+    inline and only the disk tier runs in a worker thread.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, db_path=LLM_CACHE_DB, table="llm_cache"):
+        if not re.fullmatch(r"[A-Za-z_]\w*", table):
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path or None
+        self.table = table
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_lock = threading.Lock()
+        self._writes_since_purge = 0
+        self._purged_at = time.monotonic()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0}
+
+    def _disk(self):
+        """The sqlite connection (call with _disk_lock held)."""
+        if self.db_path is None:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(f"""CREATE TABLE IF NOT EXISTS {self.table}
+                (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)""")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_expires ON {self.table} (expires_at)")
+            self._db.commit()
+        return self._db
+
+    def _get_memory(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expired"] += 1
+        return None
+
+    def _get_disk(self, key, now):
+        """Disk lookup after a memory miss; promotes hits into memory and counts the miss otherwise."""
+        row = None
+        if self.db_path is not None:
+            try:
+                with self._disk_lock:
+                    row = self._disk().execute(
+                        f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"LLM cache read error: {e}")
+        with self._lock:
+            if row and row[1] > now:
+                self._put(key, row[0], row[1])
+                self._stats["disk_hits"] += 1
+                return row[0]
+            self._stats["misses"] += 1
+        return None
+
+    def get(self, key):
+        """Cached value for key, or None."""
+        now = time.time()
+        value = self._get_memory(key, now)
+        return value if value is not None else self._get_disk(key, now)
+
+    async def aget(self, key):
+        """get() for coroutines: the disk tier is read in a worker thread."""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            return value
+        if self.db_path is None:
+            return self._get_disk(key, now)
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    def _set_memory(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._put(key, value, expires_at)
+            self._stats["sets"] += 1
+        return expires_at
+
+    def _set_disk(self, key, value, expires_at):
+        if self.db_path is None:
+            return
+        try:
+            with self._disk_lock:
+                db = self._disk()
+                db.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                           (key, value, expires_at))
+                # Expired rows are purged every LLM_CACHE_PURGE_EVERY writes or
+                # LLM_CACHE_PURGE_INTERVAL seconds, not on every write
+                self._writes_since_purge += 1
+                if (self._writes_since_purge >= LLM_CACHE_PURGE_EVERY
+                        or time.monotonic() - self._purged_at >= LLM_CACHE_PURGE_INTERVAL):
+                    db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+                    self._writes_since_purge = 0
+                    self._purged_at = time.monotonic()
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"LLM cache write error: {e}")
+
+    def set(self, key, value):
+        """Store value under key in memory and on disk."""
+        self._set_disk(key, value, self._set_memory(key, value))
+
+    async def aset(self, key, value):
+        """set() for coroutines: the disk tier is written in a worker thread."""
+        expires_at = self._set_memory(key, value)
+        if self.db_path is not None:
+            await asyncio.to_thread(self._set_disk, key, value, expires_at)
+
+    def _put(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _execute_disk(self, statement, params=()):
+        if self.db_path is None:
+            return
+        try:
+            with self._disk_lock:
+                db = self._disk()
+                db.execute(statement, params)
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"LLM cache write error: {e}")
+
+    def invalidate(self, key):
+        """Drop one entry from both tiers."""
+        with self._lock:
+            self._entries.pop(key, None)
+        self._execute_disk(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        self._execute_disk(f"DELETE FROM {self.table}")
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -1,121 +1,110 @@
-import requests
-from sqlalchemy import create_engine, MetaData, Table,text
 import llm
-import chat_history
-import pandas as pd
-from session_manager import get_session_id
+import candidates
 import json
+import prompts
 
 
-session_id = get_session_id()  # Use the same session ID everywhere
-def llm_order(question):
-    """
-    This function takes a user query and returns a structured JSON response
-    containing the restaurant name and entities extracted from the query.
-    It uses a language model to refine the query into a specific format.
-    """
-    
-    # Example data for entity extraction
-    example = [
-        {
-            "input": "Can I get a medium beef kothu in bluripples?",
-            "restaurant_name": "bluripples",
-            "entities": {
-                "item1": {
-                    "dish": "kottu",
-                    "variant": "beef",
-                    "size": "medium",
-                    "qty": "null"
-                }
+# Few-shot examples for entity extraction
+ORDER_EXAMPLES = [
+    {
+        "input": "Can I get a medium beef kothu in bluripples?",
+        "restaurant_name": "bluripples",
+        "entities": {
+            "item1": {
+                "dish": "kottu",
+                "variant": "beef",
+                "size": "medium",
+                "qty": "null"
             }
-        },
-        {
-            "input": "Order six beef rolls and six chicken rolls.",
-            "restaurant_name": "default",
-            "entities": {
-                "item1": {
-                    "dish": "roll",
-                    "variant": "beef",
-                    "size": "null",
-                    "qty": 6
-                },
-                "item2": {
-                    "dish": "roll",
-                    "variant": "chicken",
-                    "size": "null",
-                    "qty": 6
-                }
+        }
+    },
+    {
+        "input": "Order six beef rolls and six chicken rolls.",
+        "restaurant_name": "default",
+        "entities": {
+            "item1": {
+                "dish": "roll",
+                "variant": "beef",
+                "size": "null",
+                "qty": 6
+            },
+            "item2": {
+                "dish": "roll",
+                "variant": "chicken",
+                "size": "null",
+                "qty": 6
             }
-        },
-        {
-            "input": "I need one rice and curry from ice talk, can you?",
-            "restaurant_name": "ice talk",
-            "entities": {
-                "item1": {
-                    "dish": "rice and curry",
-                    "variant": "null",
-                    "size": "null",
-                    "qty": 1
-                }
+        }
+    },
+    {
+        "input": "I need one rice and curry from ice talk, can you?",
+        "restaurant_name": "ice talk",
+        "entities": {
+            "item1": {
+                "dish": "rice and curry",
+                "variant": "null",
+                "size": "null",
+                "qty": 1
             }
-        },
-        {
-            "input": "Order normal-sized fried rice with chicken.",
-            "restaurant_name": "default",
-            "entities": {
-                "item1": {
-                    "dish": "fried rice",
-                    "variant": "chicken",
-                    "size": "normal",
-                    "qty": "1"
-                }
+        }
+    },
+    {
+        "input": "Order normal-sized fried rice with chicken.",
+        "restaurant_name": "default",
+        "entities": {
+            "item1": {
+                "dish": "fried rice",
+                "variant": "chicken",
+                "size": "normal",
+                "qty": "1"
             }
-        },
-        {
-            "input": "Order chicken full kotthu 2.",
-            "restaurant_name": "default",
-            "entities": {
-                "item1": {
-                    "dish": "kotthu",
-                    "variant": "chicken",
-                    "size": "full",
-                    "qty": 2
-                }
+        }
+    },
+    {
+        "input": "Order chicken full kotthu 2.",
+        "restaurant_name": "default",
+        "entities": {
+            "item1": {
+                "dish": "kotthu",
+                "variant": "chicken",
+                "size": "full",
+                "qty": 2
             }
-        },
-        {
-            "input": "order two medium and 1 large chicken kotthu rotti",
-            "restaurant_name": "default",
-            "entities": {
-                "item1": {
-                    "dish": "kotthu rotti",
-                    "variant": "beef",
-                    "size": "medium",
-                    "qty": 2
-                },
-                "item2": {
-                    "dish": "kotthu rotti",
-                    "variant": "chicken",
-                    "size": "large",
-                    "qty": 1
-                }
+        }
+    },
+    {
+        "input": "order two medium and 1 large chicken kotthu rotti",
+        "restaurant_name": "default",
+        "entities": {
+            "item1": {
+                "dish": "kotthu rotti",
+                "variant": "beef",
+                "size": "medium",
+                "qty": 2
+            },
+            "item2": {
+                "dish": "kotthu rotti",
+                "variant": "chicken",
+                "size": "large",
+                "qty": 1
             }
-        },
-        {
-            "input": "order cheese large kotthu chicken from moms food",
-            "restaurant_name": "moms food",
-            "entities": {
-                "item1": {
-                    "dish": "cheese kotthu",
-                    "variant": "chicken",
-                    "size": "large",
-                    "qty": 1
-                }
+        }
+    },
+    {
+        "input": "order cheese large kotthu chicken from moms food",
+        "restaurant_name": "moms food",
+        "entities": {
+            "item1": {
+                "dish": "cheese kotthu",
+                "variant": "chicken",
+                "size": "large",
+                "qty": 1
             }
         }
-    ]
+    }
+]
 
-    refine_result_template = """
+ORDER_EXTRACTION_TEMPLATE = """
     You are a multilangual chat assistant for a food delivery platform specializing in taking orders from customers.
     Especially, understand Tanglish, Singlish and English.
     Your task is to:
@@ -142,11 +131,11 @@ def llm_order(question):
             - full → 2 person → medium
             - large → 4 person → large
         
-    Extract and correct restaurant using these lists:
-    Kandiah, Ice Talk, Bluberry, Jollybeez, Mum’s Food, ourselection
+    Extract and correct restaurant using these lists (most likely matches for this query):
+    {restaurant_candidates}
 
-    Extract and correct food using these lists:
-    ['Kotthu', 'Kotthu Rotti', 'Cheese Kotthu', 'Dolphin', 'Pittu Kotthu', 'Noodles', 'Pasta', 'String Hopper Kotthu', 'Bread Kotthu', 'Rice & Curry', 'Schezwan Rice', 'Mongolian Rice', 'Chopsuey Rice', 'Nasi Goreng', 'Biriyani', 'Fried Rice', 'Fry', 'Bbq', 'Tandoori', 'Grill', 'Devilled', 'Hot Butter', 'Curry', 'Kuruma', 'Parata', 'Mums Special Lime With Mint', 'Mums Special', 'Fresh Juice', 'Milk Shakes', 'Ice Cream', 'Nescafe', 'Milk Tea', 'Milo', 'Fruit Salad ', 'Wattalappam', 'Biscuit Pudding', 'Naan', 'French Fries', 'Soup', 'Salad', 'Mayyer Kelangu Fry', 'Hopper', 'Rolls', 'Samosa', 'Corn', 'Vadai', 'Shawarma', 'Bun', 'Kanji / Kenda', 'Chips', 'Mixture', 'Manyokka Fry']
+    Extract and correct food using these lists (most likely matches for this query):
+    {dish_candidates}
 
     For reference, here’s an example to illustrate the extraction pattern:
     Example—
@@ -179,11 +168,21 @@ def llm_order(question):
     """
 
 
-    # Assuming OpenAI's GPT model for execution
+# Examples are substituted once here; each order only fills in the question and its candidates
+prompts.register_text("order", ORDER_EXTRACTION_TEMPLATE, example=ORDER_EXAMPLES)
+
+
+def llm_order(question):
+    """
+    This function takes a user query and returns a structured JSON response
+    containing the restaurant name and entities extracted from the query.
+    It uses a language model to refine the query into a specific format.
+    """
+    candidate_names = candidates.for_message(question)
     chat_completion =  llm.llm3.chat.completions.create(
         model="deepseek-r1-distill-llama-70b",  # Ensure this is the correct model name
         messages=[
-            {"role": "user", "content": refine_result_template.format(example=example, question=question)},
+            {"role": "user", "content": prompts.render("order", question=question, **candidate_names.prompt_variables())},
         ],
         temperature=0.5,
         max_completion_tokens=4096,
@@ -0,0 +1,422 @@
+"""
+In-process snapshot of the restaurant / food_items catalog.
+
+The menu is small and changes rarely, but the price, menu and order paths
+used to re-read the same food_items ⋈ restaurants join on every chat turn.
+This module loads everything once into indexed, read-only structures and
+answers those lookups from memory. A fresh snapshot is built in the
+background when the current one is older than CATALOG_REFRESH_INTERVAL (or
+on demand via refresh_catalog()) and swapped in with a single reference
+assignment, so readers never see a half-built catalog.
+
+Callers fall back to SQL only when get_snapshot() returns None, i.e. the
+catalog could not be loaded yet.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from availability import AvailabilityIndex
+from db_config import db_conn
+from dish_search import TrigramIndex
+
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "300"))  # seconds
+CATALOG_RETRY_INTERVAL = 30  # seconds to wait after a failed load before trying again
+FUZZY_TOP_K = 5             # dish names considered when nothing matches as a substring
+FUZZY_THRESHOLD = 0.4       # minimum trigram score for a typo-tolerant match
+
+PRICE_KEYS = ['dish', 'variant', 'size', 'price', 'restaurant', 'availability', 'restaurant_status', 'available_time']
+
+
+def normalize_name(value):
+    """Lowercase and collapse whitespace; None for empty values."""
+    if value is None:
+        return None
+    value = " ".join(str(value).lower().split())
+    return value or None
+
+
+def _format_time(value):
+    return value.strftime('%H:%M') if value is not None else None
+
+
+def _time_range(start, end, separator):
+    if start is None or end is None:
+        return None
+    return f"{_format_time(start)}{separator}{_format_time(end)}"
+
+
+class CatalogSnapshot:
+    """
+    Immutable, indexed view of the catalog.
+
+    Indexes:
+        restaurants_by_name: normalized restaurant name -> restaurant row
+        items_by_id: food item id -> food item
+        by_restaurant: normalized restaurant name -> food items
+        by_dish: normalized dish name -> food items
+        by_dish_variant_size: (dish, variant, size), all normalized -> food items
+        dishes_by_restaurant: normalized restaurant name -> set of normalized dish names
+        dish_index: TrigramIndex over all normalized dish names
+        restaurant_index: TrigramIndex over all normalized restaurant names
+        availability: AvailabilityIndex (week slot bitmaps) over restaurants and food_items
+    """
+
+    def __init__(self, restaurants, food_items, menu_categories, loaded_at=None):
+        self.loaded_at = loaded_at or time.time()
+        self.restaurants = {r["restaurant_id"]: r for r in restaurants}
+        self.restaurants_by_name = {}
+        for restaurant in restaurants:
+            key = normalize_name(restaurant["name"])
+            if key is not None:
+                self.restaurants_by_name.setdefault(key, restaurant)
+
+        self.categories = {}
+        for row in menu_categories:
+            self.categories.setdefault(row["restaurant_id"], []).append(row["category"])
+
+        items = []
+        for row in food_items:
+            restaurant = self.restaurants.get(row["restaurant_id"])
+            if restaurant is None:
+                continue  # inner join semantics
+            item = dict(row)
+            item["restaurant"] = restaurant["name"]
+            item["dish_key"] = normalize_name(row["food_name"])
+            items.append(item)
+        # Same ordering as the SQL: restaurant name, then price
+        items.sort(key=lambda i: (i["restaurant"] or "", i["price"] is None, i["price"] or 0))
+        self.food_items = tuple(items)
+        self.items_by_id = {item["id"]: item for item in self.food_items}
+
+        self.by_restaurant = {}
+        self.by_dish = {}
+        self.by_dish_variant_size = {}
+        self.dishes_by_restaurant = {}
+        for item in self.food_items:
+            restaurant_key = normalize_name(item["restaurant"])
+            self.by_restaurant.setdefault(restaurant_key, []).append(item)
+            self.by_dish.setdefault(item["dish_key"], []).append(item)
+            self.dishes_by_restaurant.setdefault(restaurant_key, set()).add(item["dish_key"])
+            key = (item["dish_key"], normalize_name(item["variant"]), normalize_name(item["size"]))
+            self.by_dish_variant_size.setdefault(key, []).append(item)
+        self.dish_index = TrigramIndex(self.by_dish.keys())
+        self.restaurant_index = TrigramIndex(self.restaurants_by_name.keys())
+        for position, item in enumerate(self.food_items):
+            item["position"] = position  # bit position in the availability bitsets
+        self.availability = AvailabilityIndex(restaurants, self.food_items)
+
+    # -- lookups ---------------------------------------------------------
+
+    def _matching_restaurants(self, restaurant_name, exact=False):
+        """Normalized restaurant names matching like `r.name = x` (exact) or `r.name ILIKE '%x%'`."""
+        if exact:
+            key = normalize_name(restaurant_name)
+            restaurant = self.restaurants_by_name.get(key)
+            return {key} if restaurant is not None and restaurant["name"] == restaurant_name else set()
+        needle = (restaurant_name or "").lower()
+        return {key for key in self.restaurants_by_name if needle in key}
+
+    def restaurant_ids(self, restaurant_name, exact=False):
+        """Ids of the restaurants matching restaurant_name (see _matching_restaurants)."""
+        return {self.restaurants_by_name[key]["restaurant_id"]
+                for key in self._matching_restaurants(restaurant_name, exact)
+                if key in self.restaurants_by_name}
+
+    def _dish_names(self, restaurants):
+        """Dish names served by the given restaurants (None means every restaurant)."""
+        if restaurants is None:
+            return None
+        names = set()
+        for key in restaurants:
+            names |= self.dishes_by_restaurant.get(key, set())
+        return names
+
+    def _match_dishes(self, dish_name, restaurants=None):
+        """
+        Normalized dish names matching dish_name, using the trigram index.
+
+        Substring matches (the old ILIKE '%dish%') win; if there are none the
+        closest names above FUZZY_THRESHOLD are used so typos still resolve.
+        """
+        names = self._dish_names(restaurants)
+        matched = self.dish_index.contains(dish_name, names)
+        if not matched:
+            matched = [name for name, _ in self.dish_index.search(
+                dish_name, k=FUZZY_TOP_K, threshold=FUZZY_THRESHOLD, names=names)]
+        return matched
+
+    def _items_for(self, dish_keys, restaurants=None):
+        items = [item for key in dish_keys for item in self.by_dish.get(key, ())
+                 if restaurants is None or normalize_name(item["restaurant"]) in restaurants]
+        items.sort(key=lambda i: (i["restaurant"] or "", i["price"] is None, i["price"] or 0))
+        return items
+
+    def search_dishes(self, query, k=5, restaurant_name=None):
+        """
+        Ranked dish names closest to `query`.
+
+        Returns:
+            list of (normalized dish name, score), best first
+        """
+        restaurants = self._matching_restaurants(restaurant_name) if restaurant_name else None
+        return self.dish_index.search(query, k=k, names=self._dish_names(restaurants))
+
+    def menu_rows(self, restaurant_name, now=None):
+        """
+        Menu categories for a restaurant, shaped like the db_menu_request query rows.
+
+        Returns:
+            list of dicts: {name, timings, status, menulink, category}
+        """
+        now = now or datetime.now()
+        restaurant = self.restaurants_by_name.get(normalize_name(restaurant_name))
+        if restaurant is None:
+            return []
+        timings = _time_range(restaurant["opening_time"], restaurant["closing_time"], '-')
+        status = 'Open' if self.availability.restaurant_open(restaurant, now) else 'Closed'
+        return [{
+            "name": restaurant["name"],
+            "timings": timings,
+            "status": status,
+            "menulink": restaurant["menu_link"],
+            "category": category,
+        } for category in self.categories.get(restaurant["restaurant_id"], [])]
+
+    def price_rows(self, restaurant_name, dish_name, now=None):
+        """
+        Price/availability rows for dishes matching dish_name (substring, else fuzzy).
+
+        Returns:
+            list of dicts keyed by PRICE_KEYS, ordered by restaurant and price
+        """
+        now = now or datetime.now()
+        restaurants = self._matching_restaurants(restaurant_name) if restaurant_name else None
+        if restaurants is not None and not restaurants:
+            return []
+        dish_keys = self._match_dishes(dish_name, restaurants)
+        return [self._price_row(item, now) for item in self._items_for(dish_keys, restaurants)]
+
+    def item_price_rows(self, items, now=None):
+        """Price rows (PRICE_KEYS) for the given food items, in the given order."""
+        now = now or datetime.now()
+        return [self._price_row(item, now) for item in items]
+
+    def _price_row(self, item, now):
+        restaurant = self.restaurants[item["restaurant_id"]]
+        return {
+            "dish": item["food_name"],
+            "variant": item["variant"],
+            "size": item["size"],
+            "price": item["price"],
+            "restaurant": item["restaurant"],
+            "availability": 'Available Now' if self.availability.item_available(item["position"], now)
+                            else 'Not Available Now',
+            "restaurant_status": 'Open Now' if self.availability.restaurant_open(restaurant, now)
+                                 else 'Closed Now',
+            "available_time": _time_range(item["available_from"], item["available_until"], ' - '),
+        }
+
+    def available_now_rows(self, restaurant_name=None, now=None):
+        """
+        Price rows for every item that is available and whose restaurant is open at `now`,
+        answered from the availability bitmaps.
+
+        Returns:
+            list of dicts keyed by PRICE_KEYS, ordered by restaurant and price
+        """
+        now = now or datetime.now()
+        restaurants = self._matching_restaurants(restaurant_name) if restaurant_name else None
+        return [self._price_row(item, now) for item in self.availability.available_items(now)
+                if restaurants is None or normalize_name(item["restaurant"]) in restaurants]
+
+    def open_restaurant_rows(self, now=None, restaurant_name=None):
+        """Restaurants open at `now`: {name, timings, status, menulink}, optionally only those matching restaurant_name."""
+        now = now or datetime.now()
+        open_ids = self.availability.open_restaurant_ids(now)
+        if restaurant_name:
+            open_ids &= self.restaurant_ids(restaurant_name)
+        return [{
+            "name": r["name"],
+            "timings": _time_range(r["opening_time"], r["closing_time"], '-'),
+            "status": 'Open',
+            "menulink": r["menu_link"],
+        } for rid, r in sorted(self.restaurants.items(), key=lambda kv: kv[1]["name"] or "") if rid in open_ids]
+
+    def dish_rows(self, dish, restaurant_name):
+        """
+        Food item rows for a dish at a restaurant, shaped like dish_info's query rows.
+
+        Tries an exact dish name match first, then the trigram index (substring,
+        else closest names).
+
+        Returns:
+            list of dicts: {id, food_name, variant, size, price}
+        """
+        restaurants = self._matching_restaurants(restaurant_name, exact=True)
+        if not restaurants:
+            return []
+        items = self._items_for(self._dish_names(restaurants), restaurants)
+        results = [i for i in items if i["food_name"] == dish]
+        if not results:
+            results = self._items_for(self._match_dishes(dish, restaurants), restaurants)
+        return self.item_dish_rows(results)
+
+    @staticmethod
+    def item_dish_rows(items):
+        """dish_info-shaped rows ({id, food_name, variant, size, price}) for food items."""
+        return [{
+            "id": i["id"],
+            "food_name": i["food_name"],
+            "variant": i["variant"],
+            "size": i["size"],
+            "price": i["price"],
+        } for i in items]
+
+
+def load_snapshot(conn=None):
+    """
+    Read restaurants, food items and menu categories into a CatalogSnapshot.
+
+    Args:
+        conn: optional DB-API connection; a pooled connection is used if omitted
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = db_conn()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT restaurant_id, name, opening_time, closing_time, menu_link FROM restaurants")
+        restaurants = [dict(zip(("restaurant_id", "name", "opening_time", "closing_time", "menu_link"), row))
+                       for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT id, restaurant_id, food_name, variant, size, price, available_from, available_until
+            FROM food_items
+        """)
+        food_items = [dict(zip(("id", "restaurant_id", "food_name", "variant", "size", "price",
+                                "available_from", "available_until"), row))
+                      for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT restaurant_id, category
+            FROM menu
+            WHERE category IS NOT NULL AND category <> ''
+        """)
+        menu_categories = [dict(zip(("restaurant_id", "category"), row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+
+    return CatalogSnapshot(restaurants, food_items, menu_categories)
+
+
+class MenuCatalog:
+    """
+    Holds the current CatalogSnapshot and refreshes it.
+
+    The first access loads synchronously; afterwards a stale snapshot keeps
+    being served while a background thread builds its replacement.
+    """
+
+    def __init__(self, loader=load_snapshot, refresh_interval=CATALOG_REFRESH_INTERVAL):
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_failure = 0.0
+
+    def snapshot(self):
+        """Current snapshot, or None if the catalog could not be loaded."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._load_first()
+        if self.refresh_interval and time.time() - snapshot.loaded_at > self.refresh_interval:
+            self._refresh_in_background()
+        return snapshot
+
+    def _load(self):
+        """Run the loader and swap its snapshot in (call with _lock held); None on failure."""
+        try:
+            snapshot = self._loader()
+        except Exception as e:
+            print(f"Catalog load error: {e}")
+            self._last_failure = time.time()
+            return None
+        self._snapshot = snapshot
+        return snapshot
+
+    def _load_first(self):
+        """Blocking first load: callers that arrive while it runs wait for its result instead of loading again."""
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            if time.time() - self._last_failure < CATALOG_RETRY_INTERVAL:
+                return None
+            snapshot = self._load()
+        if snapshot is not None:
+            _notify_refresh(snapshot)
+        return snapshot
+
+    def refresh(self):
+        """Load a new snapshot and swap it in. Returns the new snapshot or None on failure."""
+        with self._lock:
+            snapshot = self._load()
+        if snapshot is not None:
+            _notify_refresh(snapshot)
+        return snapshot
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="catalog-refresh", daemon=True).start()
+
+    def set_snapshot(self, snapshot):
+        """Install a prebuilt snapshot (e.g. from fixtures)."""
+        self._snapshot = snapshot
+        _notify_refresh(snapshot)
+
+
+_refresh_listeners = []
+
+
+def add_refresh_listener(listener):
+    """Call listener(snapshot) in the loading thread whenever a new snapshot is swapped in."""
+    _refresh_listeners.append(listener)
+
+
+def _notify_refresh(snapshot):
+    for listener in _refresh_listeners:
+        try:
+            listener(snapshot)
+        except Exception as e:
+            print(f"Catalog refresh listener error: {e}")
+
+
+_catalog = MenuCatalog()
+
+
+def get_catalog():
+    return _catalog
+
+
+def get_snapshot():
+    """Current catalog snapshot, or None if it is unavailable."""
+    return _catalog.snapshot()
+
+
+def refresh_catalog():
+    """Reload the catalog from the database now."""
+    return _catalog.refresh()
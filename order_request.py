@@ -1,14 +1,18 @@
 import json
-import sys
+import os
 import llm_order
-from flask import session
 import chat_history
+import session_store
 from session_manager import get_session_id
 from db_config import db_conn   # Make sure db_conn() now returns a psycopg2 connection
-from psycopg2 import sql, Error
-from psycopg2.extras import RealDictCursor
+import menu_catalog
+import row_shaping
+import vector_index
+import vocabulary
 
-session_id = get_session_id()
+# Use the order items extracted together with the intent (one LLM round-trip)
+# instead of a separate llm_order call; set to 0 to always call llm_order
+COMBINED_ORDER_EXTRACTION = os.getenv("COMBINED_ORDER_EXTRACTION", "1") != "0"
 
 def dish_info(dish, restaurant_name, dish_selected=None):
     """
@@ -27,6 +31,14 @@ def dish_info(dish, restaurant_name, dish_selected=None):
         or
         error dict if not found
     """
+    snapshot = menu_catalog.get_snapshot()
+    if snapshot is not None:
+        return _build_dish_info(_snapshot_dish_rows(snapshot, dish, restaurant_name, dish_selected),
+                                dish, restaurant_name)
+
+    from psycopg2 import Error
+    from psycopg2.extras import RealDictCursor
+
     cnx = None
     cursor = None
     try:
@@ -56,32 +68,7 @@ def dish_info(dish, restaurant_name, dish_selected=None):
                 cursor.execute(base_query + " AND fi.food_name ILIKE %s", (restaurant_name, f'%{dish}%'))
                 results = cursor.fetchall()
 
-        if not results:
-            return {"status": "error",
-                    "message": f"Dish '{dish}' not found in {restaurant_name}"}, set(), set(), set()
-
-        result_dict = {}
-        variants = set()
-        sizes = set()
-        dish_options = set()
-
-        for row in results:
-            variant = row["variant"].lower().strip() if row["variant"] else None
-            size = row["size"].lower().strip() if row["size"] else None
-            dish_options.add(row["food_name"].lower().strip())
-
-            result_dict[row["id"]] = {
-                "dish": row["food_name"],
-                "variant": variant,
-                "size": size,
-                "price": row["price"]
-            }
-            if variant:
-                variants.add(variant)
-            if size:
-                sizes.add(size)
-
-        return result_dict, variants, sizes, dish_options
+        return _build_dish_info(results, dish, restaurant_name)
 
     except Error as err:
         print(f"Database Error: {err}")
@@ -94,6 +81,109 @@ def dish_info(dish, restaurant_name, dish_selected=None):
             cnx.close()
 
 
+def _snapshot_dish_rows(snapshot, dish, restaurant_name, dish_selected=None):
+    """
+    Catalog rows for a dish; if the name matches nothing, the closest items from the
+    semantic index (vector_index), whose names are then offered as dish options.
+    """
+    rows = snapshot.dish_rows(dish, restaurant_name)
+    if not rows and not dish_selected:
+        rows = snapshot.item_dish_rows(vector_index.search_items(dish, restaurant_name, exact_restaurant=True))
+    return rows
+
+def _build_dish_info(results, dish, restaurant_name):
+    """
+    Groups food item rows into the (result_dict, variants, sizes, dish_options) shape.
+    """
+    if not results:
+        return {"status": "error",
+                "message": f"Dish '{dish}' not found in {restaurant_name}"}, set(), set(), set()
+
+    result_dict = {}
+    variants = set()
+    sizes = set()
+    dish_options = set()
+
+    for row in results:
+        variant = row["variant"].lower().strip() if row["variant"] else None
+        size = row["size"].lower().strip() if row["size"] else None
+        dish_options.add(row["food_name"].lower().strip())
+
+        result_dict[row["id"]] = {
+            "dish": row["food_name"],
+            "variant": variant,
+            "size": size,
+            "price": row["price"]
+        }
+        if variant:
+            variants.add(variant)
+        if size:
+            sizes.add(size)
+
+    return result_dict, variants, sizes, dish_options
+
+
+DISH_BATCH_QUERY = """
+    WITH wanted AS (
+        SELECT * FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS w(restaurant_name, dish, idx)
+    )
+    SELECT w.idx, fi.id, fi.food_name, fi.variant, fi.size, fi.price,
+           (fi.food_name = w.dish) AS exact
+    FROM wanted w
+    JOIN restaurants r ON r.name = w.restaurant_name
+    JOIN food_items fi ON fi.restaurant_id = r.restaurant_id
+    WHERE fi.food_name = w.dish OR fi.food_name ILIKE '%%' || w.dish || '%%'
+    ORDER BY w.idx, exact DESC
+"""
+
+def dish_info_batch(pairs):
+    """
+    Resolves many (restaurant_name, dish) pairs at once: one pass over the in-memory
+    catalog, or a single SQL round trip (exact matches win over ILIKE matches per pair).
+
+    Args:
+        pairs: list of (restaurant_name, dish) tuples
+
+    Returns:
+        list of dish_info results (result_dict, variants, sizes, dish_options), in request order
+    """
+    if not pairs:
+        return []
+
+    snapshot = menu_catalog.get_snapshot()
+    if snapshot is not None:
+        return [_build_dish_info(_snapshot_dish_rows(snapshot, dish, restaurant_name), dish, restaurant_name)
+                for restaurant_name, dish in pairs]
+
+    from psycopg2 import Error
+    from psycopg2.extras import RealDictCursor
+
+    cnx = None
+    cursor = None
+    try:
+        cnx = db_conn()
+        cursor = cnx.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(DISH_BATCH_QUERY, ([r for r, _ in pairs], [d for _, d in pairs]))
+        rows_by_request = [[] for _ in pairs]
+        for row in cursor.fetchall():
+            rows_by_request[row["idx"] - 1].append(row)
+    except Error as err:
+        print(f"Database Error: {err}")
+        error = {"status": "error", "message": f"Database error: {err}"}, set(), set(), set()
+        return [error for _ in pairs]
+    finally:
+        if cursor:
+            cursor.close()
+        if cnx:
+            cnx.close()
+
+    results = []
+    for (restaurant_name, dish), rows in zip(pairs, rows_by_request):
+        # Same precedence as dish_info: exact name matches, else the ILIKE matches
+        exact = [row for row in rows if row["exact"]]
+        results.append(_build_dish_info(exact or rows, dish, restaurant_name))
+    return results
+
 def normalize(value):
     """
     Cleans up a value by converting it to lowercase and removing spaces.
@@ -109,6 +199,72 @@ def normalize(value):
         return None
     return value.lower().strip()
 
+def _catalog_rows(db_dish_info):
+    """
+    dish_info's {food_id: {dish, variant, size, price}} as a JSON-safe list, so it can be
+    kept in the session store between selection turns (NUMERIC prices become floats).
+    """
+    return [row_shaping.json_safe({"food_id": food_id, **info}) for food_id, info in db_dish_info.items()]
+
+def resolve_item(item, dish, dish_selected=False, resolved=None):
+    """
+    Looks up the catalog rows for one order item and stores them on the item.
+    The order flow does catalog/DB I/O only here: once for all items on the first
+    pass (via dish_info_batch) and again only for an item whose dish the user picks.
+
+    Args:
+        item: Item dict from handle_order (updated in place)
+        dish: Dish name to look up
+        dish_selected: True when the user picked this exact dish name
+        resolved: dish_info result already fetched by dish_info_batch
+
+    Returns:
+        None on success, or the error dict from dish_info
+    """
+    if resolved is None:
+        resolved = dish_info(dish, item["restaurant_name"], dish_selected=dish_selected)
+    db_dish_info, available_variants, available_sizes, dish_options = resolved
+    if isinstance(db_dish_info, dict) and db_dish_info.get("status") == "error":
+        item["catalog_rows"] = []
+        item["available_variants"] = []
+        item["available_sizes"] = []
+        item["unavailable"] = db_dish_info["message"]
+        return db_dish_info
+
+    item["catalog_rows"] = _catalog_rows(db_dish_info)
+    # Sorted so numbered choices stay stable across turns
+    item["available_variants"] = sorted(available_variants)
+    item["available_sizes"] = sorted(available_sizes)
+    item["unavailable"] = None
+    if not dish_selected:
+        item["dish_options"] = sorted(dish_options)
+    return None
+
+def pending_selection(item, user_choice):
+    """
+    What the user still has to choose for one item, from its stored catalog rows (no I/O).
+
+    Returns:
+        "dish_option", "variant", "size", or None if the item is complete
+    """
+    # Step 1: Check if we need to select a dish
+    if len(item["dish_options"]) > 1 and "dish" not in user_choice:
+        return "dish_option"  # Multiple dish options, user needs to choose
+
+    # Step 2: Check if we need to select a variant
+    variant = user_choice.get("variant", item["variant"])
+    available_variants = item["available_variants"]
+    if available_variants and (not variant or variant not in available_variants):
+        return "variant"  # Variants available, user needs to choose
+
+    # Step 3: Check if we need to select a size
+    size = user_choice.get("size", item["size"])
+    available_sizes = item["available_sizes"]
+    if available_sizes and (not size or size not in available_sizes):
+        return "size"  # Sizes available, user needs to choose
+
+    return None
+
 def get_next_incomplete_item(items_info, user_selections):
     """
     Finds the next item that needs user input (dish, variant, or size).
@@ -122,45 +278,21 @@ def get_next_incomplete_item(items_info, user_selections):
         selection_type: What needs to be selected ("dish_option", "variant", "size", or None)
     """
     for item in items_info:
-        item_key = item["item_key"]  # Unique identifier for the item
-        user_choice = user_selections.get(item_key, {})  # Get user's choices for this item
-
-        # Step 1: Check if we need to select a dish
-        dish_options = item["dish_options"]
-        current_dish = user_choice.get("dish", item["dish"])
-        if len(dish_options) > 1 and "dish" not in user_choice:
-            return item, "dish_option"  # Multiple dish options, user needs to choose
-
-        # Step 2: If dish is selected, update dish info
-        if "dish" in user_choice:
-            db_dish_info, available_variants, available_sizes, _ = dish_info(
-                current_dish, item["restaurant_name"], dish_selected=True
-            )
-            item["db_dish_info"] = db_dish_info
-            item["available_variants"] = available_variants
-            item["available_sizes"] = available_sizes
-
-        # Step 3: Check if we need to select a variant
-        variant = user_choice.get("variant", item["variant"])
-        available_variants = item["available_variants"]
-        if available_variants and (not variant or variant not in available_variants):
-            return item, "variant"  # Variants available, user needs to choose
-
-        # Step 4: Check if we need to select a size
-        size = user_choice.get("size", item["size"])
-        available_sizes = item["available_sizes"]
-        if available_sizes and (not size or size not in available_sizes):
-            return item, "size"  # Sizes available, user needs to choose
+        selection_type = pending_selection(item, user_selections.get(item["item_key"], {}))
+        if selection_type:
+            return item, selection_type
 
     return None, None  # All selections complete
 
-def handle_order(order_data, user_selections=None):
+def handle_order(order_data, user_selections=None, items_info=None, unavailable_dishes=None):
     """
     Processes the order, asking for user input (dish, variant, size) one item at a time.
     
     Args:
         order_data: The order data from the LLM (contains restaurant and items)
         user_selections: User's choices so far (e.g., {item_key: {"dish": "pizza", "variant": "spicy"}})
+        items_info: Items resolved on an earlier turn (from the session store); resolved here if None
+        unavailable_dishes: Dishes found missing on the earlier turn
     
     Returns:
         Dictionary with status and details:
@@ -172,43 +304,45 @@ def handle_order(order_data, user_selections=None):
     """
     restaurant = order_data["restaurant_name"]
     final_orders = []
-    unavailable_dishes = []  # Track dishes not found in the database
     
     if user_selections is None:
         user_selections = {}  # Initialize empty selections if none provided
 
-    # Step 1: Collect info for all items
-    items_info = []
-    for item_key, item_info in order_data["entities"].items():
-        dish = normalize(item_info["dish"])  # Clean dish name
-        variant = normalize(item_info["variant"])  # Clean variant
-        size = normalize(item_info["size"])  # Clean size
-        qty = item_info.get("qty", 1)  # Default quantity is 1
-
-        if not dish:
-            continue  # Skip if no dish specified
-
-        # Get dish details from database
-        db_dish_info, available_variants, available_sizes, dish_options = dish_info(dish, restaurant)
-
-        # Check if dish_info returned an error
-        if isinstance(db_dish_info, dict) and db_dish_info.get("status") == "error":
-            unavailable_dishes.append({"dish": dish, "message": db_dish_info["message"]})
-            continue
+    # Step 1: Collect info for all items (first turn only; later turns reuse the stored items)
+    if items_info is None:
+        items = []
+        vocab = vocabulary.get_vocabulary()
+        for item_key, item_info in order_data["entities"].items():
+            dish = normalize(item_info.get("dish"))  # Clean dish name
+            if not dish:
+                continue  # Skip if no dish specified
+
+            # Catalog spelling where the LLM output is recognizable ("Roll" -> "rolls",
+            # "chiken" -> "chicken", "full" -> "medium"), otherwise the cleaned value
+            variant = normalize(item_info.get("variant"))
+            size = normalize(item_info.get("size"))
+            items.append({
+                "item_key": item_key,
+                "original_dish": item_info["dish"],
+                "dish": vocab.dish(dish) or dish,
+                "variant": vocab.variant(variant) or variant,
+                "size": vocab.size(size) or size,
+                "quantity": item_info.get("qty", 1),  # Default quantity is 1
+                "restaurant_name": restaurant,
+                "dish_options": []
+            })
 
-        items_info.append({
-            "item_key": item_key,
-            "original_dish": item_info["dish"],
-            "dish": dish,
-            "variant": variant,
-            "size": size,
-            "quantity": qty,
-            "restaurant_name": restaurant,
-            "db_dish_info": db_dish_info,
-            "available_variants": available_variants,
-            "available_sizes": available_sizes,
-            "dish_options": dish_options
-        })
+        # Every dish in the order is looked up in one batch
+        items_info = []
+        unavailable_dishes = []  # Track dishes not found in the database
+        resolved = dish_info_batch([(restaurant, item["dish"]) for item in items])
+        for item, item_resolved in zip(items, resolved):
+            error = resolve_item(item, item["dish"], resolved=item_resolved)
+            if error:
+                unavailable_dishes.append({"dish": item["dish"], "message": error["message"]})
+                continue
+            items_info.append(item)
+    unavailable_dishes = list(unavailable_dishes or [])
 
     # If no valid items were found, return error with unavailable dishes
     if not items_info and unavailable_dishes:
@@ -225,30 +359,36 @@ def handle_order(order_data, user_selections=None):
         item_key = next_item["item_key"]
         user_choice = user_selections.get(item_key, {})
         
-        # Count how many items still need selections
-        remaining_items = sum(1 for item, _ in 
-                            [get_next_incomplete_item([item], user_selections) 
-                             for item in items_info] if item is not None)
+        # Count how many items still need selections (stored rows only, no I/O)
+        remaining_items = sum(1 for item in items_info
+                              if pending_selection(item, user_selections.get(item["item_key"], {})))
+        order_state = {
+            'order_data': order_data,
+            'user_selections': user_selections,
+            'items_info': items_info,
+            'unavailable_dishes': unavailable_dishes,
+            'pending_items_count': remaining_items
+        }
 
         # Handle dish selection
         if selection_type == "dish_option":
-            session['awaiting_selection'] = True
-            session['selection_type'] = 'dish_option'
-            session['current_item'] = {
-                "item_key": item_key,
-                "dish": next_item["original_dish"],
-                "available_dishes_options": list(next_item["dish_options"])
-            }
-            session['order_data'] = order_data
-            session['user_selections'] = user_selections
-            session['pending_items_count'] = remaining_items
+            _save_selection_state({
+                'awaiting_selection': True,
+                'selection_type': 'dish_option',
+                'current_item': {
+                    "item_key": item_key,
+                    "dish": next_item["original_dish"],
+                    "available_dishes_options": next_item["dish_options"]
+                },
+                **order_state
+            })
             
             return {
                 "status": "needs_dish_selection",
                 "item": {
                     "item_key": item_key,
                     "dish": next_item["original_dish"],
-                    "available_dishes_options": list(next_item["dish_options"]),
+                    "available_dishes_options": next_item["dish_options"],
                     "message": f"I found multiple options for {next_item['original_dish']}. Please select one:",
                     "error": None,
                     "remaining_items": remaining_items,
@@ -265,17 +405,17 @@ def handle_order(order_data, user_selections=None):
             if current_variant and current_variant not in next_item["available_variants"]:
                 variant_error = f"The variant '{current_variant}' is not available for {current_dish}"
             
-            session['awaiting_selection'] = True
-            session['selection_type'] = 'variant'
-            session['current_item'] = {
-                "item_key": item_key,
-                "dish": current_dish,
-                "current_variant": current_variant,
-                "available_variants": list(next_item["available_variants"])
-            }
-            session['order_data'] = order_data
-            session['user_selections'] = user_selections
-            session['pending_items_count'] = remaining_items
+            _save_selection_state({
+                'awaiting_selection': True,
+                'selection_type': 'variant',
+                'current_item': {
+                    "item_key": item_key,
+                    "dish": current_dish,
+                    "current_variant": current_variant,
+                    "available_variants": next_item["available_variants"]
+                },
+                **order_state
+            })
             
             return {
                 "status": "needs_variant",
@@ -283,7 +423,7 @@ def handle_order(order_data, user_selections=None):
                     "item_key": item_key,
                     "dish": current_dish,
                     "current_variant": current_variant,
-                    "available_variants": list(next_item["available_variants"]),
+                    "available_variants": next_item["available_variants"],
                     "message": f"Please choose a variant for {current_dish}",
                     "error": variant_error,
                     "remaining_items": remaining_items,
@@ -300,17 +440,17 @@ def handle_order(order_data, user_selections=None):
             if current_size and current_size not in next_item["available_sizes"]:
                 size_error = f"The size '{current_size}' is not available for {current_dish}"
             
-            session['awaiting_selection'] = True
-            session['selection_type'] = 'size'
-            session['current_item'] = {
-                "item_key": item_key,
-                "dish": current_dish,
-                "current_size": current_size,
-                "available_sizes": list(next_item["available_sizes"])
-            }
-            session['order_data'] = order_data
-            session['user_selections'] = user_selections
-            session['pending_items_count'] = remaining_items
+            _save_selection_state({
+                'awaiting_selection': True,
+                'selection_type': 'size',
+                'current_item': {
+                    "item_key": item_key,
+                    "dish": current_dish,
+                    "current_size": current_size,
+                    "available_sizes": next_item["available_sizes"]
+                },
+                **order_state
+            })
             
             return {
                 "status": "needs_size",
@@ -318,7 +458,7 @@ def handle_order(order_data, user_selections=None):
                     "item_key": item_key,
                     "dish": current_dish,
                     "current_size": current_size,
-                    "available_sizes": list(next_item["available_sizes"]),
+                    "available_sizes": next_item["available_sizes"],
                     "message": f"Please choose a size for {current_dish}",
                     "error": size_error,
                     "remaining_items": remaining_items,
@@ -336,32 +476,27 @@ def handle_order(order_data, user_selections=None):
         final_variant = user_choice.get("variant", item["variant"])
         final_size = user_choice.get("size", item["size"])
         
-        # Update dish info if dish was changed
-        if "dish" in user_choice:
-            db_dish_info, _, _, _ = dish_info(final_dish, restaurant)
-            # Check if dish_info returned an error
-            if isinstance(db_dish_info, dict) and db_dish_info.get("status") == "error":
-                unavailable_dishes.append({"dish": final_dish, "message": db_dish_info["message"]})
-                continue
-        else:
-            db_dish_info = item["db_dish_info"]
+        # Rows were refreshed by resolve_item when the dish was changed
+        if item.get("unavailable"):
+            unavailable_dishes.append({"dish": final_dish, "message": item["unavailable"]})
+            continue
         
-        # Find the matching food item in the database
-        selected_food_id = None
-        for food_id, db_item in db_dish_info.items():
-            item_variant = db_item["variant"]
-            item_size = db_item["size"]
+        # Find the matching food item in the catalog rows
+        selected_row = None
+        for row in item["catalog_rows"]:
+            item_variant = row["variant"]
+            item_size = row["size"]
             if (final_variant == item_variant or not item_variant) and (final_size == item_size or not item_size):
-                selected_food_id = food_id
+                selected_row = row
                 break
 
-        if selected_food_id:
+        if selected_row:
             final_orders.append({
-                "food_id": selected_food_id,
+                "food_id": selected_row["food_id"],
                 "dish": final_dish,
                 "variant": final_variant or 'N/A',
                 "size": final_size or 'N/A',
-                "price": db_dish_info[selected_food_id]["price"],
+                "price": selected_row["price"],
                 "quantity": item["quantity"]
             })
 
@@ -371,16 +506,21 @@ def handle_order(order_data, user_selections=None):
         "unavailable_dishes": unavailable_dishes  # Include unavailable dishes in the response
     }
 
+def _selection_key():
+    return f"order:{get_session_id()}"
+
+def _save_selection_state(state):
+    """
+    Stores the order-selection state server-side, keyed by the user's session id
+    (only the id travels in the cookie).
+    """
+    session_store.get_store().set(_selection_key(), state)
+
 def clear_selection_session():
     """
     Clears all session data related to the order selection process.
     """
-    session.pop('awaiting_selection', None)
-    session.pop('selection_type', None)
-    session.pop('current_item', None)
-    session.pop('order_data', None)
-    session.pop('user_selections', None)
-    session.pop('pending_items_count', None)
+    session_store.get_store().delete(_selection_key())
 
 def is_awaiting_selection():
     """
@@ -389,24 +529,27 @@ def is_awaiting_selection():
     Returns:
         True if waiting for a selection, False otherwise
     """
-    return session.get('awaiting_selection', False)
+    return bool(session_store.get_store().get(_selection_key()).get('awaiting_selection', False))
 
 def get_selection_context():
     """
-    Gets the current selection context from the session.
+    Gets the current selection context from the session store.
     
     Returns:
         Dictionary with selection details or None if not waiting for a selection
     """
-    if not is_awaiting_selection():
+    state = session_store.get_store().get(_selection_key())
+    if not state.get('awaiting_selection'):
         return None
     
     return {
-        'selection_type': session.get('selection_type'),
-        'current_item': session.get('current_item'),
-        'order_data': session.get('order_data'),
-        'user_selections': session.get('user_selections', {}),
-        'pending_items_count': session.get('pending_items_count', 0)
+        'selection_type': state.get('selection_type'),
+        'current_item': state.get('current_item'),
+        'order_data': state.get('order_data'),
+        'user_selections': state.get('user_selections', {}),
+        'items_info': state.get('items_info'),
+        'unavailable_dishes': state.get('unavailable_dishes'),
+        'pending_items_count': state.get('pending_items_count', 0)
     }
 
 def preprocess_order_request(json_output, user_selections=None):
@@ -422,24 +565,27 @@ def preprocess_order_request(json_output, user_selections=None):
     """
     try:
         user_input = json_output["corrected_input"]
-        llm_order_json = llm_order.llm_order(user_input)  # Convert user input to order data
+        llm_order_json = json_output.get("order") if COMBINED_ORDER_EXTRACTION else None
+        if not llm_order_json or not llm_order_json.get("entities"):
+            llm_order_json = llm_order.llm_order(user_input)  # Convert user input to order data
         
         if not llm_order_json or "entities" not in llm_order_json:
             # Log error if order data is invalid
-            chat_history.insert_application_logs(session_id, json_output["corrected_input"], 
+            chat_history.insert_application_logs(get_session_id(), json_output["corrected_input"], 
                                                 "Invalid order data received", "qwen", "str")
             return {"status": "error", "message": "Invalid order data received"}
         
         # Process the order
         order_result = handle_order(llm_order_json, user_selections)
-        chat_history.insert_application_logs(session_id, json_output["corrected_input"], 
-                                            str(order_result), "qwen", "str")
+        chat_history.insert_application_logs(get_session_id(), json_output["corrected_input"], 
+                                            json.dumps(row_shaping.json_safe(order_result)), "qwen", "json")
         return order_result
     except Exception as e:
         print(f"Error in preprocess_order_request: {e}")
         return {"status": "error", "message": "Sorry, there was an error processing your selection. Please try again."}
 
-def process_user_selection(original_order_data, item_key, selection_type, selected_value, user_selections=None):
+def process_user_selection(original_order_data, item_key, selection_type, selected_value, user_selections=None,
+                           items_info=None, unavailable_dishes=None):
     """
     Processes a user's selection (e.g., choosing a dish, variant, or size).
     
@@ -449,6 +595,8 @@ def process_user_selection(original_order_data, item_key, selection_type, select
         selection_type: Type of selection ("dish", "variant", "size")
         selected_value: The user's choice
         user_selections: Previous user selections
+        items_info: Items resolved on the first turn; only the selected item is advanced
+        unavailable_dishes: Dishes found missing on the first turn
     
     Returns:
         Result from handle_order or an error message
@@ -462,9 +610,16 @@ def process_user_selection(original_order_data, item_key, selection_type, select
             user_selections[item_key] = {}
         
         user_selections[item_key][selection_type] = selected_value
+
+        # A new dish means new variants/sizes: re-resolve that one item only
+        if selection_type == "dish" and items_info is not None:
+            for item in items_info:
+                if item["item_key"] == item_key:
+                    resolve_item(item, selected_value, dish_selected=True)
+                    break
         
         # Continue processing the order
-        return handle_order(original_order_data, user_selections)
+        return handle_order(original_order_data, user_selections, items_info, unavailable_dishes)
     except Exception as e:
         print(f"Error in process_user_selection: {e}")
         return {"status": "error", "message": "Sorry, there was an error processing your selection. Please try again."}
@@ -480,12 +635,10 @@ def handle_user_selection_response(user_choice):
         Result from process_user_selection or an error message
     """
     try:
-        if not is_awaiting_selection():
-            return {"status": "error", "message": "No selection process is currently active"}
-        
+        # One store read: None means no selection process is active
         context = get_selection_context()
         if not context:
-            return {"status": "error", "message": "Selection context not found"}
+            return {"status": "error", "message": "No selection process is currently active"}
             
         selection_type = context['selection_type']
         current_item = context['current_item']
@@ -537,16 +690,18 @@ def handle_user_selection_response(user_choice):
             current_item['item_key'], 
             field_name,
             selected_value, 
-            user_selections
+            user_selections,
+            context['items_info'],
+            context['unavailable_dishes']
         )
 
         # Log the user's selection
         chat_history.insert_application_logs(
-            session_id,
+            get_session_id(),
             user_choice,
             f"User selected {selected_value} for {current_item['item_key']} ({selection_type})",
             "qwen",
-            "str"
+            chat_history.EVENT_RESPONSE_TYPE
         )
         
         # Clear session if order is complete or there's an error
@@ -0,0 +1,57 @@
+"""
+Lazily created objects that must not be shared across fork().
+
+gunicorn.conf.py does not preload the app: each worker imports it and runs
+app.startup() after the fork. Anything that is created before a fork anyway
+(`gunicorn --preload`, a multiprocessing child, a test that forks) would hand
+its sockets, threads or sqlite handles (connection pools, the background event
+loop, the log writer, ...) to the child. PerProcess wraps the factory and
+re-runs it the first time it is used in a new process:
+
+    _pool = PerProcess(lambda: ConnectionPool(_connect))
+
+    def get_pool():
+        return _pool.get()
+"""
+import os
+import threading
+
+
+class PerProcess:
+    """One object per process, created on first use by `factory()`."""
+
+    def __init__(self, factory, valid=None):
+        """
+        Args:
+            factory: zero-argument callable building the object
+            valid: optional predicate; an object it rejects (e.g. a closed
+                event loop) is replaced on the next get()
+        """
+        self._factory = factory
+        self._valid = valid
+        self._lock = threading.Lock()
+        self._entry = (None, None)  # (pid, object), swapped as one reference
+
+    def _usable(self, obj):
+        return obj is not None and (self._valid is None or self._valid(obj))
+
+    def get(self):
+        """This process's object, creating it if needed (double-checked under a lock)."""
+        obj = self.current()
+        if not self._usable(obj):
+            with self._lock:
+                obj = self.current()
+                if not self._usable(obj):
+                    obj = self._factory()
+                    self._entry = (os.getpid(), obj)
+        return obj
+
+    def current(self):
+        """The object created in this process, or None; never creates one."""
+        pid, obj = self._entry
+        return obj if pid == os.getpid() else None
+
+    def clear(self):
+        """Forget this process's object so the next get() builds a new one."""
+        with self._lock:
+            self._entry = (None, None)
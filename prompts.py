@@ -0,0 +1,150 @@
+"""
+Process-wide prompt registry.
+
+Every LLM prompt is registered once, at import of the module that owns it,
+and compiled once per process:
+
+  - text prompts (sent straight to the Groq client) are split into literal
+    segments and placeholders, with the variables that never change between
+    requests (few-shot examples, entity lists) substituted at registration;
+    rendering a request is a single join over the remaining placeholders.
+  - chat prompts (system template + chat history + user message) get one
+    `ChatPromptTemplate | client | StrOutputParser` chain, built on first use
+    (langchain is imported there, not at startup, see app.startup) and reused.
+
+Each prompt carries a version (hash of its template and bound values) that
+callers put into their cache keys, so editing a prompt never serves answers
+produced by the old one.
+"""
+import hashlib
+import json
+import string
+import threading
+
+from process_local import PerProcess
+
+_registry = {}
+_chains = PerProcess(dict)   # name -> compiled runnable, rebuilt after fork
+_lock = threading.Lock()
+_formatter = string.Formatter()
+
+
+class TextPrompt:
+    """A str.format template with its constant variables already substituted."""
+
+    def __init__(self, name, template, **bound):
+        self.name = name
+        self.segments = _compile(template, bound)
+        self.variables = sorted({value for is_field, value in self.segments if is_field})
+        self.version = _version(template, bound)
+
+    def render(self, **variables):
+        """The prompt text; `variables` must cover self.variables (extra keys are ignored)."""
+        return "".join(format(variables[value]) if is_field else value
+                       for is_field, value in self.segments)
+
+
+class ChatPrompt:
+    """A system template followed by the chat history and the user message."""
+
+    def __init__(self, name, template, client):
+        self.name = name
+        self.template = template
+        self.client = client
+        self.version = _version(template, {"client": client})
+
+    def build_template(self):
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+        return ChatPromptTemplate.from_messages([
+            ("system", self.template),
+            MessagesPlaceholder("chat_history"),
+            ("user", "{user_input}"),
+        ])
+
+    def build_chain(self):
+        from langchain_core.output_parsers import StrOutputParser
+        import llm
+
+        return self.build_template() | llm.get_client(self.client) | StrOutputParser()
+
+
+def _compile(template, bound):
+    """Template -> [(is_field, literal text or field name)], adjacent literals merged."""
+    segments = []
+
+    def add_literal(text):
+        if not text:
+            return
+        if segments and not segments[-1][0]:
+            segments[-1] = (False, segments[-1][1] + text)
+        else:
+            segments.append((False, text))
+
+    for literal, field, spec, conversion in _formatter.parse(template):
+        add_literal(literal)
+        if field is None:
+            continue
+        if spec or conversion or not field.isidentifier():
+            raise ValueError(f"unsupported placeholder {{{field}}} in prompt template")
+        if field in bound:
+            add_literal(format(bound[field]))
+        else:
+            segments.append((True, field))
+    return segments
+
+
+def _version(template, bound):
+    payload = json.dumps([template, sorted((k, str(v)) for k, v in bound.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def register_text(name, template, **bound):
+    """Register a text prompt; `bound` are the variables fixed for the life of the process."""
+    prompt = _registry[name] = TextPrompt(name, template, **bound)
+    return prompt
+
+
+def register_chat(name, template, client="llm5"):
+    """Register a system+history+user chat prompt run on the named llm.LLM_CLIENTS client."""
+    prompt = _registry[name] = ChatPrompt(name, template, client)
+    chains = _chains.current()
+    if chains is not None:
+        chains.pop(name, None)
+    return prompt
+
+
+def get(name):
+    return _registry[name]
+
+
+def render(name, **variables):
+    """Render a registered text prompt with the per-request variables."""
+    return _registry[name].render(**variables)
+
+
+def version(*names):
+    """Version of one prompt, or a combined version of several."""
+    if len(names) == 1:
+        return _registry[names[0]].version
+    combined = "".join(_registry[name].version for name in names)
+    return hashlib.sha256(combined.encode("utf-8")).hexdigest()[:16]
+
+
+def chain(name):
+    """The compiled runnable for a registered chat prompt (one per process)."""
+    chains = _chains.get()
+    runnable = chains.get(name)
+    if runnable is None:
+        with _lock:
+            runnable = chains.get(name)
+            if runnable is None:
+                runnable = chains[name] = _registry[name].build_chain()
+    return runnable
+
+
+def compile_all():
+    """Build every registered chain now (worker startup) instead of on the first request."""
+    for name, prompt in list(_registry.items()):
+        if isinstance(prompt, ChatPrompt):
+            chain(name)
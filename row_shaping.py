@@ -0,0 +1,121 @@
+"""
+Plain-Python shaping of DB rows into the JSON records the frontend renders.
+
+Result sets on the chat path are a handful of rows, but they used to go
+through pd.DataFrame(...).to_json() and straight back through json.loads()
+(sometimes followed by to_dict('records')). The helpers here do the same
+work in a single pass over tuples/dicts: column mapping, JSON-safe values
+(Decimal -> float, time/date -> ISO strings, NaN -> None), restaurant
+dedup with category aggregation, and restaurant/variant/size grouping.
+"""
+import json
+import math
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+RESTAURANT_FIELDS = ("name", "timings", "status", "menuLink")
+
+
+def json_safe(value):
+    """A value json.dumps can serialize, converted the way DataFrame.to_json would."""
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, Decimal):
+        return float(value) if value.is_finite() else None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (list, tuple, set)):
+        return [json_safe(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): json_safe(v) for k, v in value.items()}
+    return str(value)
+
+
+def _getter(row, column):
+    # Postgres folds unquoted aliases to lower case (menuLink -> menulink)
+    if column in row:
+        return row[column]
+    return row.get(column.lower())
+
+
+def records(rows, columns=None):
+    """
+    Rows -> list of JSON-safe dicts.
+
+    Args:
+        rows: tuples/sequences (need `columns`) or mappings (RealDictRow, sqlalchemy Row._mapping, dict)
+        columns: output keys, in order; for mappings, the keys to pick (case-insensitive fallback)
+    """
+    result = []
+    for row in rows:
+        if hasattr(row, "_mapping"):
+            row = row._mapping
+        if hasattr(row, "keys"):
+            keys = columns or list(row.keys())
+            result.append({key: json_safe(_getter(row, key)) for key in keys})
+        else:
+            result.append({key: json_safe(value) for key, value in zip(columns, row)})
+    return result
+
+
+def restaurant_records(rows):
+    """
+    Menu rows (one per restaurant/category) -> one record per restaurant.
+
+    Args:
+        rows: mappings with name, timings, status, menulink/menuLink and category/categories
+    Returns:
+        list of {name, timings, status, menuLink, categories}, in first-seen order,
+        categories de-duplicated and without blanks
+    """
+    restaurants = {}
+    for row in rows:
+        if hasattr(row, "_mapping"):
+            row = row._mapping
+        name = row.get("name")
+        record = restaurants.get(name)
+        if record is None:
+            record = {field: json_safe(_getter(row, field)) for field in RESTAURANT_FIELDS}
+            record["categories"] = []
+            restaurants[name] = record
+        category = row.get("category", row.get("categories"))
+        if category and category not in record["categories"]:
+            record["categories"].append(json_safe(category))
+    return list(restaurants.values())
+
+
+def group_by_restaurant(items):
+    """
+    Price records -> {restaurant: {status, dish, variants: {variant: {size: {Price, Availability, Available Time}}}}}
+    """
+    restaurants = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+
+        restaurant_name = item.get('Restaurant', 'Unknown Restaurant')
+        restaurant = restaurants.get(restaurant_name)
+        if restaurant is None:
+            restaurant = restaurants[restaurant_name] = {
+                'status': item.get('Restaurant Status', 'Status Unknown'),
+                'dish': item.get('Dish', 'Unknown Dish'),
+                'variants': {}
+            }
+
+        variant = item.get('Variant', 'Unknown Variant')
+        size = item.get('Size', 'Unknown Size')
+        restaurant['variants'].setdefault(variant, {})[size] = {
+            'Price': item.get('Price', 'N/A'),
+            'Availability': item.get('Availability', 'Availability unknown'),
+            'Available Time': item.get('Available Time', '')
+        }
+    return restaurants
+
+
+def to_json(data):
+    """Compact JSON string of already JSON-safe records (for logging)."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
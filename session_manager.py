@@ -1,7 +1,15 @@
 # session_manager.py
 import uuid
 
-session_id = str(uuid.uuid4())  # Generate once and share
+from flask import has_request_context, session
+
+# Used outside a request (scripts, benchmarks), where there is no user session
+_process_session_id = str(uuid.uuid4())
 
 def get_session_id():
-    return session_id
\ No newline at end of file
+    """Id of the current user's session, created in the Flask session cookie on first use"""
+    if has_request_context():
+        if 'session_id' not in session:
+            session['session_id'] = str(uuid.uuid4())
+        return session['session_id']
+    return _process_session_id
@@ -0,0 +1,167 @@
+"""
+Server-side per-user session state.
+
+The order flow used to keep order_data, user_selections and current_item in
+the Flask cookie session, so the whole cart travelled with every request
+and response. Now only the session id lives in the cookie; the state is
+kept here, keyed by that id:
+
+- values are dicts, stored as zlib-compressed JSON (compact, no pickle),
+- entries expire SESSION_TTL seconds after their last write,
+- the backend is "sqlite" (default; one file shared by every gunicorn
+  worker on the host, WAL mode) or "memory" (single-process/dev only,
+  since each worker would see its own copy).
+
+    store = session_store.get_store()
+    state = store.get(session_id)      # {} if missing or expired
+    store.set(session_id, state)
+    store.delete(session_id)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from process_local import PerProcess
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "sqlite")   # "sqlite" or "memory"
+SESSION_STORE_DB = os.getenv("SESSION_STORE_DB", "sessions_foodstation.db")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))                  # seconds since last write
+SESSION_PURGE_INTERVAL = 300                                            # seconds between expiry sweeps
+
+
+def encode(data):
+    """dict -> compressed bytes"""
+    return zlib.compress(json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def decode(blob):
+    """compressed bytes -> dict"""
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class MemoryBackend:
+    """Encoded blobs in a dict; visible to the current process only."""
+
+    def __init__(self):
+        self._entries = {}   # key -> (expires_at, blob)
+        self._lock = threading.Lock()
+
+    def load(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def save(self, key, blob, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, blob)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge(self, now):
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+
+
+class SqliteBackend:
+    """Encoded blobs in a local sqlite file, shared by all processes on the host."""
+
+    def __init__(self, db_path=SESSION_STORE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("""CREATE TABLE IF NOT EXISTS sessions
+                (key TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)""")
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, key, now):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        return row[0] if row else None
+
+    def save(self, key, blob, expires_at):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (key, data, expires_at) VALUES (?, ?, ?)",
+                         (key, blob, expires_at))
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def purge(self, now):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "sqlite": SqliteBackend,
+}
+
+
+class SessionStore:
+    """TTL'd dict-per-session store on top of a backend."""
+
+    def __init__(self, backend, ttl=SESSION_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._next_purge = time.time() + SESSION_PURGE_INTERVAL
+
+    def get(self, session_id):
+        """State for session_id, or {} if there is none (or it expired)."""
+        if not session_id:
+            return {}
+        try:
+            blob = self.backend.load(session_id, time.time())
+            return decode(blob) if blob is not None else {}
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            print(f"Session store read error: {e}")
+            return {}
+
+    def set(self, session_id, data):
+        """Replace the state for session_id and restart its TTL."""
+        now = time.time()
+        try:
+            self.backend.save(session_id, encode(data), now + self.ttl)
+            if now >= self._next_purge:
+                self._next_purge = now + SESSION_PURGE_INTERVAL
+                self.backend.purge(now)
+        except sqlite3.Error as e:
+            print(f"Session store write error: {e}")
+
+    def delete(self, session_id):
+        try:
+            self.backend.delete(session_id)
+        except sqlite3.Error as e:
+            print(f"Session store write error: {e}")
+
+
+_store = PerProcess(lambda: SessionStore(BACKENDS[SESSION_STORE_BACKEND]()))
+
+
+def get_store():
+    """This process's SessionStore for the configured backend (re-created after fork)."""
+    return _store.get()
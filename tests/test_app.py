@@ -0,0 +1,19 @@
+import json
+
+import app
+
+
+def test_history_replies_are_typed_like_live_replies():
+    menu = [{"name": "Kandiah", "timings": "10:00 - 22:00", "status": "Open", "menuLink": "#", "categories": ["Rice"]}]
+    assert [m["type"] for m in app.format_history_reply(json.dumps(menu), "json")] == ["restaurant_data1"]
+
+    prices = [{key: "1" for key in app.PRICE_RECORD_KEYS}]
+    assert [m["type"] for m in app.format_history_reply(json.dumps(prices), "json")] == ["restaurant_data"]
+
+    rows = [{"Dish": "Kotthu", "Price": 1200.0}]
+    assert app.format_history_reply(json.dumps(rows), "json") == [{"role": "assistant", "content": rows, "type": "table_data"}]
+
+    order = {"status": "complete", "orders": [{"dish": "Kotthu", "price": 1200.0, "quantity": 2}], "unavailable_dishes": []}
+    assert "Kotthu" in app.format_history_reply(json.dumps(order), "json")[0]["content"]
+
+    assert app.format_history_reply("Hello!", "str") == [{"role": "assistant", "content": "Hello!", "type": "text"}]
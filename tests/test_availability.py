@@ -0,0 +1,35 @@
+from datetime import datetime, time
+
+from availability import AvailabilityIndex
+
+
+def _open_at(opening, closing, hour, minute, day=1):
+    restaurant = {"restaurant_id": 1, "opening_time": opening, "closing_time": closing}
+    index = AvailabilityIndex([restaurant], [])
+    return index.restaurant_open(restaurant, datetime(2024, 1, day, hour, minute))  # 2024-01-01 is a Monday
+
+
+def test_closing_at_22_00_is_closed_from_22_00():
+    assert _open_at(time(10, 0), time(22, 0), 21, 59)
+    assert not _open_at(time(10, 0), time(22, 0), 22, 0)
+    assert not _open_at(time(10, 0), time(22, 0), 22, 1)
+
+
+def test_opening_off_the_quarter_hour_opens_at_the_next_slot():
+    assert not _open_at(time(10, 5), time(22, 0), 10, 0)
+    assert not _open_at(time(10, 5), time(22, 0), 10, 10)
+    assert _open_at(time(10, 5), time(22, 0), 10, 15)
+
+
+def test_window_crossing_midnight():
+    opening, closing = time(18, 0), time(2, 0)
+    assert not _open_at(opening, closing, 17, 59)
+    assert _open_at(opening, closing, 23, 30)
+    assert _open_at(opening, closing, 1, 59, day=2)
+    assert not _open_at(opening, closing, 2, 0, day=2)
+    assert _open_at(opening, closing, 0, 30, day=1)  # Monday 00:30 is Sunday night's window
+
+
+def test_closing_at_midnight():
+    assert _open_at(time(18, 0), time(0, 0), 23, 59)
+    assert not _open_at(time(18, 0), time(0, 0), 0, 0, day=2)
@@ -0,0 +1,31 @@
+import candidates
+import vocabulary
+
+# More names than CANDIDATE_FALLBACK_MAX, so the full list is never sent
+DISHES = vocabulary.FALLBACK_DISHES + [f"Chef Special {i}" for i in range(100)]
+
+
+def _vocabulary():
+    return vocabulary.Vocabulary(vocabulary.FALLBACK_RESTAURANTS, DISHES, [], [])
+
+
+def test_misspelled_dish_is_offered_before_accidental_short_match():
+    vocab = _vocabulary()
+    dishes = candidates._top(vocab.dishes, vocab.dish_index, ["2 kotu from kandiah"], candidates.CANDIDATE_DISHES)
+
+    assert "Kotthu" in dishes
+    assert dishes[0] != "Fry"  # " fr" of "from" alone must not make "fry" the best match
+
+
+def test_short_name_counts_as_mentioned_as_whole_word():
+    vocab = _vocabulary()
+    dishes = candidates._top(vocab.dishes, vocab.dish_index, ["one fry please"], candidates.CANDIDATE_DISHES)
+
+    assert dishes[0] == "Fry"
+
+
+def test_restaurant_still_found_in_same_message():
+    vocab = _vocabulary()
+    restaurants = candidates._top(vocab.restaurants, vocab.restaurant_index, ["2 kotu from kandiah"], 4)
+
+    assert restaurants[0] == "Kandiah"
@@ -0,0 +1,9 @@
+from decimal import Decimal
+
+import chat_history
+
+
+def test_log_fields_serialize_decimals():
+    assert chat_history._text({"price": Decimal("12.50")}) == '{"price": "12.50"}'
+    assert chat_history._text(Decimal("3")) == "3"
+    assert chat_history._text(None) is None
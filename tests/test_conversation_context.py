@@ -0,0 +1,24 @@
+import chat_history
+import conversation_context
+
+
+def _log(session_id, user_query, response, response_type="str"):
+    chat_history.insert_application_logs(session_id, user_query, response, "qwen", response_type)
+
+
+def test_events_are_left_out_of_the_context(monkeypatch, tmp_path):
+    monkeypatch.setattr(chat_history, "DB_NAME", str(tmp_path / "chat.db"))
+    monkeypatch.setattr(chat_history, "LOG_WRITE_BEHIND", False)
+    monkeypatch.setattr(conversation_context, "_store", conversation_context.ContextStore())
+    chat_history.create_application_logs()
+
+    _log("s1", "kotthu at kandiah", "Kandiah doesn't serve kotthu.", chat_history.EVENT_RESPONSE_TYPE)
+    _log("s1", "kotthu at kandiah", '[{"Dish": "Kotthu"}]', "json")
+    loaded = conversation_context.get_context_window("s1")
+
+    _log("s1", "2", "User selected large for item_1 (size)", chat_history.EVENT_RESPONSE_TYPE)
+    _log("s1", "thanks", "You're welcome!")
+    recorded = conversation_context.get_context_window("s1")
+
+    assert [m["content"] for m in loaded] == ["kotthu at kandiah", '[{"Dish": "Kotthu"}]']
+    assert [m["content"] for m in recorded] == ["kotthu at kandiah", '[{"Dish": "Kotthu"}]', "thanks", "You're welcome!"]
@@ -0,0 +1,60 @@
+from psycopg2 import extensions
+
+from db_config import ConnectionPool
+
+
+class _FakeConnection:
+    closed = 0
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_release_after_closeall_closes_the_connection():
+    pool = ConnectionPool(_FakeConnection, ping_after=None)
+    held = pool.getconn()
+    raw = held._conn
+
+    pool.closeall()
+    held.close()
+
+    assert raw.closed
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["size"] == 0
+
+
+def test_connections_checked_out_after_closeall_are_reused():
+    pool = ConnectionPool(_FakeConnection, ping_after=None)
+    pool.closeall()
+    held = pool.getconn()
+    raw = held._conn
+    held.close()
+
+    assert not raw.closed
+    assert pool.stats()["idle"] == 1
+
+
+def test_connection_checked_out_during_closeall_is_closed_on_release():
+    pool = ConnectionPool(_FakeConnection, ping_after=0)
+    pool.getconn().close()  # one idle connection, pinged on its next checkout
+
+    class _Cursor:
+        def execute(self, sql):
+            pool.closeall()  # runs while the idle connection is being health-checked
+
+        def close(self):
+            pass
+
+    raw = pool._idle[-1][0]
+    raw.cursor = _Cursor
+    held = pool.getconn()
+    held.close()
+
+    assert raw.closed
+    assert pool.stats()["size"] == 0
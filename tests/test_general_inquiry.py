@@ -0,0 +1,58 @@
+from datetime import datetime, time
+
+import general_inquiry
+import menu_catalog
+
+RESTAURANTS = [
+    {"restaurant_id": 1, "name": "Kandiah", "opening_time": time(0, 0), "closing_time": time(23, 59), "menu_link": None},
+    {"restaurant_id": 2, "name": "Ice Talk", "opening_time": time(0, 0), "closing_time": time(23, 59), "menu_link": None},
+    {"restaurant_id": 3, "name": "Bluberry", "opening_time": time(3, 0), "closing_time": time(3, 30), "menu_link": None},
+]
+
+
+class _Noon(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 1, 1, 12, 0)
+
+
+def _open_now(monkeypatch, restaurant, question="is it open now"):
+    monkeypatch.setattr(menu_catalog, "datetime", _Noon)
+    catalog = menu_catalog.MenuCatalog(loader=None)
+    catalog.set_snapshot(menu_catalog.CatalogSnapshot(RESTAURANTS, [], []))
+    monkeypatch.setattr(menu_catalog, "_catalog", catalog)
+    monkeypatch.setattr(general_inquiry, "_log_response", lambda *args: None)
+    return general_inquiry._availability_answer({"corrected_input": question, "restaurant": restaurant})
+
+
+def test_open_now_lists_only_the_named_restaurant(monkeypatch):
+    assert [row["name"] for row in _open_now(monkeypatch, "Kandiah")] == ["Kandiah"]
+
+
+def test_open_now_for_a_closed_restaurant(monkeypatch):
+    assert _open_now(monkeypatch, "Bluberry") == "Sorry, Bluberry is not open right now."
+
+
+def test_open_now_for_an_unknown_restaurant_is_left_to_sql(monkeypatch):
+    assert _open_now(monkeypatch, "Nowhere") is None
+
+
+def test_available_now_for_an_unknown_restaurant_is_left_to_sql(monkeypatch):
+    assert _open_now(monkeypatch, "Nowhere", "what food is available now") is None
+
+
+def test_open_now_without_restaurant_lists_every_open_one(monkeypatch):
+    assert [row["name"] for row in _open_now(monkeypatch, None)] == ["Ice Talk", "Kandiah"]
+
+
+def test_parameterize_sql_binds_whole_literals():
+    sql, binds = general_inquiry._parameterize_sql(
+        "SELECT * FROM menu WHERE name ILIKE '%Kotthu%' AND restaurant = 'kandiah'",
+        {"restaurant": "Kandiah", "dish": "kotthu"},
+    )
+    assert sql == "SELECT * FROM menu WHERE name ILIKE :p0 AND restaurant = :p1"
+    assert binds == {"p0": ["%", "dish", "%"], "p1": ["", "restaurant", ""]}
+
+
+def test_parameterize_sql_skips_statements_with_partial_matches():
+    assert general_inquiry._parameterize_sql("SELECT * FROM menu WHERE name ILIKE '%fried rice%'", {"dish": "rice"}) is None
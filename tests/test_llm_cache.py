@@ -0,0 +1,21 @@
+import pytest
+
+from llm_cache import ResultCache
+
+
+def test_caches_sharing_a_file_are_cleared_separately(tmp_path):
+    path = str(tmp_path / "cache.db")
+    llm = ResultCache(db_path=path)
+    sql = ResultCache(db_path=path, table="sql_cache")
+    llm.set("key", "intent")
+    sql.set("key", "SELECT 1")
+
+    sql.clear()
+
+    assert ResultCache(db_path=path).get("key") == "intent"
+    assert ResultCache(db_path=path, table="sql_cache").get("key") is None
+
+
+def test_table_name_is_validated():
+    with pytest.raises(ValueError):
+        ResultCache(db_path=None, table="llm_cache; DROP TABLE x")
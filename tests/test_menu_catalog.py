@@ -0,0 +1,24 @@
+import threading
+import time
+
+import menu_catalog
+
+
+def test_first_snapshot_is_loaded_once_for_concurrent_callers():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return menu_catalog.CatalogSnapshot([], [], [])
+
+    catalog = menu_catalog.MenuCatalog(loader=loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(catalog.snapshot())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
@@ -0,0 +1,32 @@
+import process_local
+from process_local import PerProcess
+
+
+def test_object_is_created_once_per_process(monkeypatch):
+    pid = [100]
+    monkeypatch.setattr(process_local.os, "getpid", lambda: pid[0])
+    holder = PerProcess(object)
+
+    first = holder.get()
+    assert holder.get() is first
+
+    pid[0] = 101  # forked worker
+    assert holder.current() is None
+    second = holder.get()
+    assert second is not first
+    assert holder.get() is second
+
+
+def test_invalid_object_is_replaced():
+    holder = PerProcess(lambda: {"closed": False}, valid=lambda obj: not obj["closed"])
+    first = holder.get()
+    first["closed"] = True
+    assert holder.get() is not first
+
+
+def test_clear_forgets_the_object():
+    holder = PerProcess(object)
+    first = holder.get()
+    holder.clear()
+    assert holder.current() is None
+    assert holder.get() is not first
@@ -1,13 +1,9 @@
-from langchain_core.messages import HumanMessage, AIMessage
 import get_unique_entity
-import pandas as pd
-import json
 import chat_history
 from session_manager import get_session_id
 import general_inquiry
 import order_request
-
-session_id = get_session_id()  # Use the same session ID everywhere
+import row_shaping
 
 class UserIntentHandler:
     def __init__(self):
@@ -33,9 +29,8 @@ class UserIntentHandler:
     def _process_dataframe_price(self, data, columns, session_id, corrected_input):
         """Helper to process successful dataframe responses"""
         try:
-            df = pd.DataFrame(data, columns=columns)
-            json_data = df.to_json(orient="records")
-            result = json.loads(json_data)
+            result = row_shaping.records(data, columns)
+            json_data = row_shaping.to_json(result)
             self._log_response(session_id, corrected_input, json_data, "json")
             # print(result)
             return result, "price data"
@@ -46,23 +41,12 @@ class UserIntentHandler:
         
 
 
-    def _process_dataframe_restaurant(self, data, columns, session_id, corrected_input):
+    def _process_dataframe_restaurant(self, data, session_id, corrected_input):
         """Processes restaurant data and formats it into structured JSON."""
         try:
-            df = pd.DataFrame(data, columns=columns)
-
-            df_categories = df.groupby("name")["categories"].agg(lambda x: list(set(x))).reset_index()
-
-            # Merge back with the main DataFrame to ensure correct indexing
-            df = df.drop(columns=["categories"]).drop_duplicates()
-            df = df.merge(df_categories, on="name", how="left")
-
-            # Drop duplicate rows, keeping only unique restaurant entries
-            df = df.drop_duplicates(subset=["name", "timings", "status", "menuLink"])
-
-            # Convert DataFrame to JSON
-            json_data = df.to_json(orient="records")  # Converts directly to structured JSON
-            result = json.loads(json_data)  # Parses JSON string into Python dictionary
+            # One record per restaurant with its categories aggregated
+            result = row_shaping.restaurant_records(data)
+            json_data = row_shaping.to_json(result)
 
             # Log and return response
             self._log_response(session_id, corrected_input, json_data, "json")
@@ -77,14 +61,14 @@ class UserIntentHandler:
 
     def greeting_handler(self, json_output):
         greeting_response = json_output.get("fallback_response", "Hello! How can I assist you today?")
-        self._log_response(session_id, json_output["corrected_input"], greeting_response, "str")
+        self._log_response(get_session_id(), json_output["corrected_input"], greeting_response, "str")
         return greeting_response, "text"
 
     def handle_menu_request(self, json_output):
         # Validate restaurant exists
         if not json_output.get("restaurant"):
             error_message = "Sorry, I couldn't find the restaurant. Please provide the restaurant name."
-            self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+            self._log_response(get_session_id(), json_output["corrected_input"], error_message, "str")
             return self._make_error_response(error_message)
 
         # Get menu items
@@ -93,19 +77,18 @@ class UserIntentHandler:
         # Handle empty results
         if not menu_items:
             error_message = json_output.get("fallback_response", f"Sorry, no menu items found for {json_output['restaurant']}.")
-            self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+            self._log_response(get_session_id(), json_output["corrected_input"], error_message, "str")
             return self._make_error_response(error_message)
 
         # Process successful results
-        columns = ['name', 'timings', 'status', 'menuLink', 'categories']
-        return self._process_dataframe_restaurant(menu_items, columns, session_id, json_output["corrected_input"])
+        return self._process_dataframe_restaurant(menu_items, get_session_id(), json_output["corrected_input"])
 
     def handle_price_inquiry(self, json_output, recursion_depth=0):
         # Validate dish exists
         if not json_output.get("dish"):
             error_message = (json_output.get("fallback_response") or 
                            "I couldn't identify the dish. Please verify the dish name and try again.")
-            self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+            self._log_response(get_session_id(), json_output["corrected_input"], error_message, "str")
             return self._make_error_response(error_message)
 
         # Get inquiry details
@@ -113,16 +96,19 @@ class UserIntentHandler:
         dish = json_output["dish"]
         variant = json_output.get("variant")
         size = json_output.get("size")
-        price_data = get_unique_entity.db_price_inquiry(restaurant, dish, variant, size)
+        price_data = get_unique_entity.db_price_inquiry(restaurant, dish, variant, size,
+                                                        query=json_output.get("search_query") or json_output.get("corrected_input"))
 
         # Handle empty results
         if not price_data:
             if recursion_depth < self.MAX_RECURSION_DEPTH and restaurant:
                 error_message = f"Unfortunately {restaurant} doesn't serve {dish}. Here is {dish} information from other places."
-                self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+                # The reply of this turn is what the recursive call logs, under the user's own words
+                self._log_response(get_session_id(), json_output["corrected_input"], error_message,
+                                   chat_history.EVENT_RESPONSE_TYPE)
                 
                 # Prepare for recursive call
-                json_output['corrected_input'] = f"provide me the prices of {dish}"
+                json_output['search_query'] = f"provide me the prices of {dish}"
                 json_output['restaurant'] = None
                 
                 # Make recursive call and handle response
@@ -142,12 +128,12 @@ class UserIntentHandler:
                 return self._make_error_response(error_message, recursive_result)
             
             error_message = f"Unfortunately no restaurants serve {dish}."
-            self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+            self._log_response(get_session_id(), json_output["corrected_input"], error_message, "str")
             return self._make_error_response(error_message)
 
         # Process successful results
         columns = ['Dish', 'Variant','Size', 'Price', 'Restaurant', 'Availability', 'Restaurant Status', 'Available Time']
-        return self._process_dataframe_price(price_data, columns, session_id, json_output["corrected_input"])
+        return self._process_dataframe_price(price_data, columns, get_session_id(), json_output["corrected_input"])
 
 
     def handle_general_inquiry(self, json_output):
@@ -155,18 +141,17 @@ class UserIntentHandler:
             return general_inquiry.generate_sql_query(json_output),""
         except Exception as e:
             error_message = f"Error processing general inquiry: {str(e)}"
-            self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+            self._log_response(get_session_id(), json_output["corrected_input"], error_message, "str")
             return self._make_error_response(error_message)
 
 
     def order_request(self, json_output):
         try:
-            clean_order = order_request.preprocess_order_request(json_output)
-            self._log_response(session_id, json_output["corrected_input"], clean_order, "json")
+            clean_order = order_request.preprocess_order_request(json_output)  # logs the result
             return clean_order,""
         except Exception as e:
             error_message = f"Error processing order inquiry: {str(e)}"
-            self._log_response(session_id, json_output["corrected_input"], error_message, "str")
+            self._log_response(get_session_id(), json_output["corrected_input"], error_message, "str")
             return self._make_error_response(error_message)
 
 
@@ -193,5 +178,5 @@ class UserIntentHandler:
                 
         except Exception as e:
             error_message = f"Error routing intent: {str(e)}"
-            self._log_response(session_id, json_output.get("corrected_input", ""), error_message, "str")
+            self._log_response(get_session_id(), json_output.get("corrected_input", ""), error_message, "str")
             return self._make_error_response(error_message)
\ No newline at end of file
@@ -0,0 +1,471 @@
+"""
+Offline semantic search over food_items.
+
+Dish lookups are exact / ILIKE / trigram matches on the dish name, so
+descriptive requests ("spicy rice dishes under 1000", "something sweet at
+kandiah") fell through to "not found". This index embeds every food item
+locally and answers those queries without a network call or a model
+download:
+
+- embedding: hashed character 3/4-grams and whole words of the item text
+  (dish + variant) into a sparse EMBEDDING_DIMS-dimensional vector,
+  sublinear TF, L2-normalized. Rows with the same text share one vector. Query descriptors are expanded with
+  a small vocabulary (spicy -> devilled, hot butter, ...), see QUERY_EXPANSIONS.
+- storage: one row per item in a local sqlite file (VECTOR_INDEX_DB);
+  vectors are loaded into an in-memory inverted index (dimension -> text
+  weights), so a query only touches the postings of its own dimensions,
+  rarest first, skipping n-grams that almost every dish shares.
+- updates: sync() compares a fingerprint of each catalog row with the
+  stored one and re-embeds / deletes only the rows that changed; it runs
+  whenever menu_catalog swaps in a new snapshot.
+- price filters in the query text ("under 1000", "between 500 and 800")
+  are parsed out and applied while scoring.
+
+    index = vector_index.get_index()
+    index.search("spicy rice under 1000", k=5)   # [(food item id, score), ...]
+    vector_index.search_items("spicy rice under 1000", restaurant_name="Kandiah")
+"""
+import bisect
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from array import array
+from collections import Counter
+from itertools import islice
+
+import menu_catalog
+from process_local import PerProcess
+
+VECTOR_INDEX_DB = os.getenv("VECTOR_INDEX_DB", "vectors_foodstation.db")
+VECTOR_TOP_K = int(os.getenv("VECTOR_TOP_K", "10"))
+VECTOR_MIN_SCORE = float(os.getenv("VECTOR_MIN_SCORE", "0.2"))  # cosine similarity
+EMBEDDING_DIMS = 1 << 20
+NGRAM_SIZES = (3, 4)
+COMMON_POSTING_SHARE = 0.05  # query n-grams found in more item texts than this share are skipped...
+COMMON_POSTING_MIN = 200     # ...once enough texts have matched, and only in catalogs this big
+RERANK_CANDIDATES = 50       # texts re-scored with their full vectors
+EMBEDDING_VERSION = f"hashed-ngrams-v2:{EMBEDDING_DIMS}:{NGRAM_SIZES}"  # stored rows are rebuilt on change
+
+# Words that describe the request rather than the food
+STOPWORDS = {
+    "a", "an", "the", "some", "any", "something", "anything", "me", "i", "want", "need", "like",
+    "show", "give", "get", "find", "list", "what", "which", "are", "is", "there", "with", "that",
+    "dish", "dishes", "food", "foods", "item", "items", "options", "please", "pls", "from", "at", "in",
+    "for", "of", "and", "or", "price", "prices", "rs", "lkr", "rupees", "cheap", "available",
+}
+
+# Descriptors -> dish words they usually mean on this menu
+QUERY_EXPANSIONS = {
+    "spicy": ("devilled", "hot butter", "schezwan", "chilli", "pepper", "kuruma", "curry"),
+    "hot": ("devilled", "hot butter", "chilli"),
+    "sweet": ("ice cream", "pudding", "wattalappam", "fruit salad", "milk shake"),
+    "dessert": ("ice cream", "pudding", "wattalappam", "fruit salad"),
+    "desserts": ("ice cream", "pudding", "wattalappam", "fruit salad"),
+    "drink": ("juice", "milk shake", "tea", "milo", "nescafe", "lime"),
+    "drinks": ("juice", "milk shake", "tea", "milo", "nescafe", "lime"),
+    "beverage": ("juice", "milk shake", "tea", "milo", "nescafe"),
+    "snack": ("rolls", "samosa", "vadai", "chips", "mixture", "bun", "french fries"),
+    "snacks": ("rolls", "samosa", "vadai", "chips", "mixture", "bun", "french fries"),
+    "veg": ("vegetable",),
+    "vegetarian": ("vegetable",),
+    "seafood": ("fish", "prawn", "cuttlefish", "crab"),
+}
+
+# Numbers followed by a unit ("within 30 minutes", "more than 1 plate") are not prices
+_NOT_PRICE_UNIT = r"(?:mins?|minutes?|hours?|hrs?|days?|plates?|persons?|people|pax|pcs|pieces?|items?|portions?|servings?|kms?)"
+_NUMBER = r"(\d+(?:\.\d+)?)(?![\d.])(?!\s*" + _NOT_PRICE_UNIT + r"\b)\s*(?:rs|lkr|rupees|/-)?"
+_BETWEEN_RE = re.compile(r"\bbetween\s+(?:rs\.?\s*)?" + _NUMBER + r"\s+(?:and|to|-)\s+(?:rs\.?\s*)?" + _NUMBER)
+_MAX_RE = re.compile(r"\b(?:under|below|less than|cheaper than|within|upto|up to|max|maximum)\s+(?:rs\.?\s*)?"
+                     + _NUMBER + r"|<\s*=?\s*" + _NUMBER)
+_MIN_RE = re.compile(r"\b(?:over|above|more than|at least|min|minimum)\s+(?:rs\.?\s*)?" + _NUMBER
+                     + r"|>\s*=?\s*" + _NUMBER)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def parse_price_filter(text):
+    """
+    Split a price constraint off a query.
+
+    Returns:
+        (remaining text, min_price or None, max_price or None)
+    """
+    text = (text or "").lower()
+    min_price = max_price = None
+    match = _BETWEEN_RE.search(text)
+    if match:
+        low, high = sorted((float(match.group(1)), float(match.group(2))))
+        return (text[:match.start()] + " " + text[match.end():]).strip(), low, high
+    match = _MAX_RE.search(text)
+    if match:
+        max_price = float(match.group(1) or match.group(2))
+        text = text[:match.start()] + " " + text[match.end():]
+    match = _MIN_RE.search(text)
+    if match:
+        min_price = float(match.group(1) or match.group(2))
+        text = text[:match.start()] + " " + text[match.end():]
+    return " ".join(text.split()), min_price, max_price
+
+
+def _dim(feature):
+    # crc32, not hash(): dimensions must be stable across processes and restarts
+    return zlib.crc32(feature.encode("utf-8")) % EMBEDDING_DIMS
+
+
+def embed(text, expand=False):
+    """
+    Sparse embedding of a text.
+
+    Args:
+        text: item or query text
+        expand: add QUERY_EXPANSIONS for descriptor words (queries only)
+    Returns:
+        {dimension: weight}, L2-normalized; {} if the text has no content words
+    """
+    words = [w for w in _WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+    if expand:
+        words += [w for word in words for phrase in QUERY_EXPANSIONS.get(word, ()) for w in phrase.split()]
+    counts = Counter()
+    for word in words:
+        counts[_dim("w:" + word)] += 1
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                counts[_dim(padded[i:i + n])] += 1
+    weights = {dim: 1.0 + math.log(count) for dim, count in counts.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {dim: w / norm for dim, w in weights.items()} if norm else {}
+
+
+def _encode(vector):
+    dims = sorted(vector)
+    return array("I", dims).tobytes() + array("f", [vector[d] for d in dims]).tobytes()
+
+
+def _decode(blob):
+    half = len(blob) // 2
+    dims, weights = array("I"), array("f")
+    dims.frombytes(blob[:half])
+    weights.frombytes(blob[half:])
+    return dict(zip(dims, weights))
+
+
+def item_text(item):
+    """Text an item is embedded from (items with the same text share one vector)."""
+    return " ".join(str(v).lower().strip() for v in (item.get("food_name"), item.get("variant")) if v)
+
+
+def _fingerprint(item):
+    payload = "\x1f".join(str(item.get(k)) for k in ("food_name", "variant", "restaurant_id", "price"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class VectorIndex:
+    """
+    Persistent sparse-vector index of food items.
+
+    Vectors are stored per distinct item text (dish + variant), not per row:
+    the same dish at many restaurants and sizes is embedded and scored once.
+    """
+
+    def __init__(self, db_path=VECTOR_INDEX_DB):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._postings = {}      # dimension -> {text: weight}
+        self._vectors = {}       # text -> {dimension: weight}
+        self._text_items = {}    # text -> set of item ids
+        self._items = {}         # item id -> (text, restaurant_id, price, fingerprint)
+        self._price_order = None  # item ids sorted by price, see _by_price
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vector_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vector_texts (text TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS vector_items
+            (id INTEGER PRIMARY KEY, text TEXT NOT NULL, restaurant_id INTEGER, price REAL,
+             fingerprint TEXT NOT NULL)""")
+        self._conn.commit()
+        self._load()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _load(self):
+        row = self._conn.execute("SELECT value FROM vector_meta WHERE key = 'embedding'").fetchone()
+        with self._conn:
+            if row is None or row[0] != EMBEDDING_VERSION:
+                # Vectors from another embedding are not comparable: start over
+                self._conn.execute("DELETE FROM vector_texts")
+                self._conn.execute("DELETE FROM vector_items")
+                self._conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('embedding', ?)",
+                                   (EMBEDDING_VERSION,))
+        for text, blob in self._conn.execute("SELECT text, vector FROM vector_texts"):
+            self._add_text(text, _decode(blob))
+        for item_id, text, restaurant_id, price, fingerprint in self._conn.execute(
+                "SELECT id, text, restaurant_id, price, fingerprint FROM vector_items"):
+            if text in self._vectors:
+                self._items[item_id] = (text, restaurant_id, price, fingerprint)
+                self._text_items[text].add(item_id)
+
+    def _add_text(self, text, vector):
+        self._vectors[text] = vector
+        self._text_items.setdefault(text, set())
+        for dim, weight in vector.items():
+            self._postings.setdefault(dim, {})[text] = weight
+
+    def _remove_item(self, item_id):
+        """Drop an item from memory; returns its text if that text has no items left."""
+        self._price_order = None
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return None
+        text = entry[0]
+        items = self._text_items.get(text)
+        if items is not None:
+            items.discard(item_id)
+            if not items:
+                del self._text_items[text]
+                for dim in self._vectors.pop(text, ()):
+                    posting = self._postings.get(dim)
+                    if posting is not None:
+                        posting.pop(text, None)
+                        if not posting:
+                            del self._postings[dim]
+                return text
+        return None
+
+    def _embed_new(self, items):
+        """Vectors for the item texts not in the index yet (computed without holding the lock)."""
+        vectors = {}
+        for item in items:
+            text = item_text(item)
+            if text not in self._vectors and text not in vectors:
+                vectors[text] = embed(text)
+        return vectors
+
+    def upsert(self, items, vectors=None):
+        """
+        Add items, or update items whose content changed.
+
+        Args:
+            items: dicts with id, food_name, variant, price, restaurant_id
+            vectors: optional {text: vector} from _embed_new
+        Returns:
+            number of items added or updated
+        """
+        items = list(items)
+        if vectors is None:
+            # Embedding is the slow part: searches keep running meanwhile
+            vectors = self._embed_new(items)
+        item_rows, new_texts, dropped = [], [], []
+        with self._lock:
+            for item in items:
+                fingerprint = _fingerprint(item)
+                entry = self._items.get(item["id"])
+                if entry is not None and entry[3] == fingerprint:
+                    continue
+                dropped.append(self._remove_item(item["id"]))
+                text = item_text(item)
+                if text not in self._vectors:
+                    vector = vectors.get(text) or embed(text)
+                    self._add_text(text, vector)
+                    new_texts.append((text, _encode(vector)))
+                price = float(item["price"]) if item.get("price") is not None else None
+                self._items[item["id"]] = (text, item.get("restaurant_id"), price, fingerprint)
+                self._price_order = None
+                self._text_items[text].add(item["id"])
+                item_rows.append((item["id"], text, item.get("restaurant_id"), price, fingerprint))
+            if item_rows:
+                with self._conn:
+                    self._conn.executemany("INSERT OR REPLACE INTO vector_texts (text, vector) VALUES (?, ?)",
+                                           new_texts)
+                    self._conn.executemany("""INSERT OR REPLACE INTO vector_items
+                        (id, text, restaurant_id, price, fingerprint) VALUES (?, ?, ?, ?, ?)""", item_rows)
+                    self._delete_texts([t for t in dropped if t is not None and t not in self._vectors])
+        return len(item_rows)
+
+    def _delete_texts(self, texts):
+        self._conn.executemany("DELETE FROM vector_texts WHERE text = ?", [(t,) for t in texts])
+
+    def delete(self, item_ids):
+        """Remove items from the index. Returns the number removed."""
+        with self._lock:
+            item_ids = [i for i in item_ids if i in self._items]
+            dropped = [self._remove_item(i) for i in item_ids]
+            if item_ids:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM vector_items WHERE id = ?", [(i,) for i in item_ids])
+                    self._delete_texts([t for t in dropped if t is not None and t not in self._vectors])
+        return len(item_ids)
+
+    def sync(self, items):
+        """Make the index match `items` exactly (upsert changed rows, delete missing ones)."""
+        items = list(items)
+        vectors = self._embed_new(items)
+        with self._lock:
+            changed = self.upsert(items, vectors)
+            keep = {item["id"] for item in items}
+            removed = self.delete([i for i in list(self._items) if i not in keep])
+            self._by_price()  # built here rather than by the first price-only query
+        return changed, removed
+
+    def _score_texts(self, vector, candidates):
+        """
+        Cosine similarity per item text, best first.
+
+        Postings are scanned rarest first; n-grams shared by most texts
+        ("ice", " ri") are skipped once `candidates` texts have matched.
+        The best candidates are then re-scored against their full vectors.
+        """
+        limit = max(COMMON_POSTING_MIN, int(len(self._vectors) * COMMON_POSTING_SHARE))
+        postings = sorted(((self._postings[dim], weight) for dim, weight in vector.items()
+                           if dim in self._postings), key=lambda pair: len(pair[0]))
+        partial = Counter()
+        for posting, weight in postings:
+            if len(posting) > limit and len(partial) >= candidates:
+                break
+            for text, text_weight in posting.items():
+                partial[text] += weight * text_weight
+
+        scored = []
+        for text, _ in partial.most_common(candidates):
+            text_vector = self._vectors[text]
+            scored.append((sum(w * text_vector.get(dim, 0.0) for dim, w in vector.items()), text))
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return scored
+
+    def _by_price(self):
+        """Item ids, cheapest first (rebuilt after changes)."""
+        if self._price_order is None:
+            self._price_order = sorted(self._items, key=self._price_key)
+        return self._price_order
+
+    def _price_key(self, item_id):
+        price = self._items[item_id][2]
+        return (price is None, price or 0, item_id)
+
+    def search(self, query, k=VECTOR_TOP_K, restaurant_ids=None, min_price=None, max_price=None,
+               min_score=VECTOR_MIN_SCORE):
+        """
+        Items closest to `query`.
+
+        Price constraints in the query text ("under 1000") are applied on top of
+        min_price/max_price. A query that is only a price constraint returns the
+        matching items cheapest first; equally similar items are cheapest first too.
+
+        Args:
+            query: free text
+            k: maximum number of results
+            restaurant_ids: optional set of restaurant ids to restrict to
+            min_price / max_price: optional inclusive bounds
+            min_score: minimum cosine similarity
+        Returns:
+            list of (food item id, score), best first
+        """
+        text, text_min, text_max = parse_price_filter(query)
+        min_price = text_min if min_price is None else min_price
+        max_price = text_max if max_price is None else max_price
+        vector = embed(text, expand=True)
+
+        def allowed(item_id):
+            _, restaurant_id, price, _ = self._items[item_id]
+            if restaurant_ids is not None and restaurant_id not in restaurant_ids:
+                return False
+            if min_price is not None and (price is None or price < min_price):
+                return False
+            if max_price is not None and (price is None or price > max_price):
+                return False
+            return True
+
+        with self._lock:
+            if not vector:
+                if min_price is None and max_price is None:
+                    return []
+                order = self._by_price()
+                start = 0
+                if min_price is not None:
+                    start = bisect.bisect_left(order, (False, min_price, -math.inf), key=self._price_key)
+                matches = []
+                for item_id in islice(order, start, None):
+                    price = self._items[item_id][2]
+                    if price is None or (max_price is not None and price > max_price):
+                        break
+                    if allowed(item_id):
+                        matches.append((item_id, 0.0))
+                        if len(matches) >= k:
+                            break
+                return matches
+
+            results = []
+            for score, text in self._score_texts(vector, max(k * 4, RERANK_CANDIDATES)):
+                if score < min_score or len(results) >= k:
+                    break
+                item_ids = sorted((i for i in self._text_items.get(text, ()) if allowed(i)), key=self._price_key)
+                results.extend((item_id, round(score, 4)) for item_id in item_ids)
+        return results[:k]
+
+
+_index = PerProcess(VectorIndex)
+_synced = (None, None)  # (index, snapshot) of the last sync
+_sync_lock = threading.Lock()
+
+
+def get_index():
+    """This process's VectorIndex (re-opened after fork); kept in sync by sync_index()."""
+    return _index.get()
+
+
+def sync_index(snapshot=None):
+    """
+    Bring the index up to date with a catalog snapshot (the current one by default).
+
+    Called from app.startup() and, for every new snapshot, from the thread that
+    loaded it (menu_catalog refresh listener), so requests never embed the catalog.
+    """
+    global _synced
+    index = get_index()
+    snapshot = snapshot or menu_catalog.get_snapshot()
+    if snapshot is None or (_synced[0] is index and _synced[1] is snapshot):
+        return index
+    with _sync_lock:
+        if _synced[0] is not index or _synced[1] is not snapshot:
+            try:
+                index.sync(snapshot.food_items)
+            except sqlite3.Error as e:
+                print(f"Vector index sync error: {e}")
+            _synced = (index, snapshot)
+    return index
+
+
+menu_catalog.add_refresh_listener(sync_index)
+
+
+def search_items(query, restaurant_name=None, k=VECTOR_TOP_K, exact_restaurant=False):
+    """
+    Catalog items semantically matching `query`, best first.
+
+    Args:
+        query: free text, may contain a price constraint ("under 1000")
+        restaurant_name: optional restaurant filter (substring match, or exact name)
+        k: maximum number of items
+        exact_restaurant: match restaurant_name like `r.name = x` instead of ILIKE
+    Returns:
+        list of snapshot food item dicts, or [] if the catalog is not loaded
+    """
+    snapshot = menu_catalog.get_snapshot()
+    if snapshot is None:
+        return []
+    restaurant_ids = None
+    if restaurant_name:
+        restaurant_ids = snapshot.restaurant_ids(restaurant_name, exact=exact_restaurant)
+        if not restaurant_ids:
+            return []
+    try:
+        matches = get_index().search(query, k=k, restaurant_ids=restaurant_ids)
+    except sqlite3.Error as e:
+        print(f"Vector index error: {e}")
+        return []
+    return [snapshot.items_by_id[item_id] for item_id, _ in matches if item_id in snapshot.items_by_id]
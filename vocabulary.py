@@ -0,0 +1,157 @@
+"""
+Entity vocabulary: the restaurant, dish, variant and size names the catalog knows.
+
+Restaurant and dish names used to be hard-coded, separately (and
+differently) in the entity-extraction prompt, the order prompt and the
+fast path. get_vocabulary() derives all four sets from the current
+menu_catalog snapshot instead, so every consumer sees the same names:
+
+  - candidates (restaurant/dish names injected into the LLM prompts)
+  - fast_path (exact restaurant/dish matches)
+  - order_request (canonical dish/variant/size names for LLM output)
+
+A Vocabulary is rebuilt when the catalog snapshot is replaced, but kept
+(same object, same version) if the names did not change, so per-vocabulary
+caches in the consumers survive routine catalog refreshes. Until the
+catalog can be loaded, the names the prompts used to hard-code are served.
+"""
+import hashlib
+import threading
+
+import menu_catalog
+from dish_search import TrigramIndex
+
+VARIANT_THRESHOLD = 0.6  # minimum trigram score to correct a misspelled variant
+
+# The prompts' size mapping rules: 1 person -> small, 2 -> medium, 4 -> large
+SIZE_ALIASES = {
+    "normal": "small", "half": "small", "regular": "small", "1 person": "small",
+    "full": "medium", "2 person": "medium",
+    "4 person": "large", "family": "large",
+}
+
+# Served until the catalog snapshot is available
+FALLBACK_RESTAURANTS = ["Kandiah", "Ice Talk", "Bluberry", "Jollybeez", "Mum’s Food"]
+FALLBACK_DISHES = [
+    'Kotthu', 'Kotthu Rotti', 'Cheese Kotthu', 'Dolphin', 'Pittu Kotthu', 'Noodles', 'Pasta',
+    'String Hopper Kotthu', 'Bread Kotthu', 'Rice & Curry', 'Schezwan Rice', 'Mongolian Rice',
+    'Chopsuey Rice', 'Nasi Goreng', 'Biriyani', 'Fried Rice', 'Fry', 'Bbq', 'Tandoori', 'Grill',
+    'Devilled', 'Hot Butter', 'Curry', 'Kuruma', 'Parata', 'Mums Special Lime With Mint', 'Mums Special',
+    'Fresh Juice', 'Milk Shakes', 'Ice Cream', 'Nescafe', 'Milk Tea', 'Milo', 'Fruit Salad', 'Wattalappam',
+    'Biscuit Pudding', 'Naan', 'French Fries', 'Soup', 'Salad', 'Mayyer Kelangu Fry', 'Hopper', 'Rolls',
+    'Samosa', 'Corn', 'Vadai', 'Shawarma', 'Bun', 'Kanji / Kenda', 'Chips', 'Mixture', 'Manyokka Fry',
+]
+FALLBACK_VARIANTS = ["Chicken", "Beef", "Mutton", "Egg", "Fish", "Prawn", "Vegetable", "Cheese"]
+FALLBACK_SIZES = ["Small", "Medium", "Large"]
+
+
+def _names(values):
+    """Display names -> {normalized name: display name}, first spelling wins."""
+    names = {}
+    for value in values:
+        key = menu_catalog.normalize_name(value)
+        if key is not None:
+            names.setdefault(key, str(value).strip())
+    return names
+
+
+class Vocabulary:
+    """
+    Normalized name -> display name for each entity kind.
+
+    Attributes:
+        restaurants, dishes, variants, sizes: {normalized name: display name}
+        restaurant_index, dish_index, variant_index: TrigramIndex over the normalized names
+        version: hash of all names; changes only when a name is added, removed or respelled
+        from_catalog: False while the hard-coded fallback lists are served
+    """
+
+    def __init__(self, restaurants, dishes, variants, sizes, restaurant_index=None, dish_index=None,
+                 from_catalog=True):
+        self.restaurants = _names(restaurants)
+        self.dishes = _names(dishes)
+        self.variants = _names(variants)
+        self.sizes = _names(sizes)
+        self.restaurant_index = restaurant_index or TrigramIndex(self.restaurants)
+        self.dish_index = dish_index or TrigramIndex(self.dishes)
+        self.variant_index = TrigramIndex(self.variants)
+        self.from_catalog = from_catalog
+
+        digest = hashlib.sha256()
+        for names in (self.restaurants, self.dishes, self.variants, self.sizes):
+            for key in sorted(names):
+                digest.update(f"{key}\x1f{names[key]}\x1e".encode("utf-8"))
+            digest.update(b"\x1d")
+        self.version = digest.hexdigest()[:16]
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        items = snapshot.food_items
+        return cls(
+            (r["name"] for r in snapshot.restaurants_by_name.values()),
+            (item["food_name"] for item in items),
+            (item["variant"] for item in items),
+            (item["size"] for item in items),
+            restaurant_index=snapshot.restaurant_index,
+            dish_index=snapshot.dish_index,
+        )
+
+    @classmethod
+    def fallback(cls):
+        return cls(FALLBACK_RESTAURANTS, FALLBACK_DISHES, FALLBACK_VARIANTS, FALLBACK_SIZES, from_catalog=False)
+
+    def dish(self, value):
+        """Canonical (normalized) dish name for an exact or singular/plural match, else None."""
+        key = menu_catalog.normalize_name(value)
+        if key is None:
+            return None
+        for candidate in (key, key[:-1] if key.endswith("s") else None, key + "s"):
+            if candidate in self.dishes:
+                return candidate
+        return None
+
+    def variant(self, value):
+        """Canonical variant for an exact or close (misspelled) match, else None."""
+        key = menu_catalog.normalize_name(value)
+        if key is None:
+            return None
+        if key in self.variants:
+            return key
+        matches = self.variant_index.search(key, k=1, threshold=VARIANT_THRESHOLD)
+        return matches[0][0] if matches else None
+
+    def size(self, value):
+        """Canonical size, mapping "normal"/"full"/... to small/medium/large; else None."""
+        key = menu_catalog.normalize_name(value)
+        if key is None:
+            return None
+        if key in self.sizes:
+            return key
+        alias = SIZE_ALIASES.get(key)
+        return alias if alias in self.sizes or not self.sizes else None
+
+
+_lock = threading.Lock()
+_state = {"snapshot": None, "vocabulary": None}
+
+
+def get_vocabulary():
+    """The vocabulary of the current catalog snapshot (or of the fallback lists)."""
+    snapshot = menu_catalog.get_snapshot()
+    current = _state["vocabulary"]
+    if current is not None and _state["snapshot"] is snapshot:
+        return current
+    with _lock:
+        if _state["vocabulary"] is not None and _state["snapshot"] is snapshot:
+            return _state["vocabulary"]
+        vocabulary = Vocabulary.from_snapshot(snapshot) if snapshot is not None else Vocabulary.fallback()
+        if current is not None and current.version == vocabulary.version:
+            vocabulary = current  # same names: keep the object consumers have cached against
+        _state["vocabulary"] = vocabulary
+        _state["snapshot"] = snapshot
+        return vocabulary
+
+
+def version():
+    """Version hash of the current vocabulary (for cache keys)."""
+    return get_vocabulary().version